@@ -0,0 +1,104 @@
+# ai_layer/explanations.py
+"""
+Explicaciones del modelo en segundo plano.
+
+start() lanza la llamada en un hilo y devuelve un id de inmediato; los
+fragmentos se van guardando en el trabajo a medida que llegan, y stream()
+los entrega (p. ej. por Server-Sent Events) esperando los que faltan.
+Cada llamada al modelo ocupa un lugar de ModelSlots, compartido entre procesos.
+"""
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from ai_layer.predictor import stream_explanation
+from ai_layer.slots import ModelSlots
+
+JOB_TTL = 300          # segundos que se conserva un trabajo terminado
+HEARTBEAT_SECONDS = 15
+
+
+class _Job:
+    def __init__(self):
+        self.chunks = []
+        self.done = False
+        self.error = None
+        self.finished_at = None
+        self.cond = threading.Condition()
+
+
+class ExplanationJobs:
+    def __init__(self, slots=None, max_workers=8, model=None, slot_timeout=60):
+        self.slots = slots or ModelSlots()
+        self.model = model
+        self.slot_timeout = slot_timeout
+        self._pool = ThreadPoolExecutor(max_workers=max_workers)
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def start(self, risk_level, location, metrics=None):
+        """
+        Lanza la explicación y devuelve su id sin esperar al modelo.
+        """
+        job_id = uuid.uuid4().hex
+        job = _Job()
+        with self._lock:
+            self._purge()
+            self._jobs[job_id] = job
+        self._pool.submit(self._run, job, risk_level, location, metrics)
+        return job_id
+
+    def _run(self, job, risk_level, location, metrics=None):
+        try:
+            with self.slots.acquire(self.slot_timeout):
+                for text in stream_explanation(risk_level, location, self.model, metrics):
+                    with job.cond:
+                        job.chunks.append(text)
+                        job.cond.notify_all()
+        except Exception as e:
+            print(f"⚠️ Explicación falló: {e}")
+            job.error = str(e)
+        finally:
+            with job.cond:
+                job.done = True
+                job.finished_at = time.time()
+                job.cond.notify_all()
+
+    def _purge(self):
+        now = time.time()
+        expired = [job_id for job_id, job in self._jobs.items()
+                   if job.done and now - job.finished_at > JOB_TTL]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    def __contains__(self, job_id):
+        with self._lock:
+            return job_id in self._jobs
+
+    def stream(self, job_id):
+        """
+        Genera (evento, datos): ("chunk", texto) por fragmento, ("heartbeat", None)
+        si no llega nada en HEARTBEAT_SECONDS, y al final ("done", texto completo)
+        o ("error", mensaje). KeyError si el id no existe.
+        """
+        with self._lock:
+            job = self._jobs[job_id]
+        sent = 0
+        while True:
+            with job.cond:
+                if sent == len(job.chunks) and not job.done:
+                    job.cond.wait(HEARTBEAT_SECONDS)
+                new = job.chunks[sent:]
+                done = job.done
+            for text in new:
+                yield "chunk", text
+            sent += len(new)
+            if done and sent == len(job.chunks):
+                if job.error:
+                    yield "error", job.error
+                else:
+                    yield "done", "".join(job.chunks)
+                return
+            if not new:
+                yield "heartbeat", None
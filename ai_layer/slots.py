@@ -0,0 +1,73 @@
+# ai_layer/slots.py
+"""
+Límite de llamadas simultáneas al modelo compartido entre procesos
+(varios workers de gunicorn/uwsgi): n archivos de bloqueo, y cada llamada
+debe tomar uno con flock. Si un proceso muere, el sistema libera su bloqueo.
+Sin fcntl (Windows) el límite es por proceso, con un semáforo por lock_dir.
+"""
+import contextlib
+import os
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+SLOTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".slots")
+AI_MAX_CONCURRENCY = int(os.environ.get("TERRAGUARD_AI_MAX_CONCURRENCY", "4"))
+
+# lock_dir → semáforo del proceso (solo cuando no hay fcntl)
+_local_semaphores = {}
+_local_lock = threading.Lock()
+
+
+class ModelSlots:
+    def __init__(self, n=AI_MAX_CONCURRENCY, lock_dir=SLOTS_DIR, poll=0.05):
+        self.n = n
+        self.lock_dir = lock_dir
+        self.poll = poll
+        self._semaphore = None
+        if fcntl is None:
+            with _local_lock:
+                self._semaphore = _local_semaphores.setdefault(lock_dir, threading.BoundedSemaphore(n))
+        else:
+            os.makedirs(lock_dir, exist_ok=True)
+
+    def _try_acquire(self):
+        for slot in range(self.n):
+            f = open(os.path.join(self.lock_dir, f"slot_{slot}.lock"), "a")
+            try:
+                fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                return f
+            except BlockingIOError:
+                f.close()
+        return None
+
+    @contextlib.contextmanager
+    def acquire(self, timeout=60):
+        """
+        Espera hasta timeout segundos por un lugar libre; TimeoutError si no lo hay.
+        """
+        if self._semaphore is not None:
+            if not self._semaphore.acquire(timeout=timeout):
+                raise TimeoutError(f"Sin lugar libre para el modelo tras {timeout}s ({self.n} en uso)")
+            try:
+                yield
+            finally:
+                self._semaphore.release()
+            return
+
+        deadline = time.time() + timeout
+        f = self._try_acquire()
+        while f is None:
+            if time.time() >= deadline:
+                raise TimeoutError(f"Sin lugar libre para el modelo tras {timeout}s ({self.n} en uso)")
+            time.sleep(self.poll)
+            f = self._try_acquire()
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+            f.close()
@@ -0,0 +1,40 @@
+# ai_layer/stub_model.py
+"""
+Modelo local que imita la interfaz de genai.GenerativeModel
+(generate_content con y sin stream) para probar sin red ni API key.
+"""
+import re
+import time
+
+
+class _Chunk:
+    def __init__(self, text):
+        self.text = text
+
+
+class StubModel:
+    """
+    Responde con un texto fijo armado a partir del prompt; en modo stream
+    lo entrega palabra por palabra con una pausa de delay segundos.
+    """
+    def __init__(self, delay=0.05):
+        self.delay = delay
+
+    def _answer(self, prompt):
+        match = re.search(r"El riesgo en (.+) está entre (\d+) y (\d+)", prompt)
+        location, low, high = match.groups() if match else ("esta ubicación", "?", "?")
+        return (f"El índice de riesgo en {location} está entre {low} y {high} sobre 100. "
+                "Este valor combina la actividad sísmica, las inundaciones, los huracanes, "
+                "los incendios y el clima de la zona. Te recomendamos revisar las coberturas "
+                "sugeridas y las acciones de mitigación para proteger tu propiedad.")
+
+    def generate_content(self, prompt, stream=False):
+        text = self._answer(prompt)
+        if not stream:
+            return _Chunk(text)
+        return self._stream(text)
+
+    def _stream(self, text):
+        for word in re.findall(r"\S+\s*", text):
+            time.sleep(self.delay)
+            yield _Chunk(word)
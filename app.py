@@ -1,20 +1,31 @@
-import ee
-from flask import Flask, request, jsonify, render_template, send_from_directory
+import json
+import math
+import os
+import threading
+import time
+
+_IMPORT_STARTED = time.perf_counter()
+
+import numpy as np
+from flask import Flask, request, jsonify, render_template, send_from_directory, Response, stream_with_context, url_for
 from flask_cors import CORS  # Aún útil para desarrollo local
 
 # Asumiendo que tus módulos están en las carpetas correctas
 from processing_layer.risk_model import RiskModel
 from business_layer.rules import InsuranceRules
 from data_layer.data2 import DataLayer
+from data_layer.http_client import http_client
+from data_layer.cache import source_flights
+from ui_layer.tiles import MAX_ZOOM, RiskTileCache
+from ai_layer.explanations import ExplanationJobs
+from data_layer import ee_session
 
 # --- Inicialización Global ---
-try:
-    ee.Initialize(project='terraguard-477621')
-    print("🌍 Earth Engine funcionando correctamente")
-except Exception as e:
-    print(f"Error inicializando Earth Engine: {e}")
-
+# Earth Engine no se inicializa al importar: lo hace el primer análisis o
+# el calentamiento en segundo plano (start_warm_up), y /api/ready avisa cuándo terminó.
 risk_model = RiskModel()
+risk_tiles = RiskTileCache(risk_model)
+explanations = ExplanationJobs()
 
 # --- Configuración de Flask ---
 
@@ -27,6 +38,38 @@ app = Flask(__name__,
 # mantenerlo por si pruebas el index.html como archivo local.
 CORS(app)
 
+IMPORT_SECONDS = round(time.perf_counter() - _IMPORT_STARTED, 3)
+print(f"🚀 app importada en {IMPORT_SECONDS}s")
+
+
+# --- Calentamiento de Earth Engine ---
+_warm_up_lock = threading.Lock()
+_warm_up_thread = None
+
+def _warm_up():
+    try:
+        ee_session.warm_up(risk_model.data_layer)
+        cold_start = round(time.perf_counter() - _IMPORT_STARTED, 3)
+        print(f"🔥 Earth Engine listo (arranque en frío: {cold_start}s)")
+    except Exception as e:
+        print(f"Error en el calentamiento de Earth Engine: {e}")
+
+def start_warm_up():
+    """
+    Inicia el calentamiento (sesión de GEE, mosaico GLOFAS, SRTM) en un hilo
+    aparte. No hace nada si ya está listo o en curso; si falló, lo reintenta.
+    """
+    global _warm_up_thread
+    with _warm_up_lock:
+        if ee_session.is_ready() or (_warm_up_thread is not None and _warm_up_thread.is_alive()):
+            return
+        _warm_up_thread = threading.Thread(target=_warm_up, name="ee-warm-up", daemon=True)
+        _warm_up_thread.start()
+
+# TERRAGUARD_WARM_UP=0 deja todo perezoso hasta el primer análisis
+if os.environ.get("TERRAGUARD_WARM_UP", "1") != "0":
+    start_warm_up()
+
 
 # --- Funciones de Utilidad (Sin cambios) ---
 def validate_coords(lon, lat):
@@ -42,6 +85,24 @@ def validate_coords(lon, lat):
             raise ValueError(f"Coordenadas inválidas: lon={lon}, lat={lat}")
     return lon, lat
 
+def explanation_params(result, lat, lon):
+    """
+    Parámetros de la URL de explanation_stream: con ellos cualquier worker
+    puede relanzar la misma explicación si no tiene el trabajo.
+    """
+    return {
+        "risk": result['risk_percent'],
+        "lat": lat,
+        "lon": lon,
+        "metrics": json.dumps(result.get('metrics_percent') or {}, separators=(",", ":")),
+    }
+
+def sse_event(event, data):
+    """
+    Formatea un evento de Server-Sent Events (datos en JSON).
+    """
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
 # --- Endpoints de la API ---
 
 # 💡 **CAMBIO 2: Nueva ruta para servir la página principal**
@@ -61,7 +122,8 @@ def serve_static(filename):
 def analyze_location_api():
     """
     Endpoint de la API para analizar una ubicación.
-    (Esta función no cambia en absoluto)
+    Devuelve el riesgo con su desglose y, en explanation_stream, la URL SSE
+    de la explicación del modelo, que se genera aparte sin demorar la respuesta.
     """
     data = request.get_json()
     if not data or 'lat' not in data or 'lon' not in data:
@@ -81,6 +143,77 @@ def analyze_location_api():
             print(f"📍 Analizando API request: (lat={lat}, lon={lon}) con datos actuales...")
 
         result = risk_model.calculate_risk_with_breakdown(lon, lat, target_year=target_year)
+
+        # La explicación del modelo corre aparte; el cliente la recibe por SSE
+        job_id = explanations.start(result['risk_percent'], (lat, lon), result.get('metrics_percent'))
+        result['explanation_stream'] = url_for('explanation_stream_api', job_id=job_id,
+                                               **explanation_params(result, lat, lon))
+        return jsonify(result)
+
+    except ValueError as e:
+        print(f"ERROR (ValueError): {e}")
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        print(f"ERROR (Exception): {e}")
+        return jsonify({"error": f"Error interno del servidor: {e}"}), 500
+
+@app.route('/api/rescore', methods=['POST'])
+def rescore_location_api():
+    """
+    Re-puntúa una ubicación ya analizada reutilizando sus factores guardados:
+    solo se consultan los grupos vencidos según su volatilidad
+    ("force": true consulta todo). refreshed_factors lista los consultados.
+    """
+    data = request.get_json(silent=True)
+    if not data or 'lat' not in data or 'lon' not in data:
+        return jsonify({"error": "Faltan 'lat' y 'lon' en el JSON body"}), 400
+
+    try:
+        lon, lat = validate_coords(float(data['lon']), float(data['lat']))
+        print(f"🔁 Re-puntuando API request: (lat={lat}, lon={lon})...")
+        return jsonify(risk_model.rescore(lon, lat, force=bool(data.get('force'))))
+
+    except ValueError as e:
+        print(f"ERROR (ValueError): {e}")
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        print(f"ERROR (Exception): {e}")
+        return jsonify({"error": f"Error interno del servidor: {e}"}), 500
+
+# Límites por proyección para acotar el trabajo de una sola petición
+MAX_PROJECTION_YEARS = 100
+MAX_ENSEMBLE_SCENARIOS = 10000
+
+@app.route('/api/analyze/projection', methods=['POST'])
+def analyze_projection_api():
+    """
+    Serie de riesgo año por año (p. ej. 2026–2050) en una sola respuesta.
+    Los datos actuales se consultan una vez; cada año sale del modelo de tendencia.
+    Con "ensemble": true devuelve p5/p50/p95 por año de un ensamble Monte Carlo
+    ("scenarios" escenarios, "seed" para reproducirlo).
+    """
+    data = request.get_json()
+    if not data or 'lat' not in data or 'lon' not in data:
+        return jsonify({"error": "Faltan 'lat' y 'lon' en el JSON body"}), 400
+
+    try:
+        lon, lat = validate_coords(float(data['lon']), float(data['lat']))
+        start_year = int(data.get('start_year') or 2026)
+        end_year = int(data.get('end_year') or 2050)
+        if end_year < start_year:
+            raise ValueError(f"end_year ({end_year}) es menor que start_year ({start_year})")
+        if end_year - start_year + 1 > MAX_PROJECTION_YEARS:
+            raise ValueError(f"Máximo {MAX_PROJECTION_YEARS} años por proyección")
+
+        print(f"📈 Proyección API request: (lat={lat}, lon={lon}) {start_year}–{end_year}...")
+        if data.get('ensemble'):
+            scenarios = int(data.get('scenarios') or 2000)
+            if not 1 <= scenarios <= MAX_ENSEMBLE_SCENARIOS:
+                raise ValueError(f"scenarios debe estar entre 1 y {MAX_ENSEMBLE_SCENARIOS}")
+            seed = int(data.get('seed') or 0)
+            result = risk_model.project_risk_ensemble(lon, lat, start_year, end_year, scenarios, seed)
+        else:
+            result = risk_model.project_risk_series(lon, lat, start_year, end_year)
         return jsonify(result)
 
     except ValueError as e:
@@ -90,6 +223,159 @@ def analyze_location_api():
         print(f"ERROR (Exception): {e}")
         return jsonify({"error": f"Error interno del servidor: {e}"}), 500
 
+# Límites del análisis por lotes
+MAX_BATCH_POINTS = 5000
+BATCH_CHUNK_SIZE = 250
+
+def _json_number(value):
+    value = float(value)
+    return None if math.isnan(value) else value
+
+@app.route('/api/analyze/batch', methods=['POST'])
+def analyze_batch_api():
+    """
+    Analiza muchas ubicaciones en una petición: {"points": [{"lat", "lon", "id"?}], "year"?}.
+    Responde NDJSON (una línea por punto, en orden de llegada por bloque) en cuanto
+    cada bloque está puntuado; un punto inválido o un bloque que falla produce
+    líneas con "error" sin cortar el resto. La última línea es un resumen.
+    """
+    data = request.get_json(silent=True)
+    if not data or not isinstance(data.get('points'), list):
+        return jsonify({"error": "Falta 'points' (lista de {lat, lon}) en el JSON body"}), 400
+    points = data['points']
+    if len(points) > MAX_BATCH_POINTS:
+        return jsonify({"error": f"Máximo {MAX_BATCH_POINTS} puntos por petición"}), 400
+    try:
+        target_year = int(data['year']) if data.get('year') else None
+    except (TypeError, ValueError):
+        return jsonify({"error": f"Año inválido: {data.get('year')}"}), 400
+
+    def line(payload):
+        return json.dumps(payload, ensure_ascii=False) + "\n"
+
+    def results():
+        counts = {"ok": 0, "error": 0}
+        valid = []
+        # 🔹 Validación por punto: los errores salen de inmediato
+        for index, point in enumerate(points):
+            item_id = point.get('id') if isinstance(point, dict) else None
+            try:
+                lon, lat = validate_coords(float(point['lon']), float(point['lat']))
+                valid.append((index, item_id, lon, lat))
+            except (TypeError, KeyError, ValueError) as e:
+                counts["error"] += 1
+                yield line({"index": index, "id": item_id, "error": f"Punto inválido: {e}"})
+
+        # 🔹 Bloques por las rutas por lotes de data_layer / RiskModel
+        print(f"📍 Batch API request: {len(valid)} puntos válidos de {len(points)}...")
+        for start in range(0, len(valid), BATCH_CHUNK_SIZE):
+            chunk = valid[start:start + BATCH_CHUNK_SIZE]
+            coords = np.array([(lon, lat) for _, _, lon, lat in chunk])
+            unique, inverse = np.unique(coords, axis=0, return_inverse=True)
+            inverse = inverse.ravel()
+            try:
+                factors = risk_model.get_factors_batch(unique[:, 0], unique[:, 1], target_year=target_year)
+                scored = risk_model.calculate_risk_batch(factors)
+            except Exception as e:
+                print(f"ERROR (Exception): {e}")
+                for index, item_id, _, _ in chunk:
+                    counts["error"] += 1
+                    yield line({"index": index, "id": item_id, "error": f"Error interno del servidor: {e}"})
+                continue
+            for (index, item_id, lon, lat), u in zip(chunk, inverse):
+                counts["ok"] += 1
+                yield line({
+                    "index": index,
+                    "id": item_id,
+                    "lat": lat,
+                    "lon": lon,
+                    "risk_percent": int(scored['risk_percent'][u]),
+                    "metrics_percent": {k: _json_number(v[u]) for k, v in scored['metrics_percent'].items()},
+                })
+
+        yield line({"summary": {"total": len(points), **counts, "year": target_year}})
+
+    response = Response(stream_with_context(results()), mimetype='application/x-ndjson')
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+@app.route('/api/explain/<job_id>/stream', methods=['GET'])
+def explanation_stream_api(job_id):
+    """
+    Texto de la explicación por Server-Sent Events a medida que el modelo lo genera.
+    Si el trabajo no existe en este proceso (otro worker o ya expirado), se
+    lanza aquí con los parámetros risk/lat/lon/metrics de la URL.
+    """
+    if job_id not in explanations:
+        try:
+            lon, lat = validate_coords(float(request.args['lon']), float(request.args['lat']))
+            metrics = {str(k): float(v) for k, v in json.loads(request.args.get('metrics', '{}')).items()
+                       if v is not None}
+            job_id = explanations.start(float(request.args['risk']), (lat, lon), metrics or None)
+        except (KeyError, ValueError, TypeError, AttributeError):
+            return jsonify({"error": f"Explicación desconocida: {job_id}"}), 404
+
+    def events():
+        for event, data in explanations.stream(job_id):
+            if event == "heartbeat":
+                yield ": keep-alive\n\n"
+            else:
+                yield sse_event(event, data)
+
+    response = Response(stream_with_context(events()), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'  # sin buffer en nginx
+    return response
+
+@app.route('/api/metrics', methods=['GET'])
+def metrics_api():
+    """
+    Estado de las fuentes externas: pools HTTP, circuit breakers y caché.
+    """
+    cache = risk_model.data_layer.cache
+    return jsonify({
+        "http": http_client.stats(),
+        "cache": cache.stats() if cache is not None else None,
+        "coalescing": {
+            "analyses": risk_model.flights.stats(),
+            "analyses_async": risk_model.async_flights.stats(),
+            "sources": source_flights.stats(),
+        },
+    })
+
+@app.route('/api/ready', methods=['GET'])
+def ready_api():
+    """
+    Readiness: 200 cuando Earth Engine está inicializado y calentado, 503 mientras no.
+    """
+    status = ee_session.status()
+    status.update(ready=ee_session.is_ready(), import_seconds=IMPORT_SECONDS,
+                  uptime_seconds=round(time.perf_counter() - _IMPORT_STARTED, 3))
+    if not status["ready"]:
+        start_warm_up()
+        return jsonify(status), 503
+    return jsonify(status)
+
+@app.route('/tiles/risk/<int:z>/<int:x>/<int:y>.png', methods=['GET'])
+def risk_tile(z, x, y):
+    """
+    Tesela XYZ de riesgo (PNG 256x256) para usar como capa en Leaflet.
+    Mientras la exacta se calcula se responde 202 con una aproximación
+    (o transparente) que el navegador no cachea; la exacta vale TILE_TTL.
+    """
+    if not (0 <= z <= MAX_ZOOM and 0 <= x < 2 ** z and 0 <= y < 2 ** z):
+        return jsonify({"error": f"Tesela fuera de rango: {z}/{x}/{y}"}), 404
+
+    try:
+        png, exact = risk_tiles.get_tile(z, x, y)
+    except Exception as e:
+        print(f"ERROR (Exception): {e}")
+        return jsonify({"error": f"Error interno del servidor: {e}"}), 500
+
+    response = Response(png, status=200 if exact else 202, mimetype='image/png')
+    response.headers['Cache-Control'] = f'public, max-age={risk_tiles.ttl}' if exact else 'no-cache'
+    return response
+
 # --- Ejecutar el Servidor ---
 if __name__ == "__main__":
     app.run(host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
@@ -0,0 +1,301 @@
+# asgi.py
+"""
+Modo de servicio asíncrono (ASGI) para la misma API de app.py.
+
+POST /api/analyze corre en el event loop: las consultas a las fuentes
+externas van por AsyncDataLayer, así que un solo proceso mantiene cientos
+de análisis en curso sin un hilo bloqueado por cada uno. El resto de las
+rutas (frontend, proyección, teselas, SSE, lotes) se delegan a la app Flask
+ejecutándola en un hilo. Contrapresión:
+- más de MAX_IN_FLIGHT peticiones en curso → 503 inmediato;
+- una fuente saturada más de queue_timeout segundos → 503 (UpstreamBusyError).
+
+Uso: uvicorn asgi:app --host 0.0.0.0 --port 5000
+"""
+import asyncio
+import io
+import json
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode
+
+from app import app as flask_app
+from app import explanation_params, explanations, http_client, risk_model, validate_coords
+from data_layer.async_layer import AsyncDataLayer, UpstreamBusyError
+from data_layer.cache import source_flights
+
+MAX_IN_FLIGHT = 512
+MAX_BODY_BYTES = 1024 * 1024
+WSGI_THREADS = 64   # hilos para las rutas delegadas a Flask (aparte de los de las fuentes)
+RETRY_AFTER_SECONDS = 2
+
+
+class TerraGuardASGI:
+    def __init__(self, wsgi_app, risk_model, async_layer=None, max_in_flight=MAX_IN_FLIGHT):
+        self.wsgi_app = wsgi_app
+        self.risk_model = risk_model
+        self.async_layer = async_layer or AsyncDataLayer()
+        self.max_in_flight = max_in_flight
+        self.wsgi_executor = ThreadPoolExecutor(max_workers=WSGI_THREADS, thread_name_prefix="wsgi")
+        self.in_flight = 0
+        self.rejected = 0
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+            return
+        if scope["type"] != "http":
+            return
+
+        if self.in_flight >= self.max_in_flight:
+            self.rejected += 1
+            await self._send_json(send, 503, {"error": "Servidor saturado, intenta de nuevo"},
+                                  [(b"retry-after", str(RETRY_AFTER_SECONDS).encode())])
+            return
+
+        self.in_flight += 1
+        try:
+            body = await self._read_body(receive)
+            if body is None:
+                await self._send_json(send, 413, {"error": "Cuerpo de la petición demasiado grande"})
+            elif scope["method"] == "POST" and scope["path"] == "/api/analyze":
+                await self._analyze(body, send)
+            elif scope["method"] == "GET" and scope["path"] == "/api/metrics":
+                await self._metrics(send)
+            else:
+                await self._call_wsgi(scope, body, send, receive)
+        finally:
+            self.in_flight -= 1
+
+    # -----------------------------
+    # Rutas asíncronas
+    # -----------------------------
+    async def _analyze(self, body, send):
+        """
+        Mismo contrato que analyze_location_api en app.py.
+        """
+        try:
+            data = json.loads(body) if body else None
+        except ValueError:
+            data = None
+        if not isinstance(data, dict) or 'lat' not in data or 'lon' not in data:
+            await self._send_json(send, 400, {"error": "Faltan 'lat' y 'lon' en el JSON body"})
+            return
+
+        try:
+            target_year_input = data.get('year')
+            target_year = int(target_year_input) if target_year_input else None
+            lon, lat = validate_coords(float(data['lon']), float(data['lat']))
+
+            result = await self.risk_model.calculate_risk_async(lon, lat, self.async_layer, target_year)
+            job_id = explanations.start(result['risk_percent'], (lat, lon), result.get('metrics_percent'))
+            query = urlencode(explanation_params(result, lat, lon))
+            result['explanation_stream'] = f"/api/explain/{job_id}/stream?{query}"
+            await self._send_json(send, 200, result)
+
+        except UpstreamBusyError as e:
+            await self._send_json(send, 503, {"error": str(e)},
+                                  [(b"retry-after", str(RETRY_AFTER_SECONDS).encode())])
+        except ValueError as e:
+            print(f"ERROR (ValueError): {e}")
+            await self._send_json(send, 400, {"error": str(e)})
+        except Exception as e:
+            print(f"ERROR (Exception): {e}")
+            await self._send_json(send, 500, {"error": f"Error interno del servidor: {e}"})
+
+    async def _metrics(self, send):
+        cache = self.risk_model.data_layer.cache
+        await self._send_json(send, 200, {
+            "http": http_client.stats(),
+            "cache": cache.stats() if cache is not None else None,
+            "coalescing": {
+                "analyses": self.risk_model.flights.stats(),
+                "analyses_async": self.risk_model.async_flights.stats(),
+                "sources": source_flights.stats(),
+            },
+            "upstream": self.async_layer.stats(),
+            "requests": {"in_flight": self.in_flight, "max_in_flight": self.max_in_flight,
+                         "rejected": self.rejected},
+        })
+
+    # -----------------------------
+    # Puente hacia la app Flask (WSGI en un hilo)
+    # -----------------------------
+    async def _call_wsgi(self, scope, body, send, receive):
+        """
+        Ejecuta la petición en la app Flask dentro de un solo hilo (los generadores
+        con stream_with_context deben abrir y cerrar su contexto en el mismo hilo)
+        y va enviando los fragmentos a medida que salen: SSE y NDJSON siguen en streaming.
+        Si el cliente se desconecta, el hilo deja de iterar y cierra el generador.
+        """
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue()
+        done = object()
+        gone = object()
+        cancelled = threading.Event()
+        environ = self._environ(scope, body)
+
+        def put(item):
+            try:
+                loop.call_soon_threadsafe(queue.put_nowait, item)
+            except RuntimeError:
+                pass  # el event loop ya cerró
+
+        def start_response(status, headers, exc_info=None):
+            put((
+                int(status.split(" ", 1)[0]),
+                [(k.lower().encode("latin-1"), v.encode("latin-1")) for k, v in headers],
+            ))
+
+        def run():
+            iterable = None
+            try:
+                iterable = self.wsgi_app(environ, start_response)
+                for chunk in iterable:
+                    if cancelled.is_set():
+                        break
+                    if chunk:
+                        put(chunk)
+            finally:
+                if hasattr(iterable, "close"):
+                    iterable.close()
+                put(done)
+
+        async def watch_disconnect():
+            # Con el cuerpo ya leído, el único mensaje que queda es http.disconnect
+            if (await receive())["type"] == "http.disconnect":
+                cancelled.set()
+                queue.put_nowait(gone)
+
+        worker = loop.run_in_executor(self.wsgi_executor, run)
+        watcher = asyncio.ensure_future(watch_disconnect())
+        try:
+            first = await queue.get()
+            if first is gone:
+                self._detach(worker)
+                return
+            if first is done:   # la app falló antes de responder
+                try:
+                    await worker
+                    error = "La aplicación no envió respuesta"
+                except Exception as e:
+                    error = str(e)
+                print(f"ERROR (Exception): {error}")
+                await self._send_json(send, 500, {"error": f"Error interno del servidor: {error}"})
+                return
+            status, headers = first
+            await send({"type": "http.response.start", "status": status, "headers": headers})
+            while True:
+                chunk = await queue.get()
+                if chunk is gone:   # el cliente se fue: no se envía nada más
+                    self._detach(worker)
+                    return
+                if chunk is done:
+                    break
+                await send({"type": "http.response.body", "body": chunk, "more_body": True})
+            try:
+                await worker
+            except Exception as e:
+                # El estado ya se envió: no hay 500 posible. Se corta sin el mensaje
+                # final para que el servidor cierre la conexión y el cliente vea
+                # una respuesta incompleta en vez de una que terminó bien.
+                print(f"ERROR (Exception) durante el streaming: {e}")
+                return
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+        finally:
+            watcher.cancel()
+
+    @staticmethod
+    def _detach(worker):
+        """
+        El hilo termina por su cuenta (en el siguiente fragmento); su error solo se registra.
+        """
+        def report(future):
+            if not future.cancelled() and future.exception() is not None:
+                print(f"ERROR (Exception) tras la desconexión: {future.exception()}")
+        worker.add_done_callback(report)
+
+    @staticmethod
+    def _environ(scope, body):
+        server = scope.get("server") or ("localhost", 80)
+        client = scope.get("client") or ("", 0)
+        environ = {
+            "REQUEST_METHOD": scope["method"],
+            "SCRIPT_NAME": scope.get("root_path", ""),
+            "PATH_INFO": scope["path"],
+            "QUERY_STRING": scope.get("query_string", b"").decode("latin-1"),
+            "SERVER_NAME": server[0],
+            "SERVER_PORT": str(server[1]),
+            "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+            "REMOTE_ADDR": client[0],
+            "CONTENT_LENGTH": str(len(body)),
+            "wsgi.version": (1, 0),
+            "wsgi.url_scheme": scope.get("scheme", "http"),
+            "wsgi.input": io.BytesIO(body),
+            "wsgi.errors": sys.stderr,
+            "wsgi.multithread": True,
+            "wsgi.multiprocess": False,
+            "wsgi.run_once": False,
+        }
+        for name, value in scope.get("headers", []):
+            key = name.decode("latin-1").upper().replace("-", "_")
+            value = value.decode("latin-1")
+            if key == "CONTENT_TYPE":
+                environ["CONTENT_TYPE"] = value
+            elif key != "CONTENT_LENGTH":
+                header = f"HTTP_{key}"
+                environ[header] = f"{environ[header]},{value}" if header in environ else value
+        return environ
+
+    # -----------------------------
+    # Utilidades ASGI
+    # -----------------------------
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                self.async_layer.executor.shutdown(wait=False)
+                self.wsgi_executor.shutdown(wait=False)
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    @staticmethod
+    async def _read_body(receive):
+        """
+        Lee el cuerpo completo; None si supera MAX_BODY_BYTES.
+        """
+        chunks, size = [], 0
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                break
+            chunk = message.get("body", b"")
+            size += len(chunk)
+            if size > MAX_BODY_BYTES:
+                return None
+            chunks.append(chunk)
+            if not message.get("more_body", False):
+                break
+        return b"".join(chunks)
+
+    @staticmethod
+    async def _send_json(send, status, payload, extra_headers=()):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        headers = [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]
+        await send({"type": "http.response.start", "status": status, "headers": headers + list(extra_headers)})
+        await send({"type": "http.response.body", "body": body})
+
+
+app = TerraGuardASGI(flask_app, risk_model)
+
+
+if __name__ == "__main__":
+    try:
+        import uvicorn
+    except ImportError:
+        sys.exit("Instala uvicorn para el modo asíncrono: pip install uvicorn")
+    # Un proceso con event loop; la concurrencia la dan las peticiones en vuelo, no los workers
+    uvicorn.run("asgi:app", host="0.0.0.0", port=5000)
@@ -0,0 +1,263 @@
+# business_layer/accumulation.py
+"""
+Acumulación de exposición por celdas: cuánto valor asegurado (y con qué
+riesgo) hay concentrado en cada celda de una rejilla lat/lon.
+
+Cada póliza suma su valor asegurado y su riesgo (de RiskModel) a los
+agregados de su celda. Los agregados se actualizan al agregar o quitar
+pólizas, así que las consultas (top N celdas, exposición dentro de R km)
+leen los agregados y no recorren la cartera. En una consulta por radio,
+las celdas enteras dentro del círculo suman su agregado; solo las del
+borde revisan sus pólizas una por una.
+"""
+import argparse
+import heapq
+import math
+
+import numpy as np
+
+from business_layer.rules import InsuranceRules
+from data_layer.spatial_index import KM_PER_DEG, haversine_np
+
+# Métricas de RiskModel que se acumulan ponderadas por valor asegurado
+ACCUMULATED_METRICS = ("seismic", "flood", "hurricane", "fire")
+BANDS = ("low", "medium", "high")
+
+
+class _Cell:
+    __slots__ = ("policies", "exposure", "risk_weighted", "metric_weighted", "band_exposure")
+
+    def __init__(self):
+        self.policies = {}   # id → (lon, lat, valor, riesgo)
+        self.exposure = 0.0
+        self.risk_weighted = 0.0
+        self.metric_weighted = dict.fromkeys(ACCUMULATED_METRICS, 0.0)
+        self.band_exposure = dict.fromkeys(BANDS, 0.0)
+
+
+class ExposureGrid:
+    """
+    Agregados por celda de cell_deg grados: exposición total, exposición
+    ponderada por riesgo (valor * riesgo / 100), exposición ponderada por
+    métrica y exposición por banda de riesgo (umbrales de InsuranceRules).
+    """
+    def __init__(self, cell_deg=0.1, rules=None):
+        self.cell_deg = float(cell_deg)
+        self.thresholds = (rules or InsuranceRules()).thresholds
+        self.cells = {}
+        self._policy_cell = {}   # id → celda, para quitar/reemplazar sin buscar
+
+    def __len__(self):
+        return len(self._policy_cell)
+
+    def _band(self, risk):
+        if risk <= self.thresholds['low']:
+            return "low"
+        if risk <= self.thresholds['medium']:
+            return "medium"
+        return "high"
+
+    def _apply(self, cell, value, risk, metrics, sign):
+        cell.exposure += sign * value
+        cell.risk_weighted += sign * value * risk / 100.0
+        for m in ACCUMULATED_METRICS:
+            cell.metric_weighted[m] += sign * value * metrics.get(m, 0.0) / 100.0
+        cell.band_exposure[self._band(risk)] += sign * value
+
+    # -----------------------------
+    # Altas y bajas
+    # -----------------------------
+    def add(self, policy_id, lon, lat, insured_value, risk_percent, metrics=None):
+        """
+        Agrega (o reemplaza, si el id ya existe) una póliza.
+        metrics: {métrica: %} de RiskModel (opcional).
+        """
+        if policy_id in self._policy_cell:
+            self.remove(policy_id)
+        key = (math.floor(lon / self.cell_deg), math.floor(lat / self.cell_deg))
+        cell = self.cells.get(key)
+        if cell is None:
+            cell = self.cells[key] = _Cell()
+        metrics = {m: float(metrics[m]) for m in ACCUMULATED_METRICS if metrics and m in metrics}
+        value, risk = float(insured_value), float(risk_percent)
+        cell.policies[policy_id] = (float(lon), float(lat), value, risk, metrics)
+        self._apply(cell, value, risk, metrics, +1)
+        self._policy_cell[policy_id] = key
+
+    def add_batch(self, ids, lons, lats, insured_values, risk_percents, metrics=None):
+        """
+        Agrega muchas pólizas; metrics: {métrica: array} (p. ej. de calculate_risk_batch).
+        Las filas con valor o riesgo NaN se ignoran. Devuelve cuántas se agregaron.
+        """
+        lons, lats = np.asarray(lons, dtype=float), np.asarray(lats, dtype=float)
+        values, risks = np.asarray(insured_values, dtype=float), np.asarray(risk_percents, dtype=float)
+        metric_cols = {m: np.asarray(metrics[m], dtype=float)
+                       for m in ACCUMULATED_METRICS if metrics and m in metrics}
+        keep = ~(np.isnan(lons) | np.isnan(lats) | np.isnan(values) | np.isnan(risks))
+        added = 0
+        for i in np.flatnonzero(keep):
+            row_metrics = {m: col[i] for m, col in metric_cols.items() if not np.isnan(col[i])}
+            self.add(ids[i], lons[i], lats[i], values[i], risks[i], row_metrics)
+            added += 1
+        return added
+
+    def remove(self, policy_id):
+        """
+        Quita una póliza; devuelve False si no estaba.
+        """
+        key = self._policy_cell.pop(policy_id, None)
+        if key is None:
+            return False
+        cell = self.cells[key]
+        _, _, value, risk, metrics = cell.policies.pop(policy_id)
+        self._apply(cell, value, risk, metrics, -1)
+        if not cell.policies:
+            del self.cells[key]
+        return True
+
+    # -----------------------------
+    # Consultas
+    # -----------------------------
+    def cell_summary(self, key):
+        cell = self.cells[key]
+        min_lon, min_lat = key[0] * self.cell_deg, key[1] * self.cell_deg
+        return {
+            "cell": list(key),
+            "bbox": [min_lon, min_lat, min_lon + self.cell_deg, min_lat + self.cell_deg],
+            "policies": len(cell.policies),
+            "exposure": cell.exposure,
+            "risk_weighted_exposure": cell.risk_weighted,
+            "mean_risk": 100.0 * cell.risk_weighted / cell.exposure if cell.exposure else 0.0,
+            "metric_weighted_exposure": dict(cell.metric_weighted),
+            "exposure_by_band": dict(cell.band_exposure),
+        }
+
+    def top_cells(self, n=10, by="risk_weighted_exposure"):
+        """
+        Las n celdas con mayor valor en by: "exposure", "risk_weighted_exposure",
+        "mean_risk", una métrica de ACCUMULATED_METRICS (exposición ponderada
+        por esa métrica) o una banda de BANDS (exposición en esa banda).
+        """
+        if by == "exposure":
+            score = lambda cell: cell.exposure
+        elif by == "risk_weighted_exposure":
+            score = lambda cell: cell.risk_weighted
+        elif by == "mean_risk":
+            score = lambda cell: cell.risk_weighted / cell.exposure if cell.exposure else 0.0
+        elif by in ACCUMULATED_METRICS:
+            score = lambda cell: cell.metric_weighted[by]
+        elif by in BANDS:
+            score = lambda cell: cell.band_exposure[by]
+        else:
+            raise ValueError(f"Criterio desconocido: {by}")
+        top = heapq.nlargest(n, self.cells.items(), key=lambda item: score(item[1]))
+        return [self.cell_summary(key) for key, _ in top]
+
+    def exposure_within(self, lon, lat, radius_km):
+        """
+        Exposición (total, ponderada por riesgo, por banda y nº de pólizas)
+        dentro de radius_km de un punto.
+        """
+        totals = {"policies": 0, "exposure": 0.0, "risk_weighted_exposure": 0.0,
+                  "exposure_by_band": dict.fromkeys(BANDS, 0.0)}
+        keys = self._candidate_cells(lon, lat, radius_km)
+        if not keys:
+            return totals
+
+        cx = np.array([k[0] for k in keys], dtype=float)
+        cy = np.array([k[1] for k in keys], dtype=float)
+        min_lon, min_lat = cx * self.cell_deg, cy * self.cell_deg
+        max_lon, max_lat = min_lon + self.cell_deg, min_lat + self.cell_deg
+        # Celda entera dentro del círculo ⇔ su esquina más lejana está dentro
+        far = np.max([haversine_np(lon, lat, x, y)
+                      for x in (min_lon, max_lon) for y in (min_lat, max_lat)], axis=0)
+        # Punto de la celda más cercano (para descartar celdas fuera del círculo);
+        # la longitud del punto se lleva a +/-180° del centro de cada celda
+        center = min_lon + self.cell_deg / 2
+        plon = center + (lon - center + 180.0) % 360.0 - 180.0
+        near = haversine_np(lon, lat, np.clip(plon, min_lon, max_lon), np.clip(lat, min_lat, max_lat))
+
+        for key, far_km, near_km in zip(keys, far, near):
+            if near_km > radius_km:
+                continue
+            cell = self.cells[key]
+            if far_km <= radius_km:
+                totals["policies"] += len(cell.policies)
+                totals["exposure"] += cell.exposure
+                totals["risk_weighted_exposure"] += cell.risk_weighted
+                for band in BANDS:
+                    totals["exposure_by_band"][band] += cell.band_exposure[band]
+                continue
+            rows = list(cell.policies.values())
+            plons = np.array([r[0] for r in rows])
+            plats = np.array([r[1] for r in rows])
+            inside = haversine_np(lon, lat, plons, plats) <= radius_km
+            for row, is_inside in zip(rows, inside):
+                if is_inside:
+                    _, _, value, risk, _ = row
+                    totals["policies"] += 1
+                    totals["exposure"] += value
+                    totals["risk_weighted_exposure"] += value * risk / 100.0
+                    totals["exposure_by_band"][self._band(risk)] += value
+        return totals
+
+    def _candidate_cells(self, lon, lat, radius_km):
+        """
+        Celdas con pólizas que tocan la caja del círculo. Si la caja cruza el
+        antimeridiano se parte en dos tramos de longitud.
+        """
+        dlat = radius_km / KM_PER_DEG
+        cos_lat = math.cos(math.radians(min(89.0, abs(lat) + dlat)))
+        dlon = 180.0 if dlat >= 90 else min(180.0, radius_km / (KM_PER_DEG * max(cos_lat, 1e-6)))
+        lo, hi = lon - dlon, lon + dlon
+        if dlon >= 180.0:
+            spans = [(-180.0, 180.0)]
+        elif lo < -180.0:
+            spans = [(lo + 360.0, 180.0), (-180.0, hi)]
+        elif hi > 180.0:
+            spans = [(lo, 180.0), (-180.0, hi - 360.0)]
+        else:
+            spans = [(lo, hi)]
+        x_ranges = [(math.floor(a / self.cell_deg), math.floor(b / self.cell_deg)) for a, b in spans]
+        cy0, cy1 = math.floor((lat - dlat) / self.cell_deg), math.floor((lat + dlat) / self.cell_deg)
+        if sum(x1 - x0 + 1 for x0, x1 in x_ranges) * (cy1 - cy0 + 1) > len(self.cells):
+            return [k for k in self.cells
+                    if cy0 <= k[1] <= cy1 and any(x0 <= k[0] <= x1 for x0, x1 in x_ranges)]
+        keys = {(x, y) for x0, x1 in x_ranges for x in range(x0, x1 + 1) for y in range(cy0, cy1 + 1)}
+        return sorted(k for k in keys if k in self.cells)
+
+
+def from_portfolio_results(path, cell_deg=0.1, chunk_size=200_000):
+    """
+    Arma la rejilla desde la salida de PortfolioPipeline (CSV o Parquet).
+    """
+    from business_layer.portfolio import read_policies
+
+    grid = ExposureGrid(cell_deg)
+    for chunk in read_policies(path, chunk_size):
+        metrics = {m: chunk[f"{m}_percent"].to_numpy() for m in ACCUMULATED_METRICS
+                   if f"{m}_percent" in chunk}
+        grid.add_batch(chunk["id"].to_numpy(), chunk["lon"].to_numpy(), chunk["lat"].to_numpy(),
+                       chunk["insured_value"].to_numpy(), chunk["risk_percent"].to_numpy(), metrics)
+    return grid
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Concentración de exposición de una cartera ya puntuada.")
+    parser.add_argument("path", help="Salida de business_layer/portfolio.py (.csv o .parquet)")
+    parser.add_argument("--cell", type=float, default=0.1, help="Tamaño de celda en grados")
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--by", default="risk_weighted_exposure")
+    parser.add_argument("--point", type=float, nargs=3, metavar=("LON", "LAT", "RADIUS_KM"), default=None)
+    args = parser.parse_args()
+
+    grid = from_portfolio_results(args.path, args.cell)
+    print(f"🧮 {len(grid)} pólizas en {len(grid.cells)} celdas de {args.cell}°")
+    for rank, cell in enumerate(grid.top_cells(args.top, args.by), 1):
+        print(f"  {rank:>3}. celda {cell['cell']}: exposición {cell['exposure']:,.0f}, "
+              f"ponderada por riesgo {cell['risk_weighted_exposure']:,.0f} ({cell['policies']} pólizas)")
+    if args.point:
+        lon, lat, radius = args.point
+        totals = grid.exposure_within(lon, lat, radius)
+        print(f"📍 A {radius} km de ({lat}, {lon}): exposición {totals['exposure']:,.0f} "
+              f"en {totals['policies']} pólizas")
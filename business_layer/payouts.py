@@ -0,0 +1,162 @@
+# business_layer/payouts.py
+"""
+Motor de pagos paramétricos.
+
+Cada producto define disparadores por tipo de evento observado (lluvia
+acumulada en 24 h, sismo) con un radio y escalones (umbral → fracción del
+valor asegurado). Los eventos llegan por lotes; cada evento consulta un
+GridIndex de las ubicaciones de las pólizas y solo evalúa las pólizas
+dentro del radio de su disparador. Los pagos se acumulan por póliza hasta
+el valor asegurado, así el motor puede recibir un flujo continuo de lotes;
+cada par (evento, póliza) paga una sola vez aunque el evento se repita.
+"""
+import numpy as np
+import pandas as pd
+
+from data_layer.spatial_index import GridIndex
+
+# producto → disparadores; tiers: (umbral, fracción) en orden ascendente
+TRIGGERS = {
+    "standard": (
+        {"kind": "precipitation_24h", "radius_km": 25, "tiers": ((100, 0.25), (150, 0.5), (250, 1.0))},
+        {"kind": "earthquake", "radius_km": 50, "tiers": ((6.0, 0.25), (6.5, 0.5), (7.0, 1.0))},
+    ),
+    "earthquake_only": (
+        {"kind": "earthquake", "radius_km": 100, "tiers": ((5.5, 0.1), (6.5, 0.5), (7.5, 1.0))},
+    ),
+}
+
+
+def tier_fraction(tiers, value):
+    """
+    Fracción del escalón más alto alcanzado por value (0 si ninguno).
+    """
+    fraction = 0.0
+    for threshold, tier_payout in tiers:
+        if value >= threshold:
+            fraction = tier_payout
+    return fraction
+
+
+class PayoutEngine:
+    """
+    Pólizas (id, lon, lat, valor asegurado, producto) indexadas por ubicación.
+    paid: pagos acumulados por póliza (nunca superan el valor asegurado).
+    processed: pares (event_id, policy_id) ya evaluados, para no pagar dos veces.
+    """
+    def __init__(self, ids, lons, lats, insured_values, products=None, triggers=TRIGGERS, cell_deg=0.25):
+        self.ids = np.asarray(ids)
+        self.insured = np.asarray(insured_values, dtype=float)
+        self.triggers = triggers
+        self.index = GridIndex(lons, lats, cell_deg)
+        self.paid = np.zeros(len(self.ids))
+        self.processed = set()
+
+        names = sorted(triggers)
+        products = np.full(len(self.ids), "standard") if products is None else np.asarray(products)
+        unknown = set(np.unique(products)) - set(names)
+        if unknown:
+            raise ValueError(f"Productos sin disparadores definidos: {sorted(unknown)}")
+        self.product_codes = np.searchsorted(names, products)
+
+        # tipo de evento → [(código de producto, radio, escalones)] y radio máximo
+        self._by_kind = {}
+        for code, name in enumerate(names):
+            for trigger in triggers[name]:
+                self._by_kind.setdefault(trigger["kind"], []).append(
+                    (code, trigger["radius_km"], trigger["tiers"]))
+        self._max_radius = {kind: max(t[1] for t in rules) for kind, rules in self._by_kind.items()}
+
+    def process(self, events):
+        """
+        events: DataFrame (o dict de columnas) con kind, lon, lat, value
+        y opcionalmente event_id (sin él, el evento se identifica por
+        kind, lon, lat y value). Devuelve un DataFrame con una fila por
+        pago (event_id, policy_id, fraction, amount) y actualiza paid.
+        Un evento ya procesado para una póliza (p. ej. un lote reenviado)
+        no vuelve a pagarle.
+        """
+        events = pd.DataFrame(events)
+        if "event_id" in events:
+            event_ids = events["event_id"].to_numpy()
+        else:
+            event_ids = [f"{kind}@{lon},{lat}:{value}" for kind, lon, lat, value
+                         in zip(events["kind"], events["lon"], events["lat"], events["value"])]
+        out_events, out_policies, out_fractions, out_amounts = [], [], [], []
+
+        for event_id, kind, lon, lat, value in zip(event_ids, events["kind"], events["lon"],
+                                                   events["lat"], events["value"]):
+            rules = self._by_kind.get(kind)
+            if not rules:
+                continue
+            idx, dist = self.index.query_radius(lon, lat, self._max_radius[kind])
+            if not len(idx):
+                continue
+
+            # 🔹 Fracción por póliza: el escalón más alto entre los disparadores de su producto
+            codes = self.product_codes[idx]
+            fraction = np.zeros(len(idx))
+            for code, radius_km, tiers in rules:
+                tier_payout = tier_fraction(tiers, value)
+                if tier_payout > 0:
+                    hit = (codes == code) & (dist <= radius_km)
+                    fraction[hit] = np.maximum(fraction[hit], tier_payout)
+
+            # 🔹 Un par (evento, póliza) ya procesado no se vuelve a pagar
+            hit = fraction > 0
+            hit &= np.array([(event_id, pid) not in self.processed for pid in self.ids[idx].tolist()], dtype=bool)
+            if not hit.any():
+                continue
+            idx, fraction = idx[hit], fraction[hit]
+            self.processed.update((event_id, pid) for pid in self.ids[idx].tolist())
+            # 🔹 Tope: lo pagado por póliza no supera su valor asegurado
+            amount = np.minimum(fraction * self.insured[idx], self.insured[idx] - self.paid[idx])
+            self.paid[idx] += amount
+
+            out_events.append(np.full(len(idx), event_id, dtype=object))
+            out_policies.append(self.ids[idx])
+            out_fractions.append(fraction)
+            out_amounts.append(amount)
+
+        if not out_events:
+            return pd.DataFrame({"event_id": [], "policy_id": [], "fraction": [], "amount": []})
+        return pd.DataFrame({
+            "event_id": np.concatenate(out_events),
+            "policy_id": np.concatenate(out_policies),
+            "fraction": np.concatenate(out_fractions),
+            "amount": np.concatenate(out_amounts),
+        })
+
+    def totals(self):
+        """
+        Pagos acumulados por póliza (solo las que han recibido algo).
+        """
+        paid = self.paid > 0
+        return dict(zip(self.ids[paid].tolist(), self.paid[paid].tolist()))
+
+
+# -----------------------------
+# Eventos observados desde las fuentes de data_layer
+# -----------------------------
+def precipitation_events(hourly_mm, lon, lat, event_id="precipitation"):
+    """
+    Evento de lluvia con el máximo acumulado en 24 h de una serie horaria (mm).
+    """
+    hourly = pd.Series(hourly_mm, dtype=float).fillna(0)
+    total_24h = float(hourly.rolling(24, min_periods=1).sum().max()) if len(hourly) else 0.0
+    return pd.DataFrame({"event_id": [event_id], "kind": ["precipitation_24h"],
+                         "lon": [lon], "lat": [lat], "value": [total_24h]})
+
+
+def quake_events(catalog, since, min_mag=None):
+    """
+    Sismos del catálogo local posteriores a since (epoch) como eventos.
+    """
+    rows = catalog.events_since(since, min_mag)
+    return pd.DataFrame({
+        "event_id": [r[0] for r in rows],
+        "kind": "earthquake",
+        "lon": [r[2] for r in rows],
+        "lat": [r[3] for r in rows],
+        "value": [r[4] if r[4] is not None else 0.0 for r in rows],
+    })
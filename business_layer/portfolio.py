@@ -0,0 +1,226 @@
+# business_layer/portfolio.py
+"""
+Suscripción de carteras completas (CSV o Parquet con una póliza por fila).
+
+La entrada se lee por bloques. En cada bloque se deduplican las coordenadas;
+solo las ubicaciones únicas pasan por get_factors_batch y calculate_risk_batch.
+Las reglas de InsuranceRules se aplican con máscaras vectorizadas. Cada
+bloque se escribe en cuanto está listo, así que la memoria queda acotada
+por chunk_size y no por el tamaño de la cartera.
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from business_layer.rules import InsuranceRules
+
+REQUIRED_COLUMNS = ("id", "lat", "lon", "insured_value")
+METRICS = ("seismic", "flood", "hurricane", "fire", "temperature", "humidity",
+           "wind", "precipitation", "vegetation", "elevation")
+# Decimales para deduplicar coordenadas (~1 m)
+COORD_DECIMALS = 5
+# Columnas de texto de la salida (pueden venir vacías en un bloque entero)
+TEXT_COLUMNS = ("error", "insurability", "policy_types", "mitigation_actions", "explanation")
+
+
+def _is_parquet(path):
+    return os.path.splitext(path)[1].lower() in (".parquet", ".pq")
+
+
+def read_policies(path, chunk_size):
+    """
+    Genera DataFrames de como mucho chunk_size filas.
+    """
+    if _is_parquet(path):
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, chunksize=chunk_size)
+
+
+class _ResultWriter:
+    """
+    Escribe bloques de resultados en Parquet (un row group por bloque) o CSV.
+    El esquema Parquet se declara en el primer bloque: texto para TEXT_COLUMNS
+    y float64 para las numéricas, así un bloque sin errores (columna toda None)
+    no fija un tipo null que el siguiente bloque no podría usar.
+    """
+    def __init__(self, path):
+        self.path = path
+        self._writer = None
+        self._schema = None
+        self._csv_header = True
+
+    def write(self, frame):
+        if _is_parquet(self.path):
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            if self._schema is None:
+                self._schema = self._parquet_schema(frame)
+                self._writer = pq.ParquetWriter(self.path, self._schema)
+            table = pa.Table.from_pandas(frame, schema=self._schema, preserve_index=False)
+            self._writer.write_table(table)
+        else:
+            frame.to_csv(self.path, mode="w" if self._csv_header else "a",
+                         header=self._csv_header, index=False)
+            self._csv_header = False
+
+    @staticmethod
+    def _parquet_schema(frame):
+        import pyarrow as pa
+        id_type = pa.Table.from_pandas(frame[["id"]], preserve_index=False).schema.field("id").type
+        fields = []
+        for column in frame.columns:
+            if column == "id":
+                fields.append(pa.field(column, pa.string() if pa.types.is_null(id_type) else id_type))
+            elif column in TEXT_COLUMNS:
+                fields.append(pa.field(column, pa.string()))
+            else:
+                fields.append(pa.field(column, pa.float64()))
+        return pa.schema(fields)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+
+
+class PortfolioPipeline:
+    """
+    Lee pólizas (id, lat, lon, insured_value), puntúa cada ubicación única
+    y escribe riesgo, métricas y reglas de negocio por póliza.
+    """
+    def __init__(self, risk_model=None, rules=None, chunk_size=50_000, target_year=None, explain=False):
+        if risk_model is None:
+            from processing_layer.risk_model import RiskModel
+            risk_model = RiskModel()
+        self.risk_model = risk_model
+        self.rules = rules or InsuranceRules()
+        self.chunk_size = chunk_size
+        self.target_year = target_year
+        # explain=True agrega una explicación del modelo por póliza; las
+        # ubicaciones con la misma banda/factores/región comparten una sola generación
+        self.explain = explain
+
+    def run(self, input_path, output_path):
+        """
+        Procesa toda la cartera y devuelve un resumen (filas, ubicaciones, tiempo).
+        """
+        writer = _ResultWriter(output_path)
+        summary = {"rows": 0, "locations": 0, "invalid": 0, "insured_value": 0.0, "seconds": 0.0}
+        start = time.time()
+        try:
+            for chunk in read_policies(input_path, self.chunk_size):
+                result = self.process_chunk(chunk)
+                writer.write(result)
+
+                summary["rows"] += len(result)
+                summary["locations"] += int(result.attrs.get("locations", 0))
+                summary["invalid"] += int(result["error"].notna().sum())
+                summary["insured_value"] += float(result["insured_value"].sum())
+                elapsed = time.time() - start
+                print(f"  📦 {summary['rows']} pólizas ({summary['locations']} ubicaciones únicas), "
+                      f"{summary['rows'] / max(elapsed, 1e-9):.0f} pólizas/s")
+        finally:
+            writer.close()
+        summary["seconds"] = round(time.time() - start, 2)
+        return summary
+
+    def process_chunk(self, chunk):
+        """
+        Puntúa un bloque de pólizas y devuelve el DataFrame de resultados.
+        """
+        missing = [c for c in REQUIRED_COLUMNS if c not in chunk.columns]
+        if missing:
+            raise ValueError(f"Faltan columnas en la cartera: {missing}")
+
+        lons = pd.to_numeric(chunk["lon"], errors="coerce").to_numpy(dtype=float)
+        lats = pd.to_numeric(chunk["lat"], errors="coerce").to_numpy(dtype=float)
+        lons, lats, valid = self._validate_coords(lons, lats)
+
+        out = pd.DataFrame({
+            "id": chunk["id"].to_numpy(),
+            "lat": lats,
+            "lon": lons,
+            "insured_value": pd.to_numeric(chunk["insured_value"], errors="coerce").to_numpy(dtype=float),
+        })
+        out["error"] = np.where(valid, None, "Coordenadas inválidas")
+
+        # 🔹 Solo las ubicaciones únicas se consultan y puntúan
+        coords = np.round(np.column_stack([lons[valid], lats[valid]]), COORD_DECIMALS)
+        unique, inverse = np.unique(coords, axis=0, return_inverse=True)
+        inverse = inverse.ravel()
+        out.attrs["locations"] = len(unique)
+
+        size = len(out)
+        risk = np.full(size, np.nan)
+        metrics = {m: np.full(size, np.nan) for m in METRICS}
+        factors = {}
+        explanations = np.full(size, None, dtype=object)
+        if len(unique):
+            unique_factors = self.risk_model.get_factors_batch(unique[:, 0], unique[:, 1],
+                                                               target_year=self.target_year)
+            scored = self.risk_model.calculate_risk_batch(unique_factors)
+            risk[valid] = scored["risk_percent"][inverse]
+            for m in METRICS:
+                metrics[m][valid] = scored["metrics_percent"][m][inverse]
+            for key, values in unique_factors.items():
+                factors[key] = np.full(size, np.nan)
+                factors[key][valid] = np.asarray(values, dtype=float)[inverse]
+            if self.explain:
+                explanations[valid] = self._explain(unique, scored)[inverse]
+
+        out["risk_percent"] = risk
+        for m in METRICS:
+            out[f"{m}_percent"] = metrics[m]
+
+        # 🔹 Reglas de negocio vectorizadas (las filas inválidas quedan vacías)
+        if not factors:
+            factors = {"flood_rate": np.full(size, np.nan)}
+        out["insurability"] = np.where(valid, self.rules.evaluate_insurability_batch(risk), None)
+        out["policy_types"] = np.where(valid, self.rules.suggest_policy_type_batch(factors), None)
+        out["mitigation_actions"] = np.where(valid, self.rules.mitigation_actions_batch(risk, factors), None)
+        if self.explain:
+            out["explanation"] = explanations
+        return out
+
+    @staticmethod
+    def _explain(unique, scored):
+        from ai_layer.predictor import explain_batch
+        from ai_layer.slots import ModelSlots
+
+        items = [
+            (scored["risk_percent"][i], (unique[i, 1], unique[i, 0]),
+             {m: scored["metrics_percent"][m][i] for m in METRICS})
+            for i in range(len(unique))
+        ]
+        return np.array(explain_batch(items, slots=ModelSlots()), dtype=object)
+
+    @staticmethod
+    def _validate_coords(lons, lats):
+        """
+        Versión vectorizada de validate_coords (app.py): intercambia lat/lon
+        invertidos y marca como inválidas las coordenadas imposibles.
+        """
+        ok = (np.abs(lons) <= 180) & (np.abs(lats) <= 90)
+        swapped = ~ok & (np.abs(lats) <= 180) & (np.abs(lons) <= 90)
+        lons, lats = np.where(swapped, lats, lons), np.where(swapped, lons, lats)
+        return lons, lats, ok | swapped
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Suscripción por lotes de una cartera de pólizas.")
+    parser.add_argument("input", help="CSV o Parquet con columnas id, lat, lon, insured_value")
+    parser.add_argument("output", help="Archivo de salida (.parquet o .csv)")
+    parser.add_argument("--chunk-size", type=int, default=50_000, help="Pólizas por bloque")
+    parser.add_argument("--year", type=int, default=None, help="Año objetivo (proyección)")
+    parser.add_argument("--explain", action="store_true", help="Agregar explicación del modelo por póliza")
+    args = parser.parse_args()
+
+    print(f"🏠 Procesando cartera {args.input} → {args.output}")
+    result = PortfolioPipeline(chunk_size=args.chunk_size, target_year=args.year, explain=args.explain).run(args.input, args.output)
+    print(f"✅ {result['rows']} pólizas en {result['seconds']}s "
+          f"({result['invalid']} inválidas, valor asegurado total {result['insured_value']:,.0f})")
@@ -1,3 +1,23 @@
+import numpy as np
+
+from business_layer.payouts import TRIGGERS, PayoutEngine
+
+# Reglas de suggest_policy_type / mitigation_actions como (clave, valor por defecto, comparación, umbral, texto).
+# El orden es el de las listas que devuelven los métodos escalares.
+POLICY_RULES = (
+    ("flood_rate", 0, "gt", 2, "Cobertura contra inundaciones"),
+    ("seismic_rate", 0, "gt", 2, "Cobertura sísmica"),
+    ("hurricane_rate", 0, "gt", 1, "Cobertura por huracanes"),
+    ("fire_rate", 0, "gt", 1, "Cobertura contra incendios"),
+    ("volcano_distance_km", 1000, "lt", 50, "Cobertura por actividad volcánica"),
+    ("temperature", 0, "gt", 40, "Cobertura por ola de calor / daños climáticos"),
+)
+MITIGATION_RULES = (
+    ("flood_rate", 0, "gt", 2, "Instalar drenaje o barreras anti-inundación"),
+    ("vegetation", 0, "lt", 0.3, "Aumentar cobertura vegetal / protección contra erosión"),
+    ("volcano_distance_km", 1000, "lt", 50, "Revisar planes de evacuación y seguros especializados"),
+)
+
 class InsuranceRules:
     """
     Define reglas de negocio para decidir:
@@ -80,3 +100,63 @@ class InsuranceRules:
 
         return actions if actions else ["No se requieren acciones adicionales"]
 
+    # -----------------------------
+    # Versiones por lotes (carteras): mismas reglas con máscaras de numpy
+    # -----------------------------
+    def evaluate_insurability_batch(self, risk_scores):
+        risk_scores = np.asarray(risk_scores, dtype=float)
+        return np.select(
+            [risk_scores <= self.thresholds['low'], risk_scores <= self.thresholds['medium']],
+            ["Asegurable estándar", "Asegurable con prima elevada / medidas de mitigación"],
+            default="No asegurable o medidas obligatorias",
+        ).astype(object)
+
+    def suggest_policy_type_batch(self, factors, sep="; "):
+        """
+        factors: {clave: array} (p. ej. RiskModel.get_factors_batch; NaN = falta).
+        Devuelve un array de textos con las coberturas unidas por sep.
+        """
+        masks = [self._rule_mask(factors, rule) for rule in POLICY_RULES]
+        return self._join_rules(masks, [rule[4] for rule in POLICY_RULES], "Cobertura estándar", sep)
+
+    def mitigation_actions_batch(self, risk_scores, factors, sep="; "):
+        risk_scores = np.asarray(risk_scores, dtype=float)
+        masks = [risk_scores > self.thresholds['medium']]
+        masks += [self._rule_mask(factors, rule) for rule in MITIGATION_RULES]
+        labels = ["Evaluar reubicación de la propiedad"] + [rule[4] for rule in MITIGATION_RULES]
+        return self._join_rules(masks, labels, "No se requieren acciones adicionales", sep)
+
+    @staticmethod
+    def _rule_mask(factors, rule):
+        key, default, op, limit, _ = rule
+        size = len(next(iter(factors.values())))
+        values = np.asarray(factors[key], dtype=float) if key in factors else np.full(size, np.nan)
+        values = np.where(np.isnan(values), default, values)  # como factors.get(key, default)
+        return values > limit if op == "gt" else values < limit
+
+    @staticmethod
+    def _join_rules(masks, labels, empty, sep):
+        """
+        Codifica las reglas que aplican en cada fila como bits y arma el texto
+        una vez por combinación distinta (a lo sumo 2**len(labels)).
+        """
+        codes = np.zeros(len(masks[0]), dtype=np.int64)
+        for bit, mask in enumerate(masks):
+            codes |= mask.astype(np.int64) << bit
+        unique, inverse = np.unique(codes, return_inverse=True)
+        texts = np.empty(len(unique), dtype=object)
+        for i, code in enumerate(unique):
+            chosen = [label for bit, label in enumerate(labels) if code >> bit & 1]
+            texts[i] = sep.join(chosen) if chosen else empty
+        return texts[inverse.ravel()]
+
+
+
+def compute_payout(events, insured_value, lon, lat, product="standard", triggers=TRIGGERS):
+    """
+    Pago paramétrico de una sola póliza ante los eventos observados
+    (ver business_layer/payouts.py). Para carteras usar PayoutEngine directamente.
+    """
+    engine = PayoutEngine([0], [lon], [lat], [insured_value], [product], triggers)
+    engine.process(events)
+    return float(engine.paid[0])
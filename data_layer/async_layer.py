@@ -0,0 +1,73 @@
+# data_layer/async_layer.py
+"""
+Llamadas a DataLayer desde código asyncio.
+
+Los clientes de Earth Engine y requests son bloqueantes, así que cada
+llamada corre en un pool de hilos acotado; lo que se vuelve asíncrono es la
+espera. Cada fuente externa tiene su propio semáforo (UPSTREAM_LIMITS):
+cientos de análisis pueden estar en curso en el event loop, pero a cada
+fuente solo le llegan a la vez tantas llamadas como su límite. Si una
+llamada no consigue lugar en queue_timeout segundos se lanza UpstreamBusyError
+(contrapresión: el servidor responde 503 en vez de encolar sin fin).
+"""
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+# fuente → llamadas simultáneas como máximo
+UPSTREAM_LIMITS = {
+    "earth_engine": 40,
+    "open_meteo": 32,
+    "usgs": 16,
+    "noaa": 8,
+    "firms": 8,
+    "local": 32,
+}
+
+
+class UpstreamBusyError(RuntimeError):
+    """La fuente ya tiene todas sus llamadas ocupadas y la cola no avanzó a tiempo."""
+
+
+class AsyncDataLayer:
+    def __init__(self, limits=None, queue_timeout=10.0):
+        self.limits = dict(UPSTREAM_LIMITS, **(limits or {}))
+        self.queue_timeout = queue_timeout
+        self.executor = ThreadPoolExecutor(max_workers=sum(self.limits.values()),
+                                           thread_name_prefix="upstream")
+        self._semaphores = {}
+        self.waiting = dict.fromkeys(self.limits, 0)
+
+    def _semaphore(self, source):
+        # Se crean dentro del event loop que las usa
+        if source not in self._semaphores:
+            self._semaphores[source] = asyncio.Semaphore(self.limits[source])
+        return self._semaphores[source]
+
+    async def run(self, source, fn, *args, **kwargs):
+        """
+        Ejecuta fn(*args, **kwargs) (bloqueante) respetando el límite de source.
+        """
+        semaphore = self._semaphore(source)
+        self.waiting[source] += 1
+        try:
+            await asyncio.wait_for(semaphore.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            raise UpstreamBusyError(f"Fuente '{source}' saturada ({self.limits[source]} llamadas en curso)")
+        finally:
+            self.waiting[source] -= 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, functools.partial(fn, *args, **kwargs))
+        finally:
+            semaphore.release()
+
+    def stats(self):
+        return {
+            source: {
+                "limit": limit,
+                "in_flight": limit - self._semaphores[source]._value if source in self._semaphores else 0,
+                "waiting": self.waiting[source],
+            }
+            for source, limit in self.limits.items()
+        }
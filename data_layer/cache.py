@@ -0,0 +1,248 @@
+# data_layer/cache.py
+"""
+Caché persistente (SQLite) delante de los métodos de DataLayer.
+
+Cada fuente tiene su resolución nativa y su frescura: la clave se arma
+ajustando la coordenada a la celda de la fuente, así que dos propiedades
+vecinas dentro de la misma celda comparten la entrada. Las entradas
+caducan por TTL y, si se supera max_entries, se expulsan las menos usadas (LRU).
+"""
+import functools
+import inspect
+import json
+import math
+import os
+import sqlite3
+import threading
+import time
+
+from data_layer.single_flight import SingleFlight
+
+CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "terraguard.sqlite")
+
+DAY = 24 * 3600
+
+# fuente → resolución de la celda (grados) y TTL en segundos (None = no caduca)
+SOURCE_SPECS = {
+    "flood": {"grid_deg": 1.0 / 1200, "ttl": None},       # GLOFAS ~90 m, estático
+    "elevation": {"grid_deg": 1.0 / 3600, "ttl": None},   # SRTM 30 m, estático
+    "ndvi": {"grid_deg": 1.0 / 120, "ttl": 16 * DAY},     # MODIS 1 km, compuesto de 16 días
+    "weather": {"grid_deg": 0.1, "ttl": 3600},            # Open-Meteo ~11 km, horario
+    "earthquake": {"grid_deg": 0.05, "ttl": DAY},         # radio de 50 km sobre un año
+    "hurricane": {"grid_deg": 0.5, "ttl": 7 * DAY},
+    "fire": {"grid_deg": 0.1, "ttl": DAY},
+}
+
+# Accesos (LRU) acumulados en memoria antes de escribirlos a SQLite
+ACCESS_FLUSH_SIZE = 1000
+
+
+class SourceCache:
+    """
+    Caché clave/valor en SQLite con TTL por fuente, LRU con límite de tamaño
+    y contadores de aciertos/fallos por fuente.
+    Las lecturas no escriben en SQLite: la hora del último acceso se guarda
+    en memoria y se vuelca por lotes (antes de expulsar o cada ACCESS_FLUSH_SIZE).
+    """
+    def __init__(self, path=CACHE_PATH, max_entries=200_000, specs=None):
+        self.path = path
+        self.max_entries = max_entries
+        self.specs = dict(SOURCE_SPECS, **(specs or {}))
+        self.counters = {}
+        self._accessed = {}
+        self._lock = threading.Lock()
+
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            " key TEXT PRIMARY KEY, source TEXT, value TEXT,"
+            " created REAL, accessed REAL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed)")
+        self._conn.commit()
+        self._count = self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    # -----------------------------
+    # Claves
+    # -----------------------------
+    def make_key(self, source, lon, lat, *extra):
+        """
+        Clave = fuente + celda de la rejilla nativa + argumentos extra.
+        """
+        grid = self.specs[source]["grid_deg"]
+        cell = (math.floor(lon / grid), math.floor(lat / grid))
+        suffix = json.dumps(extra, sort_keys=True, default=str) if extra else ""
+        return f"{source}|{cell[0]}|{cell[1]}|{suffix}"
+
+    # -----------------------------
+    # Lectura / escritura
+    # -----------------------------
+    def get(self, source, key):
+        """
+        Devuelve (hit, value). Las entradas caducadas cuentan como fallo.
+        """
+        ttl = self.specs[source]["ttl"]
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None and (ttl is None or now - row[1] <= ttl):
+                self._accessed[key] = now
+                if len(self._accessed) >= ACCESS_FLUSH_SIZE:
+                    self._flush_accessed()
+                    self._conn.commit()
+                self._count_event(source, "hits")
+                return True, json.loads(row[0])
+            if row is not None:
+                self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                self._conn.commit()
+                self._accessed.pop(key, None)
+                self._count -= 1
+            self._count_event(source, "misses")
+            return False, None
+
+    def put(self, source, key, value):
+        now = time.time()
+        payload = json.dumps(value, default=str)
+        with self._lock:
+            exists = self._conn.execute("SELECT 1 FROM entries WHERE key = ?", (key,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries (key, source, value, created, accessed)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (key, source, payload, now, now),
+            )
+            self._accessed.pop(key, None)
+            if exists is None:
+                self._count += 1
+            if self._count > self.max_entries:
+                self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        """
+        Expulsa las entradas menos usadas hasta quedar un 10% por debajo del límite.
+        """
+        self._flush_accessed()
+        self._count = self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+        excess = self._count - int(self.max_entries * 0.9)
+        if excess > 0:
+            self._conn.execute(
+                "DELETE FROM entries WHERE key IN"
+                " (SELECT key FROM entries ORDER BY accessed LIMIT ?)",
+                (excess,),
+            )
+            self._count -= excess
+
+    def _flush_accessed(self):
+        """
+        Escribe en SQLite las horas de acceso acumuladas en memoria (sin commit).
+        """
+        if self._accessed:
+            self._conn.executemany("UPDATE entries SET accessed = ? WHERE key = ?",
+                                   [(t, k) for k, t in self._accessed.items()])
+            self._accessed.clear()
+
+    def flush(self):
+        with self._lock:
+            self._flush_accessed()
+            self._conn.commit()
+
+    def created(self, source, lon, lat):
+        """
+        Momento en que se guardó la entrada más antigua de source en la celda
+        del punto (cualquier argumento extra), o None si no hay ninguna.
+        No cuenta como acierto ni como acceso.
+        """
+        prefix = self.make_key(source, lon, lat)
+        with self._lock:
+            row = self._conn.execute("SELECT MIN(created) FROM entries WHERE substr(key, 1, ?) = ?",
+                                     (len(prefix), prefix)).fetchone()
+        return row[0]
+
+    def invalidate(self, source, lon, lat):
+        """
+        Borra todas las entradas de source en la celda del punto (cualquier
+        argumento extra). Devuelve cuántas se borraron.
+        """
+        prefix = self.make_key(source, lon, lat)
+        with self._lock:
+            cur = self._conn.execute("DELETE FROM entries WHERE substr(key, 1, ?) = ?",
+                                     (len(prefix), prefix))
+            self._conn.commit()
+            for key in [k for k in self._accessed if k.startswith(prefix)]:
+                del self._accessed[key]
+            self._count -= cur.rowcount
+            return cur.rowcount
+
+    def clear(self, source=None):
+        with self._lock:
+            if source is None:
+                self._conn.execute("DELETE FROM entries")
+            else:
+                self._conn.execute("DELETE FROM entries WHERE source = ?", (source,))
+            self._accessed.clear()
+            self._conn.commit()
+            self._count = self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    # -----------------------------
+    # Métricas
+    # -----------------------------
+    def _count_event(self, source, kind):
+        counters = self.counters.setdefault(source, {"hits": 0, "misses": 0})
+        counters[kind] += 1
+
+    def stats(self):
+        """
+        Aciertos/fallos por fuente y tamaño actual de la caché.
+        """
+        with self._lock:
+            return {
+                "entries": self._count,
+                "max_entries": self.max_entries,
+                "sources": {s: dict(c) for s, c in self.counters.items()},
+            }
+
+
+# Llamadas a fuentes en curso, compartidas por todos los DataLayer del proceso
+source_flights = SingleFlight()
+
+
+def cached(source):
+    """
+    Decorador para métodos de DataLayer con firma (self, lon, lat, ...).
+    Usa self.cache si existe; los resultados None no se guardan. La clave
+    incluye los argumentos ya con sus valores por defecto, así que
+    f(lon, lat) y f(lon, lat, 365) comparten entrada.
+    Los fallos de caché con la misma clave que ya se están consultando
+    esperan a esa consulta (source_flights) en vez de repetirla.
+    """
+    def decorator(method):
+        signature = inspect.signature(method)
+
+        @functools.wraps(method)
+        def wrapper(self, lon, lat, *args, **kwargs):
+            bound = signature.bind(self, lon, lat, *args, **kwargs)
+            bound.apply_defaults()
+            extra = tuple(bound.arguments.values())[3:]
+            cache = getattr(self, "cache", None)
+            if cache is None:
+                key = f"{source}|{lon}|{lat}|" + json.dumps(extra, default=str)
+                return source_flights.do(key, method, self, lon, lat, *args, **kwargs)
+            key = cache.make_key(source, lon, lat, *extra)
+            hit, value = cache.get(source, key)
+            if hit:
+                return value
+
+            def load():
+                value = method(self, lon, lat, *args, **kwargs)
+                if value is not None:
+                    cache.put(source, key, value)
+                return value
+
+            return source_flights.do(key, load)
+        return wrapper
+    return decorator
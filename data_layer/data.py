@@ -1,20 +1,15 @@
 #Obtiene datos de GEE, Open-Meteo, Gemini y otros servicios
 
 # data_layer/data.py
-import requests
 import pandas as pd
-import ee 
 
-# Inicia sesión con la nueva cuenta
-ee.Authenticate()
-ee.Initialize(project='terraguard-477621')
-print('Earth Engine funcionando correctamente 🌎')
+from data_layer.http_client import http_client
 
 
 
 def get_weather(lat, lon):
     url = f"https://api.open-meteo.com/v1/forecast?latitude={lat}&longitude={lon}&hourly=temperature_2m,precipitation"
-    res = requests.get(url)
+    res = http_client.get("open_meteo", url)
     if res.status_code == 200:
         data = res.json()
         df = pd.DataFrame({
@@ -24,4 +19,17 @@ def get_weather(lat, lon):
         return df
     else:
         return None
-    
+
+
+def get_observed_precipitation(lat, lon, past_days=2):
+    """
+    Precipitación horaria (mm) ya ocurrida en los últimos past_days días
+    (forecast_days=0: sin horas de pronóstico). Es la serie que alimenta
+    los disparadores paramétricos; None si la petición falla.
+    """
+    url = (f"https://api.open-meteo.com/v1/forecast?latitude={lat}&longitude={lon}"
+           f"&hourly=precipitation&past_days={past_days}&forecast_days=0")
+    res = http_client.get("open_meteo", url)
+    if res.status_code == 200:
+        return pd.Series(res.json()["hourly"]["precipitation"], dtype=float)
+    return None
@@ -1,32 +1,110 @@
-import ee
-import requests
 import json
+import math
+import os
+import numpy as np
 import pandas as pd
-import random
 
-# Inicializar Google Earth Engine
-ee.Initialize(project='terraguard-477621')
+from data_layer.cache import SOURCE_SPECS, SourceCache, cached
+from data_layer.ee_session import ee
+from data_layer.fire_grid import FIRE_GRID_PATH, FireGrid
+from data_layer.http_client import http_client
+from data_layer.quake_catalog import CATALOG_PATH, QuakeCatalog
+from data_layer.raster_store import RasterStore, TileMissError
+from data_layer.storm_tracks import STORMS_PATH, StormTrackStore
+from data_layer.volcano_index import get_volcano_index
+
+# Bandas que se muestrean juntas en sample_points_batch (nombre de salida → clave cruda)
+BATCH_BANDS = {
+    "flood": "flood_rate",
+    "NDVI": "vegetation",
+    "elevation": "elevation",
+}
+
+# Clave cruda → (fuente de SourceCache, capa de RasterStore o None si no hay teselas)
+STATIC_SOURCES = {
+    "flood_rate": ("flood", "flood"),
+    "vegetation": ("ndvi", None),
+    "elevation": ("elevation", "elevation"),
+}
+
+# Año de referencia de las proyecciones y tendencia lineal por año
+BASE_YEAR = 2025
+WEATHER_TRENDS = {"temperature": 0.2, "humidity": -0.5, "precipitation": 0.1}
+NDVI_TREND_PER_YEAR = 10
+# Desviación estándar de cada tendencia anual en los ensambles Monte Carlo
+WEATHER_TREND_SD = {"temperature": 0.1, "humidity": 0.25, "precipitation": 0.05}
+
+# Radio (km) del conteo de sismos alrededor del punto
+QUAKE_RADIUS_KM = 50
+
+# Variables horarias pedidas a Open-Meteo
+WEATHER_HOURLY = "temperature_2m,relative_humidity_2m,precipitation,wind_speed_10m"
+
 
 class DataLayer:
-    def __init__(self):
-        pass
+    def __init__(self, raster_store=None, cache=None, quake_catalog=None, http=None, storm_tracks=None,
+                 fire_grid=None):
+        # Cliente HTTP compartido (pool keep-alive, timeouts, reintentos, circuit breaker)
+        self.http = http or http_client
+        # Caché persistente por fuente (celda nativa + TTL); cache=False la desactiva
+        self.cache = (cache if cache is not None else SourceCache()) or None
+        # Teselas locales de capas estáticas (SRTM, GLOFAS); solo se consulta GEE si falta la tesela
+        self.raster_store = raster_store if raster_store is not None else RasterStore()
+        # Catálogo local de sismos (si ya se cargó con data_layer/quake_catalog.py)
+        if quake_catalog is None and os.path.exists(CATALOG_PATH):
+            quake_catalog = QuakeCatalog(CATALOG_PATH)
+        self.quake_catalog = quake_catalog
+        # Trayectorias de tormentas (si ya se ingirieron con data_layer/storm_tracks.py)
+        if storm_tracks is None and os.path.exists(STORMS_PATH):
+            storm_tracks = StormTrackStore.load(STORMS_PATH)
+        self.storm_tracks = storm_tracks
+        # Conteos de incendios por celda (si ya se ingirieron con data_layer/fire_grid.py)
+        if fire_grid is None and os.path.exists(FIRE_GRID_PATH):
+            fire_grid = FireGrid.load(FIRE_GRID_PATH)
+        self.fire_grid = fire_grid
+        # Imágenes de GEE reutilizables (se construyen una sola vez)
+        self._flood_mosaic = None
+        self._srtm = None
+        self._batch_stacks = {}
 
     # -----------------------------
     # 1. Datos de riesgo de inundación (GEE)
     # -----------------------------
+    @cached("flood")
     def get_flood_risk(self, lon, lat, rp="RP10_depth_category"):
         """
         Devuelve el valor de riesgo de inundación para un punto.
         rp: 'RP10_depth_category', 'RP50_depth_category', 'RP100_depth_category', etc.
+        Si la tesela local existe devuelve la categoría de profundidad (None = sin peligro).
         """
+        try:
+            return self.raster_store.lookup("flood", lon, lat, band=rp)
+        except TileMissError:
+            pass
         point = ee.Geometry.Point([lon, lat])
-        flood_col = ee.ImageCollection("JRC/CEMS_GLOFAS/FloodHazard/v2_1").mosaic()
-        flood_val = flood_col.select(rp).sample(point, 30).first().getInfo()
+        flood_val = self.get_flood_mosaic().select(rp).sample(point, 30).first().getInfo()
         return flood_val
 
+    def get_flood_mosaic(self):
+        """
+        Mosaico global de GLOFAS, construido una vez y reutilizado.
+        """
+        if self._flood_mosaic is None:
+            self._flood_mosaic = ee.ImageCollection("JRC/CEMS_GLOFAS/FloodHazard/v2_1").mosaic()
+        return self._flood_mosaic
+
+    def get_srtm(self):
+        """
+        Imagen SRTM (banda elevation), construida una vez y reutilizada.
+        """
+        if self._srtm is None:
+            self._srtm = ee.Image("USGS/SRTMGL1_003").select('elevation')
+        return self._srtm
+
     # -----------------------------
     # 2. Vegetación (NDVI) y Elevación (SRTM)
     # -----------------------------
+    @cached("ndvi")
     def get_ndvi(self, lon, lat):
         point = ee.Geometry.Point([lon, lat])
         ndvi_col = ee.ImageCollection('MODIS/006/MOD13A2').select('NDVI')
@@ -34,18 +112,123 @@ class DataLayer:
         ndvi_val = ndvi_img.sample(point, 30).first().get('NDVI').getInfo()
         return ndvi_val
 
+    @cached("elevation")
     def get_elevation(self, lon, lat):
+        try:
+            return self.raster_store.lookup("elevation", lon, lat)
+        except TileMissError:
+            pass
         point = ee.Geometry.Point([lon, lat])
-        srtm = ee.Image("USGS/SRTMGL1_003")
-        elev_val = srtm.sample(point, 30).first().get('elevation').getInfo()
+        elev_val = self.get_srtm().sample(point, 30).first().get('elevation').getInfo()
         return elev_val
 
+    # -----------------------------
+    # 2b. Muestreo por lotes (inundación + NDVI + elevación)
+    # -----------------------------
+    def sample_points_batch(self, points, rp="RP10_depth_category", chunk_size=5000):
+        """
+        Muestrea inundación, NDVI y elevación para muchos puntos a la vez.
+        points: lista de (lon, lat).
+        Las tres bandas se apilan en una sola imagen y se hace un reduceRegions
+        por bloque de chunk_size puntos (un getInfo por bloque, no tres por punto).
+        Devuelve un dict columnar {'flood_rate': [...], 'vegetation': [...], 'elevation': [...]}
+        alineado con points; None donde el píxel está enmascarado.
+        """
+        points = list(points)
+        out = {key: [None] * len(points) for key in BATCH_BANDS.values()}
+        if not points:
+            return out
+
+        stack = self._get_batch_stack(rp)
+        for start in range(0, len(points), chunk_size):
+            chunk = points[start:start + chunk_size]
+            fc = ee.FeatureCollection([
+                ee.Feature(ee.Geometry.Point([lon, lat]), {"idx": start + i})
+                for i, (lon, lat) in enumerate(chunk)
+            ])
+            sampled = stack.reduceRegions(
+                collection=fc, reducer=ee.Reducer.first(), scale=30
+            ).getInfo()
+            for feature in sampled.get('features', []):
+                props = feature.get('properties', {})
+                i = props.get('idx')
+                if i is None:
+                    continue
+                for band, key in BATCH_BANDS.items():
+                    out[key][int(i)] = props.get(band)
+        return out
+
+    def lookup_static_batch(self, lons, lats, rp="RP10_depth_category"):
+        """
+        Inundación, NDVI y elevación sin red: primero las teselas locales
+        (RasterStore.lookup_batch), luego la caché con las mismas claves que
+        get_flood_risk / get_ndvi / get_elevation.
+        Devuelve (columnas {clave: array con NaN}, resueltos {clave: array bool}).
+        """
+        lons = np.asarray(lons, dtype=float)
+        lats = np.asarray(lats, dtype=float)
+        out, resolved = {}, {}
+        for key, (source, layer) in STATIC_SOURCES.items():
+            values = np.full(len(lons), np.nan)
+            hit = np.zeros(len(lons), dtype=bool)
+            if layer is not None:
+                values, hit = self.raster_store.lookup_batch(layer, lons, lats,
+                                                             band=rp if layer == "flood" else None)
+            if self.cache is not None:
+                extra = (rp,) if source == "flood" else ()
+                for i in np.flatnonzero(~hit):
+                    found, value = self.cache.get(source, self.cache.make_key(source, lons[i], lats[i], *extra))
+                    if found:
+                        values[i] = np.nan if value is None else value
+                        hit[i] = True
+            out[key], resolved[key] = values, hit
+        return out, resolved
+
+    def sample_static_batch(self, lons, lats, rp="RP10_depth_category", chunk_size=5000):
+        """
+        Como lookup_static_batch, pero los puntos que no se resolvieron en
+        local pasan por sample_points_batch (un reduceRegions por bloque)
+        y sus valores se guardan en la caché. Si GEE falla, la excepción se propaga.
+        """
+        lons = np.asarray(lons, dtype=float)
+        lats = np.asarray(lats, dtype=float)
+        out, resolved = self.lookup_static_batch(lons, lats, rp)
+        missing = np.flatnonzero(~np.logical_and.reduce(list(resolved.values())))
+        if len(missing) == 0:
+            return out
+
+        sampled = self.sample_points_batch(list(zip(lons[missing], lats[missing])), rp=rp, chunk_size=chunk_size)
+        for key, (source, _) in STATIC_SOURCES.items():
+            extra = (rp,) if source == "flood" else ()
+            for j, i in enumerate(missing):
+                if resolved[key][i]:
+                    continue
+                value = sampled[key][j]
+                if value is None:
+                    continue
+                out[key][i] = value
+                if self.cache is not None:
+                    self.cache.put(source, self.cache.make_key(source, lons[i], lats[i], *extra), value)
+        return out
+
+    def _get_batch_stack(self, rp):
+        """
+        Imagen de 3 bandas (flood, NDVI, elevation) para un periodo de retorno.
+        """
+        if rp not in self._batch_stacks:
+            flood = self.get_flood_mosaic().select([rp], ["flood"])
+            ndvi = (ee.ImageCollection('MODIS/006/MOD13A2').select('NDVI')
+                    .sort('system:time_start', False).first())
+            self._batch_stacks[rp] = flood.addBands(ndvi).addBands(self.get_srtm())
+        return self._batch_stacks[rp]
+
     # -----------------------------
     # 3. Datos climáticos en tiempo real (Open-Meteo)
     # -----------------------------
+    @cached("weather")
     def get_weather(self, lon, lat):
-        url = f"https://api.open-meteo.com/v1/forecast?latitude={lat}&longitude={lon}&hourly=temperature_2m,relative_humidity_2m,precipitation,wind_speed_10m"
-        response = requests.get(url)
+        url = f"https://api.open-meteo.com/v1/forecast?latitude={lat}&longitude={lon}&hourly={WEATHER_HOURLY}"
+        response = self.http.get("open_meteo", url)
         if response.status_code == 200:
             data = response.json()
 
@@ -53,48 +236,147 @@ class DataLayer:
              # 👇 Imprime las primeras 5 fechas y horas disponibles (verifica que son de hoy)
             print("🕒 Horas disponibles:", data['hourly']['time'][:5])
 
-            # Retornar promedios de las últimas 24 horas
-            temp = sum(data['hourly']['temperature_2m'])/len(data['hourly']['temperature_2m'])
-            humidity = sum(data['hourly']['relative_humidity_2m'])/len(data['hourly']['relative_humidity_2m'])
-            precipitation = sum(data['hourly']['precipitation'])
-            wind_speed = sum(data['hourly']['wind_speed_10m'])/len(data['hourly']['wind_speed_10m'])
-            return {
-                "temperature": temp,
-                "humidity": humidity,
-                "precipitation": precipitation,
-                "wind_speed": wind_speed
-            }
+            return self._summarize_hourly(data['hourly'])
         else:
             return None
 
+    def get_weather_batch(self, lons, lats, chunk_size=100):
+        """
+        Clima para muchos puntos con peticiones multi-ubicación a Open-Meteo.
+        Los puntos que caen en la misma celda del modelo (~0.1°) se piden una
+        sola vez, y las celdas ya en caché no se piden. Devuelve una lista
+        alineada con la entrada (None donde la petición falló).
+        """
+        grid = SOURCE_SPECS["weather"]["grid_deg"]
+        cells = {}
+        for i, (lon, lat) in enumerate(zip(lons, lats)):
+            cell = (math.floor(lon / grid), math.floor(lat / grid))
+            cells.setdefault(cell, []).append(i)
+
+        results = [None] * len(lons)
+        pending = []
+        for cell, members in cells.items():
+            lon, lat = lons[members[0]], lats[members[0]]
+            if self.cache is not None:
+                hit, value = self.cache.get("weather", self.cache.make_key("weather", lon, lat))
+                if hit:
+                    for i in members:
+                        results[i] = value
+                    continue
+            pending.append((lon, lat, members))
+
+        for start in range(0, len(pending), chunk_size):
+            chunk = pending[start:start + chunk_size]
+            params = {
+                "latitude": ",".join(str(lat) for _, lat, _ in chunk),
+                "longitude": ",".join(str(lon) for lon, _, _ in chunk),
+                "hourly": WEATHER_HOURLY,
+            }
+            try:
+                response = self.http.get("open_meteo", "https://api.open-meteo.com/v1/forecast", params=params)
+            except Exception as e:
+                print(f"⚠️ Open-Meteo por lotes falló ({len(chunk)} celdas): {e}")
+                continue
+            if response.status_code != 200:
+                continue
+            data = response.json()
+            # Con una sola ubicación Open-Meteo devuelve un objeto en vez de una lista
+            locations = data if isinstance(data, list) else [data]
+            if len(locations) != len(chunk):
+                # No se sabe qué ubicación corresponde a qué celda: se piden una por una
+                print(f"⚠️ Open-Meteo devolvió {len(locations)} ubicaciones de {len(chunk)}; "
+                      f"se consultan por separado")
+                self._weather_one_by_one(chunk, results)
+                continue
+            for (lon, lat, members), location in zip(chunk, locations):
+                summary = self._summarize_hourly(location['hourly'])
+                if self.cache is not None:
+                    self.cache.put("weather", self.cache.make_key("weather", lon, lat), summary)
+                for i in members:
+                    results[i] = summary
+        return results
+
+    def _weather_one_by_one(self, chunk, results):
+        for lon, lat, members in chunk:
+            try:
+                summary = self.get_weather(lon, lat)
+            except Exception as e:
+                print(f"⚠️ Open-Meteo falló en ({lat}, {lon}): {e}")
+                continue
+            for i in members:
+                results[i] = summary
+
+    def _summarize_hourly(self, hourly):
+        """
+        Resume la serie horaria de Open-Meteo en promedios / acumulados.
+        """
+        # Retornar promedios de las últimas 24 horas
+        temp = sum(hourly['temperature_2m'])/len(hourly['temperature_2m'])
+        humidity = sum(hourly['relative_humidity_2m'])/len(hourly['relative_humidity_2m'])
+        precipitation = sum(hourly['precipitation'])
+        wind_speed = sum(hourly['wind_speed_10m'])/len(hourly['wind_speed_10m'])
+        return {
+            "temperature": temp,
+            "humidity": humidity,
+            "precipitation": precipitation,
+            "wind_speed": wind_speed
+        }
+
     # -----------------------------
     # 4. Riesgo sísmico (USGS)
     # -----------------------------
+    @cached("earthquake")
     def get_earthquake_frequency(self, lon, lat, past_days=365):
         """
         Número de terremotos en el último año dentro de 50km del punto.
+        Si el punto está en la región del catálogo local, no hay consulta a USGS.
         """
-        radius_km = 50
+        radius_km = QUAKE_RADIUS_KM
+        if self.quake_catalog is not None and self.quake_catalog.covers(lon, lat, radius_km):
+            return self.quake_catalog.count_within(lon, lat, radius_km, past_days)
         endtime = pd.Timestamp.now()
         starttime = endtime - pd.Timedelta(days=past_days)
         url = f"https://earthquake.usgs.gov/fdsnws/event/1/query.geojson?starttime={starttime.date()}&endtime={endtime.date()}&latitude={lat}&longitude={lon}&maxradiuskm={radius_km}"
-        response = requests.get(url)
+        response = self.http.get("usgs", url)
         if response.status_code == 200:
             data = response.json()
             return len(data['features'])
         else:
             return 0
 
+    def get_earthquake_frequency_batch(self, lons, lats, past_days=365):
+        """
+        Versión por lotes: los puntos cubiertos por el catálogo local se cuentan
+        de forma vectorizada; el resto cae a la consulta individual.
+        """
+        counts = [None] * len(lons)
+        pending = list(range(len(lons)))
+        if self.quake_catalog is not None:
+            local = [i for i in pending if self.quake_catalog.covers(lons[i], lats[i], QUAKE_RADIUS_KM)]
+            if local:
+                local_counts = self.quake_catalog.count_within_batch(
+                    [lons[i] for i in local], [lats[i] for i in local], QUAKE_RADIUS_KM, past_days)
+                for i, c in zip(local, local_counts):
+                    counts[i] = int(c)
+            pending = [i for i in pending if counts[i] is None]
+        for i in pending:
+            counts[i] = self.get_earthquake_frequency(lons[i], lats[i], past_days)
+        return counts
+
     # -----------------------------
     # 5. Huracanes / tormentas (NOAA)
     # -----------------------------
-    def get_hurricane_frequency(self, lon, lat, years=5):
+    @cached("hurricane")
+    def get_hurricane_frequency(self, lon, lat, years=5, radius_km=200):
         """
         Número de tormentas / huracanes en los últimos 'years' años.
+        Con la base local: segmentos de trayectoria a <= radius_km del punto.
         """
+        if self.storm_tracks is not None:
+            return self.storm_tracks.count_within(lon, lat, radius_km, years)
         url = f"https://www.ncei.noaa.gov/access/services/data/v1?dataset=stormevents&dataTypes=all&format=json"
         # Nota: Para producción, filtrar por ubicación y fecha
-        response = requests.get(url)
+        response = self.http.get("noaa", url)
         if response.status_code == 200:
             data = response.json()
             # Se puede procesar para contar eventos cercanos
@@ -102,18 +384,39 @@ class DataLayer:
         else:
             return 0
 
+    def get_hurricane_frequency_batch(self, lons, lats, years=5, radius_km=200):
+        """
+        Versión por lotes; sin base local cae a la consulta individual.
+        """
+        if self.storm_tracks is not None:
+            return [int(c) for c in self.storm_tracks.count_within_batch(lons, lats, radius_km, years)]
+        return [self.get_hurricane_frequency(lon, lat, years, radius_km) for lon, lat in zip(lons, lats)]
+
     # -----------------------------
     # 6. Incendios forestales (NASA FIRMS)
     # -----------------------------
+    @cached("fire")
     def get_fire_frequency(self, lon, lat, past_days=365):
         """
-        Número de incendios detectados por satélite en el último año
+        Número de incendios detectados por satélite en los últimos past_days
+        días en la celda del punto (con el año por defecto se usa la ventana
+        móvil precalculada por FireGrid).
         """
+        if self.fire_grid is not None:
+            return self.fire_grid.rate(lon, lat, past_days)
         url = "https://firms.modaps.eosdis.nasa.gov/api/active_fire.json"  # API hipotética
         # Filtrar por lat/lon y fecha
         # Retornar número de eventos
         return 0  # Placeholder
 
+    def get_fire_frequency_batch(self, lons, lats, past_days=365):
+        """
+        Versión por lotes (una indexación vectorizada sobre la ventana).
+        """
+        if self.fire_grid is not None:
+            return [int(c) for c in self.fire_grid.rate_batch(lons, lats, past_days)]
+        return [0] * len(lons)
+
     # -----------------------------
     # 7. Actividad volcánica (Global Volcano Locations)
     # -----------------------------
@@ -121,11 +424,15 @@ class DataLayer:
         """
         Devuelve la distancia al volcán más cercano en km
         """
-        # Cargar dataset de volcanes previamente descargado y almacenado localmente
-        with open("data_layer/volcanoes.json") as f:
-            volcanoes = json.load(f)
-        min_dist = min([self.haversine(lon, lat, v['longitude'], v['latitude']) for v in volcanoes])
-        return min_dist
+        # Dataset de volcanes descargado localmente; se indexa una sola vez por proceso
+        dists, _ = get_volcano_index().nearest([lon], [lat])
+        return float(dists[0])
+
+    def get_volcano_proximity_batch(self, lons, lats):
+        """
+        Distancias (km) e ids del volcán más cercano para arrays de puntos.
+        """
+        return get_volcano_index().nearest(lons, lats)
 
     def haversine(self, lon1, lat1, lon2, lat2):
         """
@@ -151,26 +458,69 @@ class DataLayer:
         target_year: año futuro (int)
         """
         current = self.get_weather(lon, lat)
-        years_ahead = target_year - 2025  # usar 2025 como referencia
-
-        # Tendencia lineal simple: por año +0.2°C, -0.5% humedad, +0.1 mm precipitación
-        future = {
-            "temperature": current['temperature'] + 0.2 * years_ahead,
-            "humidity": max(0, min(100, current['humidity'] - 0.5 * years_ahead)),
-            "wind_speed": current['wind_speed'],  # sin cambio
-            "precipitation": max(0, current['precipitation'] + 0.1 * years_ahead)
-        }
-        return future
-    
+        years_ahead = target_year - BASE_YEAR  # usar 2025 como referencia
+        return {k: float(v) for k, v in self.project_weather(current, years_ahead).items()}
+
     def get_future_ndvi(self, lon, lat, target_year):
         """
         Predicción simplificada de NDVI.
         """
         current_ndvi = self.get_ndvi(lon, lat)
-        years_ahead = target_year - 2025
+        years_ahead = target_year - BASE_YEAR
 
-        # Simulamos tendencia de vegetación: +/- 10 por año
-        trend = random.choice([-1, 1]) * 10
-        future_ndvi = max(0, min(1000, current_ndvi + trend * years_ahead))
-        return future_ndvi
+        # Simulamos tendencia de vegetación: +/- 10 por año (fija por celda)
+        trend = float(self.ndvi_trend(lon, lat))
+        return float(self.project_ndvi(current_ndvi, years_ahead, trend))
 
+    # -----------------------------
+    # Modelo de tendencia (vectorizado: years_ahead puede ser un array)
+    # -----------------------------
+    def project_weather(self, current, years_ahead, trends=None):
+        """
+        Aplica la tendencia lineal al clima actual para uno o varios años.
+        Por año: +0.2°C, -0.5% humedad, +0.1 mm precipitación; viento sin cambio.
+        trends reemplaza esas tendencias (escalares o arrays que se combinan
+        por broadcasting con years_ahead, p. ej. un escenario por fila).
+        """
+        trends = trends or WEATHER_TRENDS
+        years_ahead = np.asarray(years_ahead, dtype=float)
+        temperature = current['temperature'] + trends['temperature'] * years_ahead
+        return {
+            "temperature": temperature,
+            "humidity": np.clip(current['humidity'] + trends['humidity'] * years_ahead, 0, 100),
+            "wind_speed": np.asarray(current['wind_speed'], dtype=float) + np.zeros_like(temperature),
+            "precipitation": np.maximum(0, current['precipitation'] + trends['precipitation'] * years_ahead),
+        }
+
+    def sample_trend_scenarios(self, n, rng):
+        """
+        n escenarios de tendencia anual (un valor por escenario y variable):
+        clima ~ Normal(WEATHER_TRENDS, WEATHER_TREND_SD) y NDVI uniforme en
+        [-NDVI_TREND_PER_YEAR, +NDVI_TREND_PER_YEAR].
+        """
+        scenarios = {
+            key: rng.normal(WEATHER_TRENDS[key], WEATHER_TREND_SD[key], n)
+            for key in WEATHER_TRENDS
+        }
+        scenarios["ndvi"] = rng.uniform(-NDVI_TREND_PER_YEAR, NDVI_TREND_PER_YEAR, n)
+        return scenarios
+
+    def ndvi_trend(self, lons, lats):
+        """
+        Tendencia de NDVI por año (+/- NDVI_TREND_PER_YEAR) para cada punto.
+        El signo sale de un hash de la celda NDVI (~1 km): la misma ubicación
+        proyecta siempre igual (en cada llamada, proceso o reanudación).
+        """
+        grid = SOURCE_SPECS["ndvi"]["grid_deg"]
+        cx = np.floor(np.asarray(lons, dtype=float) / grid).astype(np.int64)
+        cy = np.floor(np.asarray(lats, dtype=float) / grid).astype(np.int64)
+        h = (cx * 0x9E3779B1 + cy * 0x85EBCA77) & 0xFFFFFFFF
+        h = (h ^ (h >> 15)) * 0x2C1B3C6D & 0xFFFFFFFF
+        return np.where((h >> 16) & 1, 1, -1) * NDVI_TREND_PER_YEAR
+
+    def project_ndvi(self, current_ndvi, years_ahead, trend):
+        """
+        NDVI proyectado con una tendencia fija por año, acotado a 0..1000.
+        """
+        years_ahead = np.asarray(years_ahead, dtype=float)
+        return np.clip(current_ndvi + trend * years_ahead, 0, 1000)
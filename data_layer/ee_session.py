@@ -0,0 +1,86 @@
+# data_layer/ee_session.py
+"""
+Sesión única de Google Earth Engine para todo el proceso.
+
+Importar este módulo no importa ni inicializa `ee`: eso pasa en el primer
+uso real (cualquier atributo de `ee`, p. ej. ee.Geometry) o al llamar a
+warm_up(). Todas las capas usan `from data_layer.ee_session import ee`, así
+que ee.Initialize corre una sola vez aunque se importen varios módulos.
+La autenticación es un paso aparte (`earthengine authenticate`).
+"""
+import importlib
+import os
+import threading
+import time
+
+EE_PROJECT = os.environ.get("TERRAGUARD_EE_PROJECT", "terraguard-477621")
+
+_lock = threading.Lock()
+_module = None
+_status = {"initialized": False, "error": None, "init_seconds": None, "warm_up_seconds": None,
+           "warmed_up": False}
+
+
+def get_ee():
+    """
+    Módulo `ee` inicializado (se inicializa la primera vez).
+    """
+    global _module
+    if _module is not None:
+        return _module
+    with _lock:
+        if _module is None:
+            start = time.perf_counter()
+            try:
+                module = importlib.import_module("ee")
+                module.Initialize(project=EE_PROJECT)
+            except Exception as e:
+                _status["error"] = str(e)
+                print(f"Error inicializando Earth Engine: {e}")
+                raise
+            _status.update(initialized=True, error=None,
+                           init_seconds=round(time.perf_counter() - start, 3))
+            print(f"🌍 Earth Engine funcionando correctamente ({_status['init_seconds']}s)")
+            _module = module
+    return _module
+
+
+class _LazyEarthEngine:
+    """
+    Se comporta como el módulo `ee`, pero lo inicializa al primer acceso.
+    """
+    def __getattr__(self, name):
+        return getattr(get_ee(), name)
+
+
+ee = _LazyEarthEngine()
+
+
+def warm_up(data_layer=None, rps=("RP10_depth_category",)):
+    """
+    Inicializa la sesión y prepara de antemano las imágenes que se reutilizan
+    (mosaico GLOFAS, SRTM y la pila de muestreo por lotes) de data_layer.
+    Hace una llamada mínima al servidor para confirmar que la sesión responde.
+    """
+    start = time.perf_counter()
+    try:
+        module = get_ee()
+        if data_layer is not None:
+            data_layer.get_flood_mosaic()
+            data_layer.get_srtm()
+            for rp in rps:
+                data_layer._get_batch_stack(rp)
+        module.Number(1).getInfo()
+    except Exception as e:
+        _status["error"] = str(e)
+        raise
+    _status.update(warmed_up=True, error=None, warm_up_seconds=round(time.perf_counter() - start, 3))
+    return status()
+
+
+def status():
+    return dict(_status)
+
+
+def is_ready():
+    return _status["initialized"] and _status["warmed_up"]
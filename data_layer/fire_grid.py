@@ -0,0 +1,201 @@
+# data_layer/fire_grid.py
+"""
+Índice de incendios por celdas a partir de archivos CSV de NASA FIRMS.
+
+La ingesta agrega las detecciones en conteos diarios por celda de una
+rejilla fija (0.1° por defecto) y materializa una ventana móvil de N días
+(365 por defecto) como una matriz densa: consultar un punto es indexar
+una celda, en tiempo constante y sin red.
+"""
+import argparse
+import datetime
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+FIRE_GRID_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "fire_grid.npz")
+EPOCH = datetime.date(1970, 1, 1)
+
+
+def _day_number(date):
+    return (date - EPOCH).days
+
+
+class FireGrid:
+    """
+    daily: conteos (cx, cy, day, count) agregados por celda y día.
+    window: matriz densa con la suma de los últimos window_days días hasta window_end.
+    """
+    def __init__(self, cell_deg=0.1, daily=None, sources=None, window_days=365):
+        self.cell_deg = cell_deg
+        self.window_days = window_days
+        self.daily = daily if daily is not None else np.zeros((0, 4), dtype=np.int32)
+        self.sources = sources or {}
+        self.window = np.zeros((0, 0), dtype=np.uint32)
+        self.window_origin = (0, 0)
+        self.window_end = None
+
+    # -----------------------------
+    # Ingesta
+    # -----------------------------
+    def ingest_csv(self, path, chunksize=500_000, drop_low_confidence=True):
+        """
+        Agrega un CSV de FIRMS (latitude, longitude, acq_date[, confidence]).
+        Un mismo archivo (mismo nombre y tamaño) no se cuenta dos veces.
+        Devuelve el número de detecciones agregadas.
+        """
+        signature = f"{os.path.basename(path)}:{os.path.getsize(path)}"
+        if signature in self.sources:
+            return 0
+
+        parts = [self.daily]
+        total = 0
+        for chunk in pd.read_csv(path, chunksize=chunksize):
+            if drop_low_confidence and "confidence" in chunk:
+                conf = chunk["confidence"]
+                # MODIS: 0-100; VIIRS: l / n / h
+                numeric = pd.to_numeric(conf, errors="coerce")
+                low = numeric.lt(30) | conf.astype(str).str.lower().eq("l")
+                chunk = chunk[~low]
+            cx = np.floor(chunk["longitude"].to_numpy() / self.cell_deg).astype(np.int32)
+            cy = np.floor(chunk["latitude"].to_numpy() / self.cell_deg).astype(np.int32)
+            day = ((pd.to_datetime(chunk["acq_date"]) - pd.Timestamp(EPOCH)).dt.days).to_numpy(np.int32)
+            keys, counts = np.unique(np.stack([cx, cy, day], axis=1), axis=0, return_counts=True)
+            parts.append(np.column_stack([keys, counts]).astype(np.int32))
+            total += len(chunk)
+
+        self.daily = self._aggregate(np.concatenate(parts))
+        self.sources[signature] = total
+        return total
+
+    @staticmethod
+    def _aggregate(rows):
+        if not len(rows):
+            return np.zeros((0, 4), dtype=np.int32)
+        keys, inverse = np.unique(rows[:, :3], axis=0, return_inverse=True)
+        counts = np.bincount(inverse.ravel(), weights=rows[:, 3]).astype(np.int32)
+        return np.column_stack([keys, counts]).astype(np.int32)
+
+    def prune(self, keep_days=2 * 365, as_of=None):
+        """
+        Descarta conteos diarios más viejos que keep_days (no afectan a la ventana).
+        """
+        end = _day_number(as_of or datetime.date.today())
+        self.daily = self.daily[self.daily[:, 2] > end - keep_days]
+
+    def build_window(self, as_of=None, window_days=None):
+        """
+        Materializa la ventana móvil (as_of - window_days, as_of] como matriz densa.
+        """
+        self.window_days = window_days or self.window_days
+        end = _day_number(as_of or datetime.date.today())
+        rows = self.daily[(self.daily[:, 2] > end - self.window_days) & (self.daily[:, 2] <= end)]
+        self.window_end = end
+        if not len(rows):
+            self.window = np.zeros((0, 0), dtype=np.uint32)
+            self.window_origin = (0, 0)
+            return
+        cx0, cy0 = int(rows[:, 0].min()), int(rows[:, 1].min())
+        width = int(rows[:, 0].max()) - cx0 + 1
+        height = int(rows[:, 1].max()) - cy0 + 1
+        window = np.zeros((height, width), dtype=np.uint32)
+        np.add.at(window, (rows[:, 1] - cy0, rows[:, 0] - cx0), rows[:, 3].astype(np.uint32))
+        self.window = window
+        self.window_origin = (cx0, cy0)
+
+    # -----------------------------
+    # Consultas
+    # -----------------------------
+    def rate(self, lon, lat, past_days=None):
+        """
+        Detecciones en la celda del punto en los últimos past_days días
+        (hasta window_end). None o window_days usan la ventana materializada.
+        """
+        return int(self.rate_batch([lon], [lat], past_days)[0])
+
+    def rate_batch(self, lons, lats, past_days=None):
+        lons = np.atleast_1d(np.asarray(lons, dtype=float))
+        lats = np.atleast_1d(np.asarray(lats, dtype=float))
+        if past_days is not None and past_days != self.window_days:
+            return self._rate_from_daily(lons, lats, past_days)
+        out = np.zeros(len(lons), dtype=np.int64)
+        if not self.window.size:
+            return out
+        cols = np.floor(lons / self.cell_deg).astype(np.int64) - self.window_origin[0]
+        rows = np.floor(lats / self.cell_deg).astype(np.int64) - self.window_origin[1]
+        inside = (rows >= 0) & (rows < self.window.shape[0]) & (cols >= 0) & (cols < self.window.shape[1])
+        out[inside] = self.window[rows[inside], cols[inside]]
+        return out
+
+    def _rate_from_daily(self, lons, lats, past_days):
+        """
+        Suma los conteos diarios de (end - past_days, end] en la celda de cada punto.
+        Solo cuenta lo que prune() no haya descartado.
+        """
+        end = self.window_end if self.window_end is not None else _day_number(datetime.date.today())
+        rows = self.daily[(self.daily[:, 2] > end - past_days) & (self.daily[:, 2] <= end)]
+        out = np.zeros(len(lons), dtype=np.int64)
+        if not len(rows):
+            return out
+        cell_keys, inverse = np.unique(rows[:, :2].astype(np.int64), axis=0, return_inverse=True)
+        totals = np.bincount(inverse.ravel(), weights=rows[:, 3]).astype(np.int64)
+        # Celda (cx, cy) → un entero para buscarla con searchsorted
+        encoded = self._encode(cell_keys[:, 0], cell_keys[:, 1])
+        order = np.argsort(encoded)
+        encoded, totals = encoded[order], totals[order]
+        query = self._encode(np.floor(lons / self.cell_deg).astype(np.int64),
+                             np.floor(lats / self.cell_deg).astype(np.int64))
+        pos = np.minimum(np.searchsorted(encoded, query), len(encoded) - 1)
+        found = encoded[pos] == query
+        out[found] = totals[pos[found]]
+        return out
+
+    @staticmethod
+    def _encode(cx, cy):
+        return cx * (1 << 32) + (cy + (1 << 31))
+
+    # -----------------------------
+    # Persistencia
+    # -----------------------------
+    def save(self, path=FIRE_GRID_PATH):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        meta = {
+            "cell_deg": self.cell_deg,
+            "window_days": self.window_days,
+            "window_end": self.window_end,
+            "window_origin": list(self.window_origin),
+            "sources": self.sources,
+        }
+        tmp_path = path + ".tmp.npz"
+        np.savez_compressed(tmp_path, daily=self.daily, window=self.window, meta=json.dumps(meta))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path=FIRE_GRID_PATH):
+        with np.load(path) as data:
+            meta = json.loads(str(data["meta"]))
+            grid = cls(meta["cell_deg"], data["daily"], meta["sources"], meta["window_days"])
+            grid.window = data["window"]
+        grid.window_origin = tuple(meta["window_origin"])
+        grid.window_end = meta["window_end"]
+        return grid
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ingesta de archivos FIRMS al índice de incendios por celda.")
+    parser.add_argument("paths", nargs="+", help="CSV de FIRMS (active fire)")
+    parser.add_argument("--window-days", type=int, default=365)
+    parser.add_argument("--as-of", type=datetime.date.fromisoformat, default=None,
+                        help="Fin de la ventana (YYYY-MM-DD); por defecto hoy")
+    parser.add_argument("--path", default=FIRE_GRID_PATH)
+    args = parser.parse_args()
+
+    grid = FireGrid.load(args.path) if os.path.exists(args.path) else FireGrid(window_days=args.window_days)
+    for csv_path in args.paths:
+        print(f"🔥 {csv_path}: {grid.ingest_csv(csv_path)} detecciones nuevas")
+    grid.prune(keep_days=2 * args.window_days, as_of=args.as_of)
+    grid.build_window(as_of=args.as_of, window_days=args.window_days)
+    grid.save(args.path)
+    print(f"✅ Ventana de {grid.window_days} días: {int(grid.window.sum())} detecciones en {args.path}")
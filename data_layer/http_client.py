@@ -0,0 +1,222 @@
+# data_layer/http_client.py
+"""
+Cliente HTTP compartido para las APIs externas (Open-Meteo, USGS, NOAA, FIRMS).
+
+- Una requests.Session por fuente con pool de conexiones keep-alive.
+- Timeout propio por fuente (nunca una llamada sin timeout).
+- Reintentos con backoff exponencial y jitter ante errores de red, 5xx y 429.
+- Circuit breaker por fuente: tras varios fallos seguidos la fuente queda
+  "abierta" y las llamadas fallan al instante (CircuitOpenError), de modo que
+  RiskModel.get_factors cae directamente a su valor 0 por defecto.
+  Un 4xx (salvo 429) es un error de la petición, no de la fuente: no cuenta
+  como fallo, pero tampoco como éxito (no cierra el breaker ni borra fallos).
+"""
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# fuente → (timeout de conexión, timeout de lectura), reintentos y breaker
+SOURCE_POLICIES = {
+    "open_meteo": {"timeout": (3.05, 10), "retries": 2, "failure_threshold": 5, "reset_timeout": 30},
+    "usgs": {"timeout": (3.05, 20), "retries": 2, "failure_threshold": 5, "reset_timeout": 60},
+    "noaa": {"timeout": (3.05, 30), "retries": 1, "failure_threshold": 3, "reset_timeout": 120},
+    "firms": {"timeout": (3.05, 30), "retries": 1, "failure_threshold": 3, "reset_timeout": 120},
+}
+DEFAULT_POLICY = {"timeout": (3.05, 15), "retries": 1, "failure_threshold": 5, "reset_timeout": 60}
+
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+class CircuitOpenError(RuntimeError):
+    """La fuente está marcada como no saludable; no se hace la llamada."""
+
+
+class CircuitBreaker:
+    """
+    closed → (failure_threshold fallos seguidos) → open
+    open → (pasado reset_timeout) → half_open: se deja pasar una llamada de prueba
+    half_open → éxito: closed / fallo: open
+    """
+    def __init__(self, failure_threshold=5, reset_timeout=60):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = None
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = "half_open"
+            if self.state == "half_open" and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = "closed"
+            self.failures = 0
+            self._probe_in_flight = False
+
+    def record_neutral(self):
+        """
+        Respuesta que no dice nada de la salud de la fuente (4xx): solo libera
+        la llamada de prueba si la había.
+        """
+        with self._lock:
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._probe_in_flight = False
+            if self.state == "half_open" or self.failures >= self.failure_threshold:
+                self.state = "open"
+                self.opened_at = time.monotonic()
+
+    def snapshot(self):
+        with self._lock:
+            retry_in = None
+            if self.state == "open":
+                retry_in = max(0.0, self.reset_timeout - (time.monotonic() - self.opened_at))
+            return {"state": self.state, "consecutive_failures": self.failures, "retry_in_s": retry_in}
+
+
+class HttpClient:
+    """
+    Punto único de salida HTTP. Uso: http_client.get("usgs", url, params=...).
+    """
+    def __init__(self, policies=None, pool_maxsize=32, backoff_base=0.5, backoff_max=8.0):
+        self.policies = dict(SOURCE_POLICIES, **(policies or {}))
+        self.pool_maxsize = pool_maxsize
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._sessions = {}
+        self._breakers = {}
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def _policy(self, source):
+        return self.policies.get(source, DEFAULT_POLICY)
+
+    def _session(self, source):
+        session = self._sessions.get(source)
+        if session is None:
+            with self._lock:
+                session = self._sessions.get(source)
+                if session is None:
+                    session = requests.Session()
+                    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=self.pool_maxsize)
+                    session.mount("https://", adapter)
+                    session.mount("http://", adapter)
+                    self._sessions[source] = session
+        return session
+
+    def breaker(self, source):
+        breaker = self._breakers.get(source)
+        if breaker is None:
+            with self._lock:
+                breaker = self._breakers.get(source)
+                if breaker is None:
+                    policy = self._policy(source)
+                    breaker = CircuitBreaker(policy["failure_threshold"], policy["reset_timeout"])
+                    self._breakers[source] = breaker
+        return breaker
+
+    def _count(self, source, kind):
+        with self._lock:
+            counters = self._counters.setdefault(
+                source, {"requests": 0, "retries": 0, "failures": 0, "rejected": 0, "client_errors": 0})
+            counters[kind] += 1
+
+    def _sleep_backoff(self, attempt):
+        delay = min(self.backoff_max, self.backoff_base * (2 ** attempt))
+        time.sleep(delay * random.uniform(0.5, 1.5))
+
+    def get(self, source, url, params=None, timeout=None, **kwargs):
+        """
+        GET con la política de la fuente. Devuelve la Response (también en 4xx;
+        el llamador decide). Lanza CircuitOpenError si la fuente está abierta y
+        la última excepción de red si se agotan los reintentos.
+        """
+        breaker = self.breaker(source)
+        if not breaker.allow():
+            self._count(source, "rejected")
+            raise CircuitOpenError(f"Fuente '{source}' no disponible (circuit breaker abierto)")
+
+        policy = self._policy(source)
+        session = self._session(source)
+        last_error = None
+        response = None
+        for attempt in range(policy["retries"] + 1):
+            if attempt:
+                self._count(source, "retries")
+                self._sleep_backoff(attempt - 1)
+            self._count(source, "requests")
+            try:
+                response = session.get(url, params=params, timeout=timeout or policy["timeout"], **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                last_error = e
+                continue
+            except Exception:
+                self._count(source, "failures")
+                breaker.record_failure()
+                raise
+            if response.status_code not in RETRY_STATUS:
+                if response.status_code < 400:
+                    breaker.record_success()
+                else:
+                    self._count(source, "client_errors")
+                    breaker.record_neutral()
+                return response
+            last_error = None
+
+        self._count(source, "failures")
+        breaker.record_failure()
+        if last_error is not None:
+            raise last_error
+        return response
+
+    # -----------------------------
+    # Monitoreo
+    # -----------------------------
+    def stats(self):
+        """
+        Estado de breakers, contadores y pools de conexiones por fuente.
+        """
+        out = {}
+        sources = set(self._sessions) | set(self._breakers) | set(self._counters)
+        for source in sorted(sources):
+            pools = []
+            session = self._sessions.get(source)
+            if session is not None:
+                adapter = session.get_adapter("https://")
+                for key in list(adapter.poolmanager.pools.keys()):
+                    pool = adapter.poolmanager.pools.get(key)
+                    if pool is None:
+                        continue
+                    pools.append({
+                        "host": pool.host,
+                        "connections_opened": pool.num_connections,
+                        "requests": pool.num_requests,
+                        "idle": pool.pool.qsize() if pool.pool is not None else 0,
+                        "maxsize": self.pool_maxsize,
+                    })
+            out[source] = {
+                "breaker": self.breaker(source).snapshot(),
+                "counters": dict(self._counters.get(source, {})),
+                "pools": pools,
+            }
+        return out
+
+
+# Instancia compartida por todas las capas del proceso
+http_client = HttpClient()
@@ -0,0 +1,202 @@
+# data_layer/quake_catalog.py
+"""
+Catálogo local de sismos USGS.
+
+Se carga una vez para una región (bulk) y luego se actualiza solo con los
+eventos nuevos. Un archivo GeoJSON local puede sustituir a la API de USGS
+(p. ej. para reproducir un catálogo en pruebas). Los conteos por radio se
+resuelven con un GridIndex en memoria.
+"""
+import argparse
+import json
+import math
+import os
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+from data_layer.http_client import http_client
+from data_layer.raster_store import MEXICO_BBOX
+from data_layer.spatial_index import KM_PER_DEG, GridIndex
+
+CATALOG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "quakes.sqlite")
+USGS_URL = "https://earthquake.usgs.gov/fdsnws/event/1/query"
+USGS_PAGE_SIZE = 20000  # límite de eventos por consulta FDSN
+
+
+class QuakeCatalog:
+    """
+    Eventos en SQLite (persistencia) + arrays NumPy e índice espacial (consultas).
+    """
+    def __init__(self, path=CATALOG_PATH, cell_deg=0.5):
+        self.path = path
+        self.cell_deg = cell_deg
+        self._lock = threading.Lock()
+        self._index = None
+        self._times = None
+
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS events ("
+            " id TEXT PRIMARY KEY, time REAL, lon REAL, lat REAL, mag REAL, depth REAL)"
+        )
+        self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        self._conn.commit()
+        row = self._conn.execute("SELECT value FROM meta WHERE key = 'bbox'").fetchone()
+        self._bbox = tuple(json.loads(row[0])) if row else None
+
+    # -----------------------------
+    # Carga / actualización
+    # -----------------------------
+    def load_geojson(self, source):
+        """
+        Inserta los eventos de un GeoJSON de USGS (ruta o dict ya parseado).
+        Los eventos repetidos se ignoran. Devuelve cuántos eventos son nuevos.
+        """
+        if isinstance(source, (str, os.PathLike)):
+            with open(source) as f:
+                source = json.load(f)
+        rows = []
+        for feature in source.get("features", []):
+            props = feature.get("properties") or {}
+            coords = (feature.get("geometry") or {}).get("coordinates") or []
+            if len(coords) < 2 or props.get("time") is None:
+                continue
+            depth = coords[2] if len(coords) > 2 else None
+            rows.append((feature["id"], props["time"] / 1000.0, coords[0], coords[1], props.get("mag"), depth))
+
+        with self._lock:
+            before = self._conn.total_changes
+            self._conn.executemany("INSERT OR IGNORE INTO events VALUES (?, ?, ?, ?, ?, ?)", rows)
+            self._conn.commit()
+            added = self._conn.total_changes - before
+            if added:
+                self._index = None
+        return added
+
+    def update_from_usgs(self, bbox=MEXICO_BBOX, past_days=3650, http=None):
+        """
+        Descarga de USGS solo lo posterior al último evento guardado
+        (o los últimos past_days días si el catálogo está vacío).
+        """
+        http = http or http_client
+        last = self.last_event_time()
+        start = last if last is not None else time.time() - past_days * 86400
+        min_lon, min_lat, max_lon, max_lat = bbox
+        added = 0
+        offset = 1
+        while True:
+            params = {
+                "format": "geojson",
+                "starttime": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(start)),
+                "minlongitude": min_lon, "minlatitude": min_lat,
+                "maxlongitude": max_lon, "maxlatitude": max_lat,
+                "orderby": "time-asc", "limit": USGS_PAGE_SIZE, "offset": offset,
+            }
+            response = http.get("usgs", USGS_URL, params=params, timeout=(3.05, 120))
+            response.raise_for_status()
+            page = response.json()
+            added += self.load_geojson(page)
+            n = len(page.get("features", []))
+            if n < USGS_PAGE_SIZE:
+                break
+            offset += n
+        self.set_bbox(bbox)
+        return added
+
+    # -----------------------------
+    # Metadatos
+    # -----------------------------
+    def set_bbox(self, bbox):
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO meta VALUES ('bbox', ?)", (json.dumps(list(bbox)),))
+            self._conn.commit()
+            self._bbox = tuple(bbox)
+
+    def bbox(self):
+        return self._bbox
+
+    def covers(self, lon, lat, radius_km=0):
+        """
+        True si el círculo de radius_km alrededor del punto cae completo dentro
+        de la región cargada (cerca del borde el conteo local quedaría corto).
+        """
+        bbox = self.bbox()
+        if bbox is None:
+            return False
+        min_lon, min_lat, max_lon, max_lat = bbox
+        dlat = radius_km / KM_PER_DEG
+        max_abs_lat = abs(lat) + dlat
+        if max_abs_lat >= 90.0:
+            return False
+        dlon = dlat / math.cos(math.radians(max_abs_lat))
+        return (min_lon + dlon <= lon <= max_lon - dlon
+                and min_lat + dlat <= lat <= max_lat - dlat)
+
+    def last_event_time(self):
+        with self._lock:
+            return self._conn.execute("SELECT MAX(time) FROM events").fetchone()[0]
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM events").fetchone()[0]
+
+    # -----------------------------
+    # Consultas
+    # -----------------------------
+    def _get_index(self):
+        with self._lock:
+            if self._index is None:
+                rows = self._conn.execute("SELECT lon, lat, time FROM events").fetchall()
+                data = np.array(rows, dtype=float).reshape(-1, 3)
+                self._index = GridIndex(data[:, 0], data[:, 1], self.cell_deg)
+                self._times = data[:, 2]
+            return self._index, self._times
+
+    def count_within(self, lon, lat, radius_km=50, past_days=365, now=None):
+        """
+        Número de sismos a <= radius_km en los últimos past_days días.
+        """
+        return int(self.count_within_batch([lon], [lat], radius_km, past_days, now)[0])
+
+    def count_within_batch(self, lons, lats, radius_km=50, past_days=365, now=None):
+        """
+        Igual que count_within para arrays de puntos.
+        """
+        index, times = self._get_index()
+        cutoff = (now if now is not None else time.time()) - past_days * 86400
+        return index.count_radius(lons, lats, radius_km, mask=times >= cutoff)
+
+    def events_since(self, since, min_mag=None):
+        """
+        Sismos con time > since (epoch), ordenados por tiempo: (id, time, lon, lat, mag).
+        """
+        query = "SELECT id, time, lon, lat, mag FROM events WHERE time > ?"
+        params = [since]
+        if min_mag is not None:
+            query += " AND mag >= ?"
+            params.append(min_mag)
+        with self._lock:
+            return self._conn.execute(query + " ORDER BY time", params).fetchall()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Carga / actualiza el catálogo local de sismos USGS.")
+    parser.add_argument("--bbox", type=float, nargs=4, default=MEXICO_BBOX,
+                        metavar=("MIN_LON", "MIN_LAT", "MAX_LON", "MAX_LAT"))
+    parser.add_argument("--days", type=int, default=3650, help="Historia inicial si el catálogo está vacío")
+    parser.add_argument("--file", help="GeoJSON local en lugar de la API de USGS")
+    parser.add_argument("--path", default=CATALOG_PATH)
+    args = parser.parse_args()
+
+    catalog = QuakeCatalog(args.path)
+    if args.file:
+        added = catalog.load_geojson(args.file)
+        catalog.set_bbox(args.bbox)
+    else:
+        added = catalog.update_from_usgs(tuple(args.bbox), args.days)
+    print(f"📡 {added} sismos nuevos; {len(catalog)} en el catálogo")
@@ -0,0 +1,210 @@
+# data_layer/raster_store.py
+"""
+Almacén local de capas estáticas (SRTM y GLOFAS) en teselas de 1°x1°.
+
+- ingest_region(): paso offline que exporta las capas desde Earth Engine
+  para una región y las guarda como .npy (una tesela por grado).
+- RasterStore.lookup(): lectura puntual sobre arrays memory-mapped,
+  sin red. Si la tesela no existe lanza TileMissError y el DataLayer
+  hace la consulta remota.
+- RasterStore.lookup_batch(): la misma lectura para muchos puntos; la usa
+  DataLayer.lookup_static_batch (RiskModel.get_factors_batch, mosaicos,
+  carteras) y solo los puntos sin tesela pasan por Earth Engine.
+"""
+import argparse
+import json
+import math
+import os
+import threading
+
+import numpy as np
+
+RASTER_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "rasters")
+
+# Extensión de México usada en Notas_ee.txt (min_lon, min_lat, max_lon, max_lat)
+MEXICO_BBOX = (-118.5, 14.5, -86.5, 32.8)
+
+# Capas estáticas exportables. scale_deg es la resolución nativa aproximada.
+STATIC_LAYERS = {
+    "elevation": {
+        "asset": "USGS/SRTMGL1_003",
+        "collection": False,
+        "bands": ["elevation"],
+        "scale_deg": 1.0 / 3600,   # ~30 m
+        "dtype": "int16",
+        "nodata": -32768,
+    },
+    "flood": {
+        "asset": "JRC/CEMS_GLOFAS/FloodHazard/v2_1",
+        "collection": True,        # se guarda el mosaico
+        "bands": ["RP10_depth_category", "RP50_depth_category", "RP100_depth_category"],
+        "scale_deg": 1.0 / 1200,   # ~90 m
+        "dtype": "uint8",
+        "nodata": 0,
+    },
+}
+
+
+class TileMissError(KeyError):
+    """La tesela pedida no está en el almacén local."""
+
+
+def tile_name(tile_lon, tile_lat):
+    """
+    Nombre tipo SRTM de la tesela cuya esquina suroeste es (tile_lon, tile_lat).
+    """
+    ns = "N" if tile_lat >= 0 else "S"
+    ew = "E" if tile_lon >= 0 else "W"
+    return f"{ns}{abs(tile_lat):02d}{ew}{abs(tile_lon):03d}"
+
+
+class RasterStore:
+    """
+    Lector de teselas locales. Cada tesela se abre una vez con mmap_mode='r'
+    y se mantiene abierta; el sistema operativo cachea las páginas leídas.
+    """
+    def __init__(self, root=RASTER_DIR):
+        self.root = root
+        self._tiles = {}
+        self._lock = threading.Lock()
+
+    def _band_dir(self, layer, band):
+        return os.path.join(self.root, layer, band)
+
+    def _tile(self, layer, band, tile_lon, tile_lat):
+        key = (layer, band, tile_lon, tile_lat)
+        tile = self._tiles.get(key)
+        if tile is None:
+            with self._lock:
+                tile = self._tiles.get(key)
+                if tile is None:
+                    path = os.path.join(self._band_dir(layer, band), tile_name(tile_lon, tile_lat) + ".npy")
+                    # False = tesela ausente (se recuerda para no volver a tocar disco)
+                    tile = np.load(path, mmap_mode="r") if os.path.exists(path) else False
+                    self._tiles[key] = tile
+        if tile is False:
+            raise TileMissError(key)
+        return tile
+
+    def reload(self):
+        """
+        Olvida las teselas abiertas (p. ej. tras una nueva ingesta).
+        """
+        with self._lock:
+            self._tiles.clear()
+
+    def lookup(self, layer, lon, lat, band=None):
+        """
+        Valor del píxel que contiene (lon, lat), o None si es nodata.
+        Lanza TileMissError si la tesela no se ha ingerido.
+        """
+        spec = STATIC_LAYERS[layer]
+        band = band or spec["bands"][0]
+        tile_lon, tile_lat = math.floor(lon), math.floor(lat)
+        tile = self._tile(layer, band, tile_lon, tile_lat)
+        n_rows, n_cols = tile.shape
+        row = min(n_rows - 1, max(0, int((tile_lat + 1 - lat) * n_rows)))
+        col = min(n_cols - 1, max(0, int((lon - tile_lon) * n_cols)))
+        value = tile[row, col].item()
+        if value == spec["nodata"]:
+            return None
+        return value
+
+    def lookup_batch(self, layer, lons, lats, band=None):
+        """
+        Versión vectorizada de lookup.
+        Devuelve (values, hit): values es float con NaN en nodata o tesela ausente;
+        hit indica qué puntos se resolvieron localmente.
+        """
+        spec = STATIC_LAYERS[layer]
+        band = band or spec["bands"][0]
+        lons = np.asarray(lons, dtype=float)
+        lats = np.asarray(lats, dtype=float)
+        values = np.full(lons.shape, np.nan)
+        hit = np.zeros(lons.shape, dtype=bool)
+
+        tile_lons = np.floor(lons).astype(int)
+        tile_lats = np.floor(lats).astype(int)
+        for tile_lon, tile_lat in set(zip(tile_lons.tolist(), tile_lats.tolist())):
+            try:
+                tile = self._tile(layer, band, tile_lon, tile_lat)
+            except TileMissError:
+                continue
+            sel = (tile_lons == tile_lon) & (tile_lats == tile_lat)
+            n_rows, n_cols = tile.shape
+            rows = np.clip(((tile_lat + 1 - lats[sel]) * n_rows).astype(int), 0, n_rows - 1)
+            cols = np.clip(((lons[sel] - tile_lon) * n_cols).astype(int), 0, n_cols - 1)
+            vals = tile[rows, cols].astype(float)
+            vals[vals == spec["nodata"]] = np.nan
+            values[sel] = vals
+            hit[sel] = True
+        return values, hit
+
+
+# -----------------------------
+# Ingesta offline desde Earth Engine
+# -----------------------------
+def ingest_region(layer, bbox=MEXICO_BBOX, root=RASTER_DIR, overwrite=False, block_rows=1200):
+    """
+    Exporta una capa estática a teselas locales de 1°x1° que cubren bbox.
+    Usa ee.data.computePixels en bloques de block_rows filas para no
+    superar el límite de tamaño por petición.
+    """
+    from data_layer.ee_session import ee
+
+    spec = STATIC_LAYERS[layer]
+    image = ee.ImageCollection(spec["asset"]).mosaic() if spec["collection"] else ee.Image(spec["asset"])
+    size = int(round(1.0 / spec["scale_deg"]))
+    min_lon, min_lat, max_lon, max_lat = bbox
+
+    for band in spec["bands"]:
+        band_dir = os.path.join(root, layer, band)
+        os.makedirs(band_dir, exist_ok=True)
+        band_img = image.select(band).unmask(spec["nodata"]).cast({band: spec["dtype"]})
+
+        for tile_lat in range(math.floor(min_lat), math.ceil(max_lat)):
+            for tile_lon in range(math.floor(min_lon), math.ceil(max_lon)):
+                path = os.path.join(band_dir, tile_name(tile_lon, tile_lat) + ".npy")
+                if os.path.exists(path) and not overwrite:
+                    continue
+                tile = np.full((size, size), spec["nodata"], dtype=spec["dtype"])
+                for row0 in range(0, size, block_rows):
+                    n_rows = min(block_rows, size - row0)
+                    pixels = ee.data.computePixels({
+                        "expression": band_img,
+                        "fileFormat": "NUMPY_NDARRAY",
+                        "grid": {
+                            "dimensions": {"width": size, "height": n_rows},
+                            "affineTransform": {
+                                "scaleX": spec["scale_deg"],
+                                "shearX": 0,
+                                "translateX": tile_lon,
+                                "shearY": 0,
+                                "scaleY": -spec["scale_deg"],
+                                "translateY": tile_lat + 1 - row0 * spec["scale_deg"],
+                            },
+                            "crsCode": "EPSG:4326",
+                        },
+                    })
+                    tile[row0:row0 + n_rows] = pixels[band]
+                # Escribir a un temporal y renombrar: un lector nunca ve una tesela a medias
+                tmp_path = path + ".tmp.npy"
+                np.save(tmp_path, tile)
+                os.replace(tmp_path, path)
+                print(f"🗺️ {layer}/{band}/{tile_name(tile_lon, tile_lat)} guardada")
+
+    meta_path = os.path.join(root, layer, "metadata.json")
+    with open(meta_path, "w") as f:
+        json.dump({"layer": layer, "bbox": list(bbox), **spec}, f, indent=2)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Exporta capas estáticas de GEE a teselas locales.")
+    parser.add_argument("layer", choices=sorted(STATIC_LAYERS))
+    parser.add_argument("--bbox", type=float, nargs=4, default=MEXICO_BBOX,
+                        metavar=("MIN_LON", "MIN_LAT", "MAX_LON", "MAX_LAT"))
+    parser.add_argument("--root", default=RASTER_DIR)
+    parser.add_argument("--overwrite", action="store_true")
+    args = parser.parse_args()
+
+    ingest_region(args.layer, tuple(args.bbox), args.root, args.overwrite)
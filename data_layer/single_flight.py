@@ -0,0 +1,75 @@
+# data_layer/single_flight.py
+"""
+Coalescencia de llamadas idénticas en curso ("single flight").
+
+Si llega una llamada con una clave que ya se está calculando, no se repite:
+espera a la primera (la "líder") y recibe el mismo resultado, o la misma
+excepción. En cuanto la líder termina, la clave se libera; no es una caché.
+"""
+import asyncio
+import threading
+from concurrent.futures import Future
+
+
+class SingleFlight:
+    """
+    Versión para hilos (Flask, pools de RiskModel y DataLayer).
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._in_flight = {}
+        self.leaders = 0
+        self.followers = 0
+
+    def do(self, key, fn, *args, **kwargs):
+        with self._lock:
+            future = self._in_flight.get(key)
+            leader = future is None
+            if leader:
+                future = self._in_flight[key] = Future()
+                self.leaders += 1
+            else:
+                self.followers += 1
+        if not leader:
+            return future.result()
+
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+
+    def stats(self):
+        with self._lock:
+            return {"in_flight": len(self._in_flight), "leaders": self.leaders, "followers": self.followers}
+
+
+class AsyncSingleFlight:
+    """
+    Versión para asyncio (modo ASGI): las seguidoras esperan sin ocupar hilos.
+    """
+    def __init__(self):
+        self._in_flight = {}
+        self.leaders = 0
+        self.followers = 0
+
+    async def do(self, key, fn, *args, **kwargs):
+        task = self._in_flight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn(*args, **kwargs))
+            self._in_flight[key] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+            self.leaders += 1
+        else:
+            self.followers += 1
+        # shield: si una petición se cancela (cliente desconectado) no cancela a las demás
+        return await asyncio.shield(task)
+
+    def stats(self):
+        return {"in_flight": len(self._in_flight), "leaders": self.leaders, "followers": self.followers}
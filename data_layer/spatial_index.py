@@ -0,0 +1,166 @@
+# data_layer/spatial_index.py
+"""
+Índice espacial por celdas lat/lon (buckets tipo geohash) con distancias
+de gran círculo vectorizadas. Lo usan los catálogos locales (sismos,
+volcanes, tormentas) y los índices de pólizas.
+"""
+import math
+
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0
+KM_PER_DEG = math.pi * EARTH_RADIUS_KM / 180.0
+
+
+def haversine_np(lon1, lat1, lon2, lat2):
+    """
+    Distancia en km entre coordenadas (acepta escalares o arrays con broadcasting).
+    """
+    lon1, lat1, lon2, lat2 = map(np.radians, (lon1, lat1, lon2, lat2))
+    dlon = lon2 - lon1
+    dlat = lat2 - lat1
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlon / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+class GridIndex:
+    """
+    Agrupa puntos en celdas de cell_deg grados. Una consulta por radio solo
+    revisa las celdas que tocan la caja del círculo y calcula distancias
+    exactas sobre esos candidatos.
+    """
+    def __init__(self, lons, lats, cell_deg=0.5):
+        self.lons = np.asarray(lons, dtype=float)
+        self.lats = np.asarray(lats, dtype=float)
+        self.cell_deg = float(cell_deg)
+        self.n_lon_cells = int(round(360.0 / self.cell_deg))
+
+        cx = np.floor(self.lons / self.cell_deg).astype(np.int64)
+        cy = np.floor(self.lats / self.cell_deg).astype(np.int64)
+        self.cells = {}
+        if len(self.lons):
+            order = np.lexsort((cx, cy))
+            keys = np.stack([cx[order], cy[order]], axis=1)
+            starts = np.flatnonzero(np.any(np.diff(keys, axis=0) != 0, axis=1)) + 1
+            for chunk in np.split(order, starts):
+                self.cells[(int(cx[chunk[0]]), int(cy[chunk[0]]))] = chunk
+        self._empty = np.empty(0, dtype=np.int64)
+
+    def __len__(self):
+        return len(self.lons)
+
+    def _wrap_cx(self, cx):
+        half = self.n_lon_cells // 2
+        return (cx + half) % self.n_lon_cells - half
+
+    def _ring_cells(self, cx, cy, ring):
+        """
+        Celdas en el perímetro del cuadrado de radio ring alrededor de (cx, cy).
+        """
+        if ring == 0:
+            yield (self._wrap_cx(cx), cy)
+            return
+        for dx in range(-ring, ring + 1):
+            yield (self._wrap_cx(cx + dx), cy - ring)
+            yield (self._wrap_cx(cx + dx), cy + ring)
+        for dy in range(-ring + 1, ring):
+            yield (self._wrap_cx(cx - ring), cy + dy)
+            yield (self._wrap_cx(cx + ring), cy + dy)
+
+    def _gather(self, cell_keys):
+        found = [self.cells[k] for k in cell_keys if k in self.cells]
+        return np.concatenate(found) if found else self._empty
+
+    def candidates(self, lon, lat, radius_km):
+        """
+        Índices de los puntos en las celdas que tocan el círculo (sin filtrar por distancia).
+        """
+        dlat = radius_km / KM_PER_DEG
+        max_abs_lat = min(90.0, abs(lat) + dlat)
+        if max_abs_lat >= 89.9:
+            dlon = 180.0
+        else:
+            dlon = min(180.0, dlat / math.cos(math.radians(max_abs_lat)))
+
+        cy0 = math.floor((lat - dlat) / self.cell_deg)
+        cy1 = math.floor((lat + dlat) / self.cell_deg)
+        if dlon >= 180.0:
+            return self._gather(k for k in self.cells if cy0 <= k[1] <= cy1)
+
+        cx0 = math.floor((lon - dlon) / self.cell_deg)
+        cx1 = math.floor((lon + dlon) / self.cell_deg)
+        # set(): con radios grandes la ventana puede dar la vuelta al antimeridiano
+        return self._gather({
+            (self._wrap_cx(cx), cy)
+            for cy in range(cy0, cy1 + 1)
+            for cx in range(cx0, cx1 + 1)
+        })
+
+    def query_radius(self, lon, lat, radius_km):
+        """
+        Devuelve (índices, distancias_km) de los puntos a <= radius_km.
+        """
+        idx = self.candidates(lon, lat, radius_km)
+        if not len(idx):
+            return idx, np.empty(0)
+        dist = haversine_np(lon, lat, self.lons[idx], self.lats[idx])
+        keep = dist <= radius_km
+        return idx[keep], dist[keep]
+
+    def count_radius(self, lons, lats, radius_km, mask=None):
+        """
+        Número de puntos a <= radius_km de cada punto de consulta.
+        mask (opcional): booleanos sobre los puntos indexados (p. ej. filtro por fecha).
+        """
+        lons = np.atleast_1d(np.asarray(lons, dtype=float))
+        lats = np.atleast_1d(np.asarray(lats, dtype=float))
+        counts = np.zeros(len(lons), dtype=np.int64)
+        for i in range(len(lons)):
+            idx, _ = self.query_radius(lons[i], lats[i], radius_km)
+            counts[i] = np.count_nonzero(mask[idx]) if mask is not None else len(idx)
+        return counts
+
+    def nearest(self, lons, lats):
+        """
+        Vecino más cercano de cada punto de consulta.
+        Devuelve (distancias_km, índices); -1 / inf si el índice está vacío.
+        """
+        lons = np.atleast_1d(np.asarray(lons, dtype=float))
+        lats = np.atleast_1d(np.asarray(lats, dtype=float))
+        dists = np.full(len(lons), np.inf)
+        nearest_idx = np.full(len(lons), -1, dtype=np.int64)
+        if not len(self):
+            return dists, nearest_idx
+
+        max_ring = max(self.n_lon_cells // 2, int(round(180.0 / self.cell_deg)))
+        qcx = np.floor(lons / self.cell_deg).astype(np.int64)
+        qcy = np.floor(lats / self.cell_deg).astype(np.int64)
+        # Los puntos de consulta se agrupan por celda: cada grupo comparte candidatos
+        # y se resuelve con una sola matriz de distancias (consultas x candidatos).
+        order = np.lexsort((qcx, qcy))
+        keys = np.stack([qcx[order], qcy[order]], axis=1)
+        starts = np.flatnonzero(np.any(np.diff(keys, axis=0) != 0, axis=1)) + 1
+        for group in np.split(order, starts):
+            cx, cy = int(qcx[group[0]]), int(qcy[group[0]])
+            # 1) Anillos crecientes de celdas hasta encontrar algún candidato
+            for ring in range(max_ring + 1):
+                idx = self._gather(self._ring_cells(cx, cy, ring))
+                if len(idx):
+                    break
+            # 2) La peor distancia del grupo a esos candidatos acota la búsqueda exacta,
+            #    que se hace desde el centro de la celda ampliada por su semidiagonal
+            g_lons, g_lats = lons[group], lats[group]
+            bound = haversine_np(g_lons[:, None], g_lats[:, None],
+                                 self.lons[idx][None, :], self.lats[idx][None, :]).min(axis=1).max()
+            c_lon = (cx + 0.5) * self.cell_deg
+            c_lat = (cy + 0.5) * self.cell_deg
+            half_diag = haversine_np(c_lon, c_lat,
+                                     np.array([cx, cx + 1, cx, cx + 1]) * self.cell_deg,
+                                     np.array([cy, cy, cy + 1, cy + 1]) * self.cell_deg).max()
+            idx = self.candidates(c_lon, c_lat, bound + half_diag + 1e-6)
+            dist = haversine_np(g_lons[:, None], g_lats[:, None],
+                                self.lons[idx][None, :], self.lats[idx][None, :])
+            best = np.argmin(dist, axis=1)
+            dists[group] = dist[np.arange(len(group)), best]
+            nearest_idx[group] = idx[best]
+        return dists, nearest_idx
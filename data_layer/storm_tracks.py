@@ -0,0 +1,206 @@
+# data_layer/storm_tracks.py
+"""
+Base local de trayectorias históricas de tormentas/huracanes.
+
+La ingesta lee un archivo local (HURDAT2 de NHC o CSV de IBTrACS), parte
+cada trayectoria en segmentos entre posiciones consecutivas y los guarda en
+un .npz ordenado por tiempo. Las consultas cuentan los segmentos que pasan a
+<= radius_km de un punto en los últimos N años: el orden temporal da el corte
+por fecha (searchsorted) y un GridIndex sobre los puntos medios da los candidatos.
+"""
+import argparse
+import calendar
+import csv
+import math
+import os
+import time
+
+import numpy as np
+
+from data_layer.spatial_index import KM_PER_DEG, GridIndex, haversine_np
+
+STORMS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "storm_tracks.npz")
+YEAR_SECONDS = 365.25 * 86400
+
+
+# -----------------------------
+# Lectores de formatos
+# -----------------------------
+def _parse_coord(text):
+    """
+    '28.0N' → 28.0, '94.8W' → -94.8
+    """
+    text = text.strip()
+    value = float(text[:-1])
+    return -value if text[-1] in "SW" else value
+
+
+def read_hurdat2(path):
+    """
+    Devuelve {storm_id: [(epoch, lon, lat), ...]} desde un archivo HURDAT2.
+    """
+    tracks = {}
+    current = None
+    with open(path) as f:
+        for line in f:
+            parts = [p.strip() for p in line.split(",")]
+            if len(parts) < 4:
+                continue
+            if parts[0][:2].isalpha():  # cabecera: AL011851, UNNAMED, 14,
+                current = tracks.setdefault(parts[0], [])
+                continue
+            if current is None:
+                continue
+            date, hhmm = parts[0], parts[1].zfill(4)
+            epoch = calendar.timegm((int(date[:4]), int(date[4:6]), int(date[6:8]),
+                                     int(hhmm[:2]), int(hhmm[2:]), 0))
+            current.append((epoch, _parse_coord(parts[5]), _parse_coord(parts[4])))
+    return tracks
+
+
+def read_ibtracs_csv(path):
+    """
+    Devuelve {storm_id: [(epoch, lon, lat), ...]} desde un CSV de IBTrACS
+    (columnas SID, ISO_TIME, LAT, LON; la fila de unidades se ignora).
+    """
+    tracks = {}
+    with open(path, newline="") as f:
+        for row in csv.DictReader(f):
+            try:
+                lat = float(row["LAT"])
+                lon = float(row["LON"])
+                epoch = calendar.timegm(time.strptime(row["ISO_TIME"].strip(), "%Y-%m-%d %H:%M:%S"))
+            except (ValueError, KeyError):
+                continue
+            tracks.setdefault(row["SID"].strip(), []).append((epoch, lon, lat))
+    return tracks
+
+
+READERS = {"hurdat2": read_hurdat2, "ibtracs": read_ibtracs_csv}
+
+
+# -----------------------------
+# Almacén de segmentos
+# -----------------------------
+class StormTrackStore:
+    """
+    Segmentos i: storm_ids[i], times[i] (inicio), (lon0, lat0) → (lon1, lat1).
+    """
+    FIELDS = ("storm_ids", "times", "lon0", "lat0", "lon1", "lat1")
+
+    def __init__(self, storm_ids, times, lon0, lat0, lon1, lat1, cell_deg=1.0):
+        order = np.argsort(times, kind="stable")
+        self.storm_ids = np.asarray(storm_ids, dtype=str)[order]
+        self.times = np.asarray(times, dtype=float)[order]
+        self.lon0 = np.asarray(lon0, dtype=float)[order]
+        self.lat0 = np.asarray(lat0, dtype=float)[order]
+        self.lon1 = np.asarray(lon1, dtype=float)[order]
+        self.lat1 = np.asarray(lat1, dtype=float)[order]
+        self.cell_deg = cell_deg
+
+        # Puntos medios indexados; max_half_km amplía el radio de búsqueda
+        # para no perder segmentos largos cuyo punto medio queda fuera.
+        dlon = (self.lon1 - self.lon0 + 180.0) % 360.0 - 180.0
+        mid_lon = (self.lon0 + dlon / 2 + 180.0) % 360.0 - 180.0
+        mid_lat = (self.lat0 + self.lat1) / 2
+        self.index = GridIndex(mid_lon, mid_lat, cell_deg)
+        half = haversine_np(self.lon0, self.lat0, self.lon1, self.lat1) / 2
+        self.max_half_km = float(half.max()) if len(half) else 0.0
+
+    def __len__(self):
+        return len(self.times)
+
+    @classmethod
+    def from_tracks(cls, tracks, cell_deg=1.0):
+        cols = {name: [] for name in cls.FIELDS}
+        for storm_id, fixes in tracks.items():
+            fixes = sorted(fixes)
+            if len(fixes) == 1:
+                fixes = fixes * 2  # tormenta con una sola posición → segmento de longitud 0
+            for (t0, lon0, lat0), (_, lon1, lat1) in zip(fixes, fixes[1:]):
+                for name, value in zip(cls.FIELDS, (storm_id, t0, lon0, lat0, lon1, lat1)):
+                    cols[name].append(value)
+        return cls(cell_deg=cell_deg, **cols)
+
+    def merge(self, other):
+        """
+        Nuevo almacén con los segmentos de other; las tormentas repetidas se reemplazan.
+        """
+        keep = ~np.isin(self.storm_ids, other.storm_ids)
+        cols = {name: np.concatenate([getattr(self, name)[keep], getattr(other, name)])
+                for name in self.FIELDS}
+        return StormTrackStore(cell_deg=self.cell_deg, **cols)
+
+    def save(self, path=STORMS_PATH):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + ".tmp.npz"
+        np.savez_compressed(tmp_path, **{name: getattr(self, name) for name in self.FIELDS})
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path=STORMS_PATH, cell_deg=1.0):
+        with np.load(path) as data:
+            return cls(cell_deg=cell_deg, **{name: data[name] for name in cls.FIELDS})
+
+    # -----------------------------
+    # Consultas
+    # -----------------------------
+    def _segment_distances(self, lon, lat, idx):
+        """
+        Distancia (km) del punto a cada segmento idx, en una proyección
+        equirectangular local centrada en el punto.
+        """
+        kx = KM_PER_DEG * math.cos(math.radians(lat))
+        ax = ((self.lon0[idx] - lon + 180.0) % 360.0 - 180.0) * kx
+        ay = (self.lat0[idx] - lat) * KM_PER_DEG
+        bx = ((self.lon1[idx] - lon + 180.0) % 360.0 - 180.0) * kx
+        by = (self.lat1[idx] - lat) * KM_PER_DEG
+        dx, dy = bx - ax, by - ay
+        length2 = dx * dx + dy * dy
+        with np.errstate(invalid="ignore", divide="ignore"):
+            t = np.where(length2 > 0, -(ax * dx + ay * dy) / length2, 0.0)
+        t = np.clip(t, 0.0, 1.0)
+        return np.hypot(ax + t * dx, ay + t * dy)
+
+    def count_within(self, lon, lat, radius_km=200, years=5, now=None):
+        """
+        Número de segmentos de trayectoria a <= radius_km en los últimos years años.
+        """
+        return int(self.count_within_batch([lon], [lat], radius_km, years, now)[0])
+
+    def count_within_batch(self, lons, lats, radius_km=200, years=5, now=None):
+        lons = np.atleast_1d(np.asarray(lons, dtype=float))
+        lats = np.atleast_1d(np.asarray(lats, dtype=float))
+        cutoff = (now if now is not None else time.time()) - years * YEAR_SECONDS
+        first = np.searchsorted(self.times, cutoff, side="left")
+        counts = np.zeros(len(lons), dtype=np.int64)
+        if first >= len(self):
+            return counts
+        for i in range(len(lons)):
+            idx = self.index.candidates(lons[i], lats[i], radius_km + self.max_half_km)
+            idx = idx[idx >= first]
+            if len(idx):
+                counts[i] = np.count_nonzero(self._segment_distances(lons[i], lats[i], idx) <= radius_km)
+        return counts
+
+
+def ingest(path, fmt="hurdat2", store_path=STORMS_PATH):
+    """
+    Lee un archivo de trayectorias y lo fusiona con el almacén existente.
+    """
+    new = StormTrackStore.from_tracks(READERS[fmt](path))
+    if os.path.exists(store_path):
+        new = StormTrackStore.load(store_path).merge(new)
+    new.save(store_path)
+    return new
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ingesta de trayectorias de tormentas a la base local.")
+    parser.add_argument("path", help="Archivo HURDAT2 (.txt) o CSV de IBTrACS")
+    parser.add_argument("--format", choices=sorted(READERS), default="hurdat2")
+    parser.add_argument("--store", default=STORMS_PATH)
+    args = parser.parse_args()
+
+    store = ingest(args.path, args.format, args.store)
+    print(f"🌀 {len(store)} segmentos de trayectoria en {args.store}")
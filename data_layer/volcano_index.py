@@ -0,0 +1,60 @@
+# data_layer/volcano_index.py
+"""
+Volcanes cargados una sola vez en arrays NumPy con índice espacial,
+para consultas de vecino más cercano por lotes.
+"""
+import json
+import os
+import threading
+
+import numpy as np
+
+from data_layer.spatial_index import GridIndex
+
+VOLCANOES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "volcanoes.json")
+
+_indexes = {}
+_lock = threading.Lock()
+
+
+class VolcanoIndex:
+    """
+    ids[i], lons[i], lats[i] describen el volcán i.
+    """
+    def __init__(self, volcanoes, cell_deg=2.0):
+        self.ids = np.array([
+            v.get("id", v.get("volcano_number", v.get("name", i)))
+            for i, v in enumerate(volcanoes)
+        ])
+        self.lons = np.array([float(v["longitude"]) for v in volcanoes])
+        self.lats = np.array([float(v["latitude"]) for v in volcanoes])
+        self.index = GridIndex(self.lons, self.lats, cell_deg)
+
+    @classmethod
+    def from_json(cls, path=VOLCANOES_PATH):
+        with open(path) as f:
+            return cls(json.load(f))
+
+    def nearest(self, lons, lats):
+        """
+        Distancia (km) e id del volcán más cercano para cada punto.
+        """
+        dists, idx = self.index.nearest(lons, lats)
+        ids = np.full(len(idx), None, dtype=object)
+        found = idx >= 0
+        ids[found] = self.ids[idx[found]]
+        return dists, ids
+
+
+def get_volcano_index(path=VOLCANOES_PATH):
+    """
+    Índice compartido por proceso; el JSON se lee solo la primera vez.
+    """
+    index = _indexes.get(path)
+    if index is None:
+        with _lock:
+            index = _indexes.get(path)
+            if index is None:
+                index = VolcanoIndex.from_json(path)
+                _indexes[path] = index
+    return index
@@ -7,6 +7,10 @@ document.addEventListener('DOMContentLoaded', () => {
     const mapboxToken = "sk.eyJ1Ijoic2FtdW1hbXUiLCJhIjoiY21ocjhoNmt1MTRycjJqb29xcXBlbGFwbyJ9.lDsItTFuKz9UUCyDqshagQ"; // Your token
     let dashboardMap = null;
     let currentMapMarker = null;
+    // Risk tiles still being computed come back as placeholders (HTTP 202);
+    // the overlay is redrawn a few times per view to pick up the finished ones
+    const riskTileRefreshMs = 8000;
+    const riskTileMaxRefreshes = 6;
 
     // Form Selectors
     const analysisForm = document.getElementById('analysis-form');
@@ -83,6 +87,7 @@ document.addEventListener('DOMContentLoaded', () => {
             
             // 1. Populate the (hidden) dashboard
             populateDashboard(results, lat, lon);
+            streamExplanation(results.explanation_stream);
 
             // 2. SIMULATE CLICK on the Dashboard tab
             dashboardTabLink.click(); 
@@ -148,6 +153,31 @@ document.addEventListener('DOMContentLoaded', () => {
         }
     }
 
+    /**
+     * Replaces the AI card text with the model explanation as it streams in (SSE).
+     * If the stream fails, the locally generated text stays in place.
+     */
+    let explanationSource = null;
+    function streamExplanation(url) {
+        if (explanationSource) explanationSource.close();
+        if (!url || !window.EventSource) return;
+
+        const summary = document.getElementById('result-ai-summary');
+        const fallbackText = summary.textContent;
+        let text = '';
+        explanationSource = new EventSource(url);
+
+        explanationSource.addEventListener('chunk', (e) => {
+            text += JSON.parse(e.data);
+            summary.textContent = text;
+        });
+        explanationSource.addEventListener('done', () => explanationSource.close());
+        explanationSource.addEventListener('error', () => {
+            explanationSource.close();
+            if (!text) summary.textContent = fallbackText;
+        });
+    }
+
     /**
      * Generates simple dynamic text for the AI card
      */
@@ -198,6 +228,25 @@ document.addEventListener('DOMContentLoaded', () => {
                 zoomOffset: -1
             }
         ).addTo(dashboardMap);
+
+        // Risk overlay (tiles rendered and cached by the backend)
+        const riskLayer = L.tileLayer('/tiles/risk/{z}/{x}/{y}.png', {
+            attribution: 'TerraGuard risk',
+            opacity: 0.6,
+            maxZoom: 18
+        }).addTo(dashboardMap);
+
+        let riskRefreshes = 0;
+        let riskRefreshTimer = null;
+        riskLayer.on('load', () => {
+            if (riskRefreshes >= riskTileMaxRefreshes) return;
+            clearTimeout(riskRefreshTimer);
+            riskRefreshTimer = setTimeout(() => {
+                riskRefreshes++;
+                riskLayer.redraw();
+            }, riskTileRefreshMs);
+        });
+        dashboardMap.on('moveend', () => { riskRefreshes = 0; });
     }
 
     /**
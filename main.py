@@ -1,20 +1,23 @@
 # main.py
-from data_layer.data import get_weather
-from processing_layer.risk_model import calculate_risk
+from data_layer.data import get_observed_precipitation
+from processing_layer.risk_model import RiskModel
 from ai_layer.predictor import explain_risk
+from business_layer.payouts import precipitation_events
 from business_layer.rules import compute_payout
 
 def run_system():
     lat, lon = 25.67, -100.31  # Monterrey
     insured_value = 10000
 
-    df = get_weather(lat, lon)
-    risk = calculate_risk(df)
-    payout = compute_payout(risk, insured_value)
+    # Los pagos se disparan con lluvia observada (últimas 48 h), no con el pronóstico
+    observed = get_observed_precipitation(lat, lon, past_days=2)
+    risk = RiskModel().calculate_risk_with_breakdown(lon, lat)["risk_percent"]
+    events = precipitation_events(observed if observed is not None else [], lon, lat)
+    payout = compute_payout(events, insured_value, lon, lat)
     explanation = explain_risk(risk, "Monterrey, MX")
 
     print("Nivel de riesgo:", risk)
-    print("Monto de pago estimado:", payout)
+    print("Pago por lluvia observada (48 h):", payout)
     print("Gemini dice:", explanation)
 
 if __name__ == "__main__":
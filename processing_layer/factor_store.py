@@ -0,0 +1,81 @@
+# processing_layer/factor_store.py
+"""
+Almacén (SQLite) de los factores crudos ya calculados por ubicación.
+
+Cada fila guarda los valores de un grupo de FACTOR_GROUPS para una
+ubicación y el momento en que se calcularon. RiskModel.rescore lo usa para
+volver a consultar solo los grupos cuya antigüedad supera el TTL de su
+clase de volatilidad y reutilizar el resto.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+
+FACTOR_STORE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "factors.sqlite")
+
+# Decimales de la coordenada en la clave (~1 m): la misma propiedad, la misma fila
+COORD_DECIMALS = 5
+
+
+class FactorStore:
+    """
+    Filas (lon, lat, grupo) → (valores, calculado en).
+    """
+    def __init__(self, path=FACTOR_STORE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS factors ("
+            " lon REAL, lat REAL, grp TEXT, value TEXT, computed REAL,"
+            " PRIMARY KEY (lon, lat, grp))"
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def _key(lon, lat):
+        return round(float(lon), COORD_DECIMALS), round(float(lat), COORD_DECIMALS)
+
+    def get(self, lon, lat):
+        """
+        Devuelve {grupo: (valores, calculado en)} para la ubicación.
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT grp, value, computed FROM factors WHERE lon = ? AND lat = ?",
+                self._key(lon, lat),
+            ).fetchall()
+        return {grp: (json.loads(value), computed) for grp, value, computed in rows}
+
+    def put(self, lon, lat, groups, computed=None):
+        """
+        groups: {grupo: {clave: valor}} calculados en el instante computed.
+        """
+        if not groups:
+            return
+        computed = time.time() if computed is None else computed
+        lon_key, lat_key = self._key(lon, lat)
+        rows = [(lon_key, lat_key, grp, json.dumps(values, default=float), computed)
+                for grp, values in groups.items()]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO factors (lon, lat, grp, value, computed) VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+            self._conn.commit()
+
+    def delete(self, lon, lat):
+        with self._lock:
+            self._conn.execute("DELETE FROM factors WHERE lon = ? AND lat = ?", self._key(lon, lat))
+            self._conn.commit()
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM (SELECT DISTINCT lon, lat FROM factors)"
+            ).fetchone()[0]
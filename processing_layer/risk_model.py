@@ -1,5 +1,75 @@
 # processing_layer/risk_model.py
-from data_layer.data2 import DataLayer
+import asyncio
+import copy
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from data_layer.async_layer import UpstreamBusyError
+from data_layer.data2 import BASE_YEAR, WEATHER_TRENDS, DataLayer
+from data_layer.single_flight import AsyncSingleFlight, SingleFlight
+from processing_layer.factor_store import COORD_DECIMALS, FactorStore
+
+# Fuentes independientes de data_layer y las claves crudas que aporta cada una.
+# El orden es el mismo en que get_factors devuelve las claves.
+FACTOR_GROUPS = {
+    "seismic": ("seismic_rate",),
+    "flood": ("flood_rate",),
+    "hurricane": ("hurricane_rate",),
+    "fire": ("fire_rate",),
+    "weather": ("temperature", "humidity", "wind", "precipitation"),
+    "vegetation": ("vegetation",),
+    "elevation": ("elevation",),
+    "volcano": ("volcano_distance_km",),
+}
+
+# Claves que se omiten (en vez de valer 0) si su fuente falla:
+# InsuranceRules ya aplica su propio valor por defecto cuando faltan.
+OPTIONAL_FACTORS = ("volcano_distance_km",)
+
+# Fuente externa que consulta cada grupo (límites de data_layer/async_layer.py)
+GROUP_SOURCES = {
+    "seismic": "usgs",
+    "flood": "earth_engine",
+    "hurricane": "noaa",
+    "fire": "firms",
+    "weather": "open_meteo",
+    "vegetation": "earth_engine",
+    "elevation": "earth_engine",
+    "volcano": "local",
+}
+
+# Entradas de data_layer/cache.py (SOURCE_SPECS) que alimentan cada grupo;
+# rescore las invalida al refrescar el grupo para no releer un valor viejo
+GROUP_CACHE_SOURCES = {
+    "seismic": ("earthquake",),
+    "flood": ("flood",),
+    "hurricane": ("hurricane",),
+    "fire": ("fire",),
+    "weather": ("weather",),
+    "vegetation": ("ndvi",),
+    "elevation": ("elevation",),
+    "volcano": (),
+}
+
+# Clase de volatilidad de cada grupo y cada cuánto (segundos) se vuelve a consultar
+# al re-puntuar una ubicación ya analizada.
+FACTOR_VOLATILITY = {
+    "seismic": "static",
+    "flood": "static",
+    "elevation": "static",
+    "volcano": "static",
+    "hurricane": "seasonal",
+    "fire": "seasonal",
+    "vegetation": "seasonal",
+    "weather": "dynamic",
+}
+VOLATILITY_TTL = {
+    "static": 90 * 24 * 3600,
+    "seasonal": 24 * 3600,
+    "dynamic": 3600,
+}
 
 class RiskModel:
     """
@@ -7,8 +77,15 @@ class RiskModel:
     combinando factores geoespaciales y climáticos.
     Versión robusta: devuelve riesgo general y % por métrica.
     """
-    def __init__(self):
+    def __init__(self, factor_store=None):
         self.data_layer = DataLayer()
+        # Factores ya calculados por ubicación (para re-puntuar sin consultar todo)
+        self.factor_store = factor_store if factor_store is not None else FactorStore()
+        # Análisis idénticos en curso (misma ubicación y año) se calculan una sola vez
+        self.flights = SingleFlight()
+        self.async_flights = AsyncSingleFlight()
+        # Hilos para consultar las fuentes en paralelo (una por grupo de factores)
+        self.max_workers = len(FACTOR_GROUPS)
         # Ponderaciones (deben sumar aproximadamente 1.0)
         self.weights = {
             "seismic": 0.4,
@@ -99,9 +176,100 @@ class RiskModel:
     # Public: calcula riesgo y devuelve desglose
     # -----------------------------
     def calculate_risk_with_breakdown(self, lon, lat, target_year=None):
+        # Peticiones simultáneas con la misma clave comparten un solo cálculo;
+        # cada una recibe su copia (app.py agrega campos al resultado)
+        key = self._analysis_key(lon, lat, target_year)
+        return copy.deepcopy(self.flights.do(key, self._calculate_risk, lon, lat, target_year))
+
+    def _analysis_key(self, lon, lat, target_year):
+        return round(float(lon), COORD_DECIMALS), round(float(lat), COORD_DECIMALS), target_year
+
+    def _calculate_risk(self, lon, lat, target_year=None):
     # 1️⃣ Guardar los valores crudos
-        raw = self.get_factors(lon, lat, target_year=target_year)
+        raw, failed = self._gather_factors(lon, lat, target_year)
+        if target_year is None:
+            self._store_groups(lon, lat, raw, exclude=failed)
+        return self.score_factors(raw)
+
+    # -----------------------------
+    # Public: re-puntuar una ubicación ya analizada
+    # -----------------------------
+    def rescore(self, lon, lat, now=None, force=False):
+        """
+        Riesgo actual reutilizando los factores guardados de la ubicación:
+        solo se consultan los grupos sin guardar o cuya antigüedad supera el TTL
+        de su clase de volatilidad (force=True consulta todo).
+        Si una fuente falla y hay un valor guardado, se usa el guardado.
+        Los grupos refrescados se leen de la fuente, no de la caché de DataLayer
+        (cuyo TTL puede ser más largo que el de su clase de volatilidad).
+        """
+        now = time.time() if now is None else now
+        stored = self.factor_store.get(lon, lat)
+        stale = [
+            name for name in FACTOR_GROUPS
+            if force or name not in stored
+            or now - stored[name][1] > VOLATILITY_TTL[FACTOR_VOLATILITY[name]]
+        ]
+
+        self._invalidate_cached(lon, lat, stale)
+        fresh, failed = self._gather_factors(lon, lat, groups=stale) if stale else ({}, set())
+        self._store_groups(lon, lat, fresh, exclude=failed, computed=now)
+
+        raw = {}
+        for name, keys in FACTOR_GROUPS.items():
+            if name in stored and (name not in stale or name in failed):
+                values = stored[name][0]
+            else:
+                values = fresh
+            raw.update({key: values[key] for key in keys if key in values})
+
+        result = self.score_factors(raw)
+        result['refreshed_factors'] = [name for name in stale if name not in failed]
+        return result
+
+    def _invalidate_cached(self, lon, lat, groups):
+        cache = self.data_layer.cache
+        if cache is None:
+            return
+        for name in groups:
+            for source in GROUP_CACHE_SOURCES[name]:
+                cache.invalidate(source, lon, lat)
+
+    def _store_groups(self, lon, lat, raw, exclude=(), computed=None):
+        """
+        Guarda por grupo los factores obtenidos (los grupos que fallaron no).
+        Sin computed, cada grupo se guarda con la antigüedad real de su dato:
+        si vino de la caché de DataLayer, el momento en que se guardó ahí.
+        """
+        groups = {
+            name: {key: raw[key] for key in keys if key in raw}
+            for name, keys in FACTOR_GROUPS.items()
+            if name not in exclude and any(key in raw for key in keys)
+        }
+        if computed is not None:
+            self.factor_store.put(lon, lat, groups, computed=computed)
+            return
+        now = time.time()
+        by_age = {}
+        for name, values in groups.items():
+            by_age.setdefault(self._cached_since(lon, lat, name, now), {})[name] = values
+        for since, batch in by_age.items():
+            self.factor_store.put(lon, lat, batch, computed=since)
+
+    def _cached_since(self, lon, lat, name, now):
+        """
+        Momento del dato más viejo que la caché de DataLayer sirvió al grupo (now si ninguno).
+        """
+        cache = self.data_layer.cache
+        if cache is None:
+            return now
+        created = [cache.created(source, lon, lat) for source in GROUP_CACHE_SOURCES[name]]
+        return min([c for c in created if c is not None], default=now)
 
+    def score_factors(self, raw):
+        """
+        Normaliza los factores crudos y calcula el riesgo ponderado (sin I/O).
+        """
         # 2️⃣ Normalización de métricas
         m = {}
         n = {}
@@ -110,7 +278,6 @@ class RiskModel:
         seismic_raw = float(raw.get('seismic_rate'))
         m['seismic'] = 1.0 if seismic_raw else 0.0
         n['seismic'] = self._clip01(seismic_raw / self.max_values['seismic'])
-        print(n['seismic'])
 
         flood_raw = raw.get('flood_rate')
         flood_val = self._extract_numeric(flood_raw)
@@ -173,22 +340,185 @@ class RiskModel:
             'risk_percent': risk_percent  # ejemplo de cálculo de riesgo general
         }
 
+    # -----------------------------
+    # Public: riesgo por lotes (columnar y vectorizado)
+    # -----------------------------
+    def calculate_risk_batch(self, factors):
+        """
+        Versión vectorizada de score_factors para muchas filas a la vez.
+        factors: dict de arrays, DataFrame o record array con las claves de
+        get_factors (seismic_rate, flood_rate, ..., elevation). NaN o None
+        equivalen a un factor ausente (None en la ruta escalar).
+        Devuelve {'risk_percent': array int, 'metrics_percent': {métrica: array}},
+        con los mismos valores que score_factors fila por fila.
+        """
+        cols = self._as_columns(factors)
+        size = len(next(iter(cols.values()))[0]) if cols else 0
+        zeros = np.zeros(size)
+        missing = (zeros, np.zeros(size, dtype=bool), np.zeros(size, dtype=bool))
 
-        # Ajuste dinámico de pesos
-        adjusted_weights = self.adjust_weights(raw)
+        def column(key):
+            # (valores numéricos con 0 si falta, presente, veraz como en `if raw:`)
+            return cols.get(key, missing)
 
-        # Calcular riesgo ponderado
-        total = 0.0
-        for key, w in adjusted_weights.items():
-            total += m.get(key, 0) * w
+        # 2️⃣ Normalización de métricas
+        m = {}
+        n = {}
+        simple = {
+            'seismic': 'seismic_rate', 'flood': 'flood_rate', 'hurricane': 'hurricane_rate',
+            'fire': 'fire_rate', 'temperature': 'temperature', 'humidity': 'humidity',
+            'wind': 'wind', 'precipitation': 'precipitation',
+        }
+        for metric, key in simple.items():
+            values, _, truthy = column(key)
+            m[metric] = np.where(truthy, 1.0, 0.0)
+            n[metric] = self._clip01_np(values / self.max_values[metric])
+
+        vegetation, veg_present, _ = column('vegetation')
+        m['vegetation'] = np.where(veg_present, 1.0, 0.0)
+        n['vegetation'] = self._clip01_np(1.0 - self._normalize_ndvi_np(vegetation))
+
+        elev, _, elev_truthy = column('elevation')
+        m['elevation'] = np.where(elev_truthy, 1.0, 0.0)
+        n['elevation'] = self._clip01_np(1.0 - self._clip01_np(elev / self.max_values['elevation']))
+
+        # Pesos ajustados por fila (mismas reglas y mismo orden que adjust_weights)
+        w = {k: np.full(size, v, dtype=float) for k, v in self.weights.items()}
+        fire_zero = column('fire_rate')[0] == 0
+        w['wind'] = np.where(fire_zero, w['wind'] * 0.5, w['wind'])
+        w['precipitation'] = np.where(fire_zero, w['precipitation'] * 0.5, w['precipitation'])
+        w['vegetation'] = np.where(fire_zero, 0.0, w['vegetation'])
+        w['wind'] = np.where(column('hurricane_rate')[0] == 0, w['wind'] * 0.5, w['wind'])
+        w['temperature'] = zeros.copy()
+        w['seismic'] = np.where(~column('seismic_rate')[2], w['seismic'] * 0.5, w['seismic'])
+        w['fire'] = np.where(vegetation > 0.5, w['fire'] * 0.6, w['fire'])
+        low = elev < 100
+        w['flood'] = np.where(low, w['flood'] * 1.3, w['flood'])
+        w['hurricane'] = np.where(low, w['hurricane'] * 1.2, w['hurricane'])
+        w['fire'] = np.where(column('humidity')[0] < 30, w['fire'] * 1.4, w['fire'])
+
+        total_w = np.zeros(size)
+        for k in w:
+            total_w = total_w + w[k]
+        positive = total_w > 0
+        safe_total = np.where(positive, total_w, 1.0)
+        for k in w:
+            w[k] = np.where(positive, w[k] / safe_total, w[k])
+
+        # Suma ponderada acumulada en el mismo orden que la ruta escalar
+        total = np.zeros(size)
+        for key in w:
+            total = total + m.get(key, zeros) * w[key]
 
-        risk_percent = int(round(total * 100))
-        metrics_percent = {k: round(v*100, 2) for k, v in m.items()}
+        return {
+            'risk_percent': np.rint(total * 100).astype(int),
+            'metrics_percent': {k: self._round2_np(v * 100) for k, v in n.items()},
+        }
+
+    # -----------------------------
+    # Proyección multianual (una sola consulta de datos)
+    # -----------------------------
+    def project_risk_series(self, lon, lat, start_year, end_year):
+        """
+        Serie de riesgo por año para [start_year, end_year].
+        Los factores actuales se consultan una vez; el clima y el NDVI de todos
+        los años salen de una sola pasada vectorizada del modelo de tendencia.
+        """
+        raw, failed = self._gather_factors(lon, lat)
+        years = np.arange(start_year, end_year + 1)
+        years_ahead = years - BASE_YEAR
+        columns = {}
+
+        # 🔹 Clima proyectado (si la consulta actual falló, se queda en 0 como en get_factors)
+        if 'weather' not in failed:
+            weather = self.data_layer.project_weather({
+                'temperature': raw['temperature'],
+                'humidity': raw['humidity'],
+                'wind_speed': raw['wind'],
+                'precipitation': raw['precipitation'],
+            }, years_ahead)
+            columns['temperature'] = weather['temperature']
+            columns['humidity'] = weather['humidity']
+            columns['wind'] = weather['wind_speed']
+            columns['precipitation'] = weather['precipitation']
+
+        # 🔹 NDVI proyectado: una sola tendencia para toda la serie (fija por ubicación)
+        if 'vegetation' not in failed and raw.get('vegetation') is not None:
+            trend = float(self.data_layer.ndvi_trend(lon, lat))
+            columns['vegetation'] = self.data_layer.project_ndvi(raw['vegetation'], years_ahead, trend)
+        else:
+            columns['vegetation'] = np.zeros(len(years))
+
+        # 🔹 Todos los años se puntúan en una sola pasada vectorizada
+        batch = {key: np.full(len(years), value, dtype=object if isinstance(value, dict) else float)
+                 for key, value in raw.items() if key not in columns and value is not None}
+        batch.update(columns)
+        scored = self.calculate_risk_batch(batch)
+
+        series = []
+        for i, year in enumerate(years):
+            series.append({
+                'year': int(year),
+                'risk_percent': int(scored['risk_percent'][i]),
+                'metrics_percent': {k: float(v[i]) for k, v in scored['metrics_percent'].items()},
+            })
 
         return {
-            "risk_percent": risk_percent,
-            "metrics_percent": metrics_percent,
-            "raw_factors": raw
+            'baseline_factors': raw,
+            'series': series,
+        }
+
+    def project_risk_ensemble(self, lon, lat, start_year, end_year, n_scenarios=2000, seed=0):
+        """
+        Ensamble Monte Carlo de la proyección: n_scenarios tendencias de
+        temperatura, humedad, precipitación y NDVI (generador con semilla, así
+        que la misma petición da el mismo resultado), puntuadas todas
+        (escenarios x años) en una sola pasada de calculate_risk_batch.
+        Devuelve los percentiles p5/p50/p95 del riesgo por año.
+        """
+        raw, failed = self._gather_factors(lon, lat)
+        rng = np.random.default_rng(seed)
+        scenarios = self.data_layer.sample_trend_scenarios(n_scenarios, rng)
+        years = np.arange(start_year, end_year + 1)
+        years_ahead = (years - BASE_YEAR)[np.newaxis, :]   # (1, años)
+        shape = (n_scenarios, len(years))
+        columns = {}
+
+        # 🔹 Clima: una tendencia por escenario (columna) aplicada a todos los años
+        if 'weather' not in failed:
+            weather = self.data_layer.project_weather({
+                'temperature': raw['temperature'],
+                'humidity': raw['humidity'],
+                'wind_speed': raw['wind'],
+                'precipitation': raw['precipitation'],
+            }, years_ahead, trends={key: scenarios[key][:, np.newaxis] for key in WEATHER_TRENDS})
+            columns['temperature'] = weather['temperature']
+            columns['humidity'] = weather['humidity']
+            columns['wind'] = weather['wind_speed']
+            columns['precipitation'] = weather['precipitation']
+
+        if 'vegetation' not in failed and raw.get('vegetation') is not None:
+            columns['vegetation'] = self.data_layer.project_ndvi(
+                raw['vegetation'], years_ahead, scenarios['ndvi'][:, np.newaxis])
+        else:
+            columns['vegetation'] = np.zeros(shape)
+
+        size = n_scenarios * len(years)
+        batch = {key: np.full(size, value, dtype=object if isinstance(value, dict) else float)
+                 for key, value in raw.items() if key not in columns and value is not None}
+        batch.update({key: np.broadcast_to(value, shape).ravel() for key, value in columns.items()})
+        risk = self.calculate_risk_batch(batch)['risk_percent'].reshape(shape)
+
+        p5, p50, p95 = np.percentile(risk, [5, 50, 95], axis=0)
+        series = [
+            {'year': int(year), 'p5': float(p5[i]), 'p50': float(p50[i]), 'p95': float(p95[i])}
+            for i, year in enumerate(years)
+        ]
+        return {
+            'baseline_factors': raw,
+            'n_scenarios': n_scenarios,
+            'seed': seed,
+            'series': series,
         }
 
     # -----------------------------
@@ -202,6 +532,61 @@ class RiskModel:
         except:
             return 0.0
 
+    def _clip01_np(self, x):
+        return np.nan_to_num(np.clip(x, 0.0, 1.0), nan=0.0)
+
+    def _round2_np(self, x):
+        """
+        round(x, 2) de Python sobre un array. np.round puede diferir en los
+        casos casi empatados (…5), así que esos pocos se redondean en Python.
+        """
+        out = np.round(x, 2)
+        frac = np.abs(x * 100 - np.floor(x * 100) - 0.5)
+        for i in np.flatnonzero(frac < 1e-6):
+            out[i] = round(float(x[i]), 2)
+        return out
+
+    def _normalize_ndvi_np(self, raw):
+        """
+        Versión vectorizada de _normalize_ndvi (raw ya numérico, 0 si ausente).
+        """
+        big = np.abs(raw) > 2
+        ndvi_10k = raw / 10000.0
+        ndvi_1k = raw / 1000.0
+        in_10k = (ndvi_10k >= -1.0) & (ndvi_10k <= 1.0)
+        in_1k = (ndvi_1k >= -1.0) & (ndvi_1k <= 1.0)
+        scaled = np.where(in_10k, (ndvi_10k + 1.0) / 2.0,
+                          np.where(in_1k, (ndvi_1k + 1.0) / 2.0, (raw + 10000.0) / 20000.0))
+        out = np.where(big, scaled, (raw + 1.0) / 2.0)
+        return np.where(raw == 0, 0.0, self._clip01_np(out))
+
+    def _as_columns(self, factors):
+        """
+        Convierte la entrada columnar en {clave: (valores, presente, veraz)}.
+        valores: float con 0 donde falta; presente: no es None/NaN;
+        veraz: lo que daría `if raw:` en la ruta escalar (un dict no vacío cuenta).
+        """
+        if hasattr(factors, 'columns'):          # DataFrame
+            raw_cols = {c: factors[c].to_numpy() for c in factors.columns}
+        elif getattr(factors, 'dtype', None) is not None and factors.dtype.names:  # record array
+            raw_cols = {c: factors[c] for c in factors.dtype.names}
+        else:
+            raw_cols = {c: np.asarray(v) for c, v in factors.items()}
+
+        cols = {}
+        for key, values in raw_cols.items():
+            if values.dtype == object:
+                present = np.array([v is not None and v == v for v in values], dtype=bool)
+                truthy = np.array([bool(v) and v == v if v is not None else False for v in values], dtype=bool)
+                numeric = np.array([self._extract_numeric(v) for v in values], dtype=float)
+            else:
+                numeric = values.astype(float)
+                present = ~np.isnan(numeric)
+                truthy = present & (numeric != 0)
+            numeric = np.where(present, numeric, 0.0)
+            cols[key] = (numeric, present, truthy)
+        return cols
+
     def _extract_numeric(self, val):
         """
         Extrae un valor numérico de una posible estructura (dict/list/number).
@@ -256,60 +641,200 @@ class RiskModel:
     # -----------------------------
     # Obtener factores desde data_layer (si falla, devuelve 0 seguro)
     # -----------------------------
-    def get_factors(self, lon, lat, target_year=None):
+    def get_factors(self, lon, lat, target_year=None, concurrent=True):
         """
         Obtiene factores crudos para la ubicación.
         Si target_year es None → datos actuales.
         Si target_year = N → usar proyecciones climáticas / NDVI proyectado.
+        concurrent=True lanza todas las fuentes a la vez en un pool de hilos,
+        así la latencia total es la de la fuente más lenta y no la suma.
+        """
+        f, _ = self._gather_factors(lon, lat, target_year, concurrent=concurrent)
+        return f
+
+    def get_factors_batch(self, lons, lats, target_year=None):
         """
+        Factores crudos columnares para muchos puntos, usando las rutas por
+        lotes de data_layer (teselas locales y caché antes de un reduceRegions
+        de GEE, Open-Meteo multi-ubicación, catálogos locales). Devuelve
+        {clave: array} con NaN donde falta el dato; si una fuente falla entera
+        se informa cada grupo afectado y sus claves quedan en NaN (dato ausente).
+        """
+        lons = [float(x) for x in lons]
+        lats = [float(y) for y in lats]
+        size = len(lons)
         f = {}
-        
-        # 🔹 Riesgos geológicos (sismos, elevación) → estáticos
-        try:
-            f['seismic_rate'] = self.data_layer.get_earthquake_frequency(lon, lat)
-        except Exception:
-            f['seismic_rate'] = 0
-        try:
-            f['flood_rate'] = self.data_layer.get_flood_risk(lon, lat, rp="RP10_depth_category")
-        except Exception:
-            f['flood_rate'] = 0
-        try:
-            f['hurricane_rate'] = self.data_layer.get_hurricane_frequency(lon, lat)
-        except Exception:
-            f['hurricane_rate'] = 0
+
+        def as_array(values):
+            return np.array([np.nan if v is None else v for v in values], dtype=float)
+
+        def collect(name, fetch):
+            try:
+                f.update(fetch())
+            except Exception as e:
+                print(f"⚠️ Grupo '{name}' falló en el lote de {size} puntos: {e}")
+                f.update({key: np.full(size, np.nan) for key in FACTOR_GROUPS[name] if key not in OPTIONAL_FACTORS})
+
+        # Inundación, NDVI y elevación salen del mismo muestreo; si GEE falla
+        # se informa cada grupo y se conserva lo que ya estaba en teselas o caché
+        static = {}
+
+        def static_layer(name, key):
+            if not static:
+                try:
+                    static['values'] = self.data_layer.sample_static_batch(lons, lats, rp="RP10_depth_category")
+                except Exception as e:
+                    static['error'] = e
+                    static['values'] = self.data_layer.lookup_static_batch(lons, lats, rp="RP10_depth_category")[0]
+            values = static['values'][key]
+            if 'error' in static:
+                print(f"⚠️ Grupo '{name}' falló en el lote de {size} puntos: {static['error']} "
+                      f"(se conservan {np.count_nonzero(~np.isnan(values))} de teselas locales y caché)")
+            return {key: values}
+
+        def weather():
+            rows = self.data_layer.get_weather_batch(lons, lats)
+            current = {
+                key: as_array([row.get(key) if row else None for row in rows])
+                for key in ('temperature', 'humidity', 'wind_speed', 'precipitation')
+            }
+            if target_year:
+                current = self.data_layer.project_weather(current, target_year - BASE_YEAR)
+            return {
+                'temperature': current['temperature'],
+                'humidity': current['humidity'],
+                'wind': current['wind_speed'],
+                'precipitation': current['precipitation'],
+            }
+
+        collect('seismic', lambda: {'seismic_rate': as_array(self.data_layer.get_earthquake_frequency_batch(lons, lats))})
+        collect('hurricane', lambda: {'hurricane_rate': as_array(self.data_layer.get_hurricane_frequency_batch(lons, lats))})
+        collect('fire', lambda: {'fire_rate': as_array(self.data_layer.get_fire_frequency_batch(lons, lats))})
+        collect('weather', weather)
+        for name in ('flood', 'vegetation', 'elevation'):
+            f.update(static_layer(name, FACTOR_GROUPS[name][0]))
+        collect('volcano', lambda: {'volcano_distance_km': self.data_layer.get_volcano_proximity_batch(lons, lats)[0]})
+
+        # 🔹 NDVI proyectado: la misma tendencia por celda que get_future_ndvi
+        if target_year:
+            trend = self.data_layer.ndvi_trend(lons, lats)
+            ndvi = f['vegetation']
+            f['vegetation'] = np.where(np.isnan(ndvi), np.nan,
+                                       self.data_layer.project_ndvi(np.nan_to_num(ndvi), target_year - BASE_YEAR, trend))
+
+        return {key: f[key] for group in FACTOR_GROUPS.values() for key in group if key in f}
+
+    def _gather_factors(self, lon, lat, target_year=None, groups=None, concurrent=True):
+        """
+        Consulta los grupos pedidos (todos por defecto).
+        Devuelve (factores, grupos que fallaron y quedaron con su valor por defecto).
+        """
+        names = [name for name in FACTOR_GROUPS if groups is None or name in groups]
+        f = {}
+        failed = set()
+        if concurrent:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+                futures = {
+                    name: pool.submit(self._fetch_group, name, lon, lat, target_year)
+                    for name in names
+                }
+                for name, future in futures.items():
+                    f.update(self._collect_group(name, future.result, failed))
+        else:
+            for name in names:
+                f.update(self._collect_group(
+                    name, lambda name=name: self._fetch_group(name, lon, lat, target_year), failed))
+        return f, failed
+
+    async def calculate_risk_async(self, lon, lat, async_layer, target_year=None):
+        """
+        calculate_risk_with_breakdown para asyncio (mismo resultado y misma coalescencia).
+        """
+        key = self._analysis_key(lon, lat, target_year)
+        result = await self.async_flights.do(key, self._calculate_risk_async, lon, lat, async_layer, target_year)
+        return copy.deepcopy(result)
+
+    async def _calculate_risk_async(self, lon, lat, async_layer, target_year=None):
+        raw, failed = await self._gather_factors_async(lon, lat, async_layer, target_year)
+        if target_year is None:
+            await async_layer.run("local", self._store_groups, lon, lat, raw, failed)
+        return self.score_factors(raw)
+
+    async def get_factors_async(self, lon, lat, async_layer, target_year=None):
+        f, _ = await self._gather_factors_async(lon, lat, async_layer, target_year)
+        return f
+
+    async def _gather_factors_async(self, lon, lat, async_layer, target_year=None):
+        """
+        _gather_factors para asyncio: cada grupo espera su lugar en el límite de
+        su fuente (async_layer) y todos corren a la vez. Un grupo que falla vale 0
+        como en get_factors; UpstreamBusyError se propaga (contrapresión).
+        """
+        names = list(FACTOR_GROUPS)
+        results = await asyncio.gather(*(
+            async_layer.run(GROUP_SOURCES[name], self._fetch_group, name, lon, lat, target_year)
+            for name in names
+        ), return_exceptions=True)
+        f = {}
+        failed = set()
+        for name, result in zip(names, results):
+            if isinstance(result, UpstreamBusyError):
+                raise result
+            if isinstance(result, Exception):
+                failed.add(name)
+                result = {key: 0 for key in FACTOR_GROUPS[name] if key not in OPTIONAL_FACTORS}
+            f.update(result)
+        return f, failed
+
+    def _collect_group(self, name, fetch, failed):
+        """
+        Ejecuta la consulta de un grupo; si falla, todas sus claves valen 0.
+        """
         try:
-            f['fire_rate'] = self.data_layer.get_fire_frequency(lon, lat)
+            return fetch()
         except Exception:
-            f['fire_rate'] = 0
-        
+            failed.add(name)
+            return {key: 0 for key in FACTOR_GROUPS[name] if key not in OPTIONAL_FACTORS}
+
+    def _fetch_group(self, name, lon, lat, target_year=None):
+        """
+        Consulta una sola fuente de data_layer y devuelve sus claves crudas.
+        """
+        # 🔹 Riesgos geológicos (sismos, elevación) → estáticos
+        if name == 'seismic':
+            return {'seismic_rate': self.data_layer.get_earthquake_frequency(lon, lat)}
+        if name == 'flood':
+            return {'flood_rate': self.data_layer.get_flood_risk(lon, lat, rp="RP10_depth_category")}
+        if name == 'hurricane':
+            return {'hurricane_rate': self.data_layer.get_hurricane_frequency(lon, lat)}
+        if name == 'fire':
+            return {'fire_rate': self.data_layer.get_fire_frequency(lon, lat)}
+
         # 🔹 Factores climáticos → proyectados si target_year no es None
-        try:
+        if name == 'weather':
             if target_year:
-                # Aquí llamarías a tu método de predicción/clima proyectado
                 weather = self.data_layer.get_future_weather(lon, lat, target_year)
             else:
                 weather = self.data_layer.get_weather(lon, lat)
-            
-            f['temperature'] = weather.get('temperature', 0)
-            f['humidity'] = weather.get('humidity', 0)
-            f['wind'] = weather.get('wind_speed', 0)
-            f['precipitation'] = weather.get('precipitation', 0)
-        except Exception:
-            f['temperature'] = f['humidity'] = f['wind'] = f['precipitation'] = 0
+            return {
+                'temperature': weather.get('temperature', 0),
+                'humidity': weather.get('humidity', 0),
+                'wind': weather.get('wind_speed', 0),
+                'precipitation': weather.get('precipitation', 0),
+            }
 
         # 🔹 Vegetación (NDVI)
-        try:
+        if name == 'vegetation':
             if target_year:
-                f['vegetation'] = self.data_layer.get_future_ndvi(lon, lat, target_year)
-            else:
-                f['vegetation'] = self.data_layer.get_ndvi(lon, lat)
-        except Exception:
-            f['vegetation'] = 0
-        
+                return {'vegetation': self.data_layer.get_future_ndvi(lon, lat, target_year)}
+            return {'vegetation': self.data_layer.get_ndvi(lon, lat)}
+
         # 🔹 Elevación → estático
-        try:
-            f['elevation'] = self.data_layer.get_elevation(lon, lat)
-        except Exception:
-            f['elevation'] = 0
+        if name == 'elevation':
+            return {'elevation': self.data_layer.get_elevation(lon, lat)}
 
-        return f
+        # 🔹 Distancia al volcán más cercano → estático
+        if name == 'volcano':
+            return {'volcano_distance_km': self.data_layer.get_volcano_proximity(lon, lat)}
+
+        raise KeyError(f"Grupo de factores desconocido: {name}")
@@ -0,0 +1,183 @@
+# processing_layer/risk_surface.py
+"""
+Superficie de riesgo sobre una caja (bbox) con tamaño de celda fijo.
+
+El trabajo parte la rejilla en bloques de filas, y cada bloque se procesa
+en un proceso del pool: factores por lotes → calculate_risk_batch → archivo
+chunks/chunk_XXXXX.npz. Los bloques ya escritos se saltan, así que una
+corrida grande (un estado completo) se puede interrumpir y retomar.
+Al final se arma un raster por capa (.npy float32, fila 0 = norte) y un
+metadata.json con la geotransformación (estilo GDAL, EPSG:4326).
+"""
+import argparse
+import json
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from processing_layer.risk_model import RiskModel
+
+METRICS = ("seismic", "flood", "hurricane", "fire", "temperature", "humidity",
+           "wind", "precipitation", "vegetation", "elevation")
+
+# Un RiskModel por proceso del pool (se crea una vez por worker)
+_worker_model = None
+
+
+def _init_worker():
+    global _worker_model
+    _worker_model = RiskModel()
+
+
+def _score_chunk(grid, chunk_id, row0, row1, target_year, chunk_path):
+    """
+    Puntúa las filas [row0, row1) de la rejilla y guarda el bloque.
+    """
+    cell = grid["cell_deg"]
+    cols = np.arange(grid["width"])
+    rows = np.arange(row0, row1)
+    lons = grid["min_lon"] + (cols + 0.5) * cell
+    lats = grid["max_lat"] - (rows + 0.5) * cell
+    lon_grid, lat_grid = np.meshgrid(lons, lats)
+
+    model = _worker_model or RiskModel()
+    factors = model.get_factors_batch(lon_grid.ravel(), lat_grid.ravel(), target_year=target_year)
+    scored = model.calculate_risk_batch(factors)
+
+    shape = lon_grid.shape
+    layers = {"risk": scored["risk_percent"].reshape(shape).astype(np.float32)}
+    for metric in METRICS:
+        layers[metric] = scored["metrics_percent"][metric].reshape(shape).astype(np.float32)
+
+    # Escritura atómica: un bloque existe completo o no existe
+    tmp_path = chunk_path + ".tmp.npz"
+    np.savez(tmp_path, row0=row0, row1=row1, **layers)
+    os.replace(tmp_path, chunk_path)
+    return chunk_id
+
+
+class RiskSurfaceJob:
+    """
+    bbox: (min_lon, min_lat, max_lon, max_lat); cell_deg: tamaño de celda en grados.
+    """
+    def __init__(self, bbox, cell_deg, out_dir, chunk_size=2000, workers=None, target_year=None):
+        min_lon, min_lat, max_lon, max_lat = bbox
+        if max_lon <= min_lon or max_lat <= min_lat or cell_deg <= 0:
+            raise ValueError(f"bbox o tamaño de celda inválidos: {bbox}, {cell_deg}")
+        self.out_dir = out_dir
+        self.chunk_dir = os.path.join(out_dir, "chunks")
+        self.workers = workers or os.cpu_count()
+        self.target_year = target_year
+        self.grid = {
+            "min_lon": min_lon,
+            "max_lat": max_lat,
+            "cell_deg": cell_deg,
+            "width": int(math.ceil((max_lon - min_lon) / cell_deg)),
+            "height": int(math.ceil((max_lat - min_lat) / cell_deg)),
+        }
+        self.rows_per_chunk = max(1, chunk_size // self.grid["width"])
+        self.n_chunks = int(math.ceil(self.grid["height"] / self.rows_per_chunk))
+
+    def _chunk_path(self, chunk_id):
+        return os.path.join(self.chunk_dir, f"chunk_{chunk_id:05d}.npz")
+
+    def _job_spec(self):
+        return {"grid": self.grid, "rows_per_chunk": self.rows_per_chunk, "target_year": self.target_year}
+
+    def _check_spec(self):
+        """
+        Guarda la definición del trabajo; si ya existe debe coincidir
+        (retomar con otra rejilla mezclaría bloques incompatibles).
+        """
+        os.makedirs(self.chunk_dir, exist_ok=True)
+        spec_path = os.path.join(self.out_dir, "job.json")
+        spec = self._job_spec()
+        if os.path.exists(spec_path):
+            with open(spec_path) as f:
+                if json.load(f) != json.loads(json.dumps(spec)):
+                    raise ValueError(f"{self.out_dir} contiene un trabajo con otra rejilla")
+        else:
+            with open(spec_path, "w") as f:
+                json.dump(spec, f, indent=2)
+
+    def pending_chunks(self):
+        return [c for c in range(self.n_chunks) if not os.path.exists(self._chunk_path(c))]
+
+    def run(self):
+        """
+        Procesa los bloques pendientes en paralelo y arma los rasters.
+        """
+        self._check_spec()
+        pending = self.pending_chunks()
+        total_cells = self.grid["width"] * self.grid["height"]
+        print(f"🗺️ Rejilla {self.grid['width']}x{self.grid['height']} ({total_cells} celdas), "
+              f"{len(pending)}/{self.n_chunks} bloques pendientes")
+
+        start = time.time()
+        if pending:
+            with ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker) as pool:
+                futures = []
+                for chunk_id in pending:
+                    row0 = chunk_id * self.rows_per_chunk
+                    row1 = min(self.grid["height"], row0 + self.rows_per_chunk)
+                    futures.append(pool.submit(_score_chunk, self.grid, chunk_id, row0, row1,
+                                               self.target_year, self._chunk_path(chunk_id)))
+                for done, future in enumerate(as_completed(futures), 1):
+                    chunk_id = future.result()
+                    print(f"  ✅ bloque {chunk_id} ({done}/{len(pending)}, {time.time() - start:.1f}s)")
+
+        return self.assemble()
+
+    def assemble(self):
+        """
+        Une los bloques en un raster por capa + metadata.json.
+        """
+        if self.pending_chunks():
+            raise RuntimeError("Faltan bloques por procesar; ejecuta run() primero")
+        shape = (self.grid["height"], self.grid["width"])
+        layers = {name: np.full(shape, np.nan, dtype=np.float32) for name in ("risk",) + METRICS}
+        for chunk_id in range(self.n_chunks):
+            with np.load(self._chunk_path(chunk_id)) as chunk:
+                row0, row1 = int(chunk["row0"]), int(chunk["row1"])
+                for name in layers:
+                    layers[name][row0:row1] = chunk[name]
+
+        files = {}
+        for name, array in layers.items():
+            filename = f"{name}.npy"
+            np.save(os.path.join(self.out_dir, filename), array)
+            files[name] = filename
+
+        cell = self.grid["cell_deg"]
+        metadata = {
+            "crs": "EPSG:4326",
+            "width": self.grid["width"],
+            "height": self.grid["height"],
+            # GDAL: (origen x, ancho de píxel, 0, origen y, 0, -alto de píxel); esquina noroeste
+            "geotransform": [self.grid["min_lon"], cell, 0.0, self.grid["max_lat"], 0.0, -cell],
+            "units": "percent (0-100)",
+            "nodata": "NaN",
+            "target_year": self.target_year,
+            "layers": files,
+        }
+        with open(os.path.join(self.out_dir, "metadata.json"), "w") as f:
+            json.dump(metadata, f, indent=2)
+        print(f"✅ Superficie de riesgo guardada en {self.out_dir}")
+        return metadata
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Genera una superficie de riesgo sobre una bbox.")
+    parser.add_argument("--bbox", type=float, nargs=4, required=True,
+                        metavar=("MIN_LON", "MIN_LAT", "MAX_LON", "MAX_LAT"))
+    parser.add_argument("--cell", type=float, required=True, help="Tamaño de celda en grados")
+    parser.add_argument("--out", required=True, help="Directorio de salida (reutilizarlo retoma el trabajo)")
+    parser.add_argument("--chunk-size", type=int, default=2000, help="Puntos aproximados por bloque")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--year", type=int, default=None)
+    args = parser.parse_args()
+
+    RiskSurfaceJob(tuple(args.bbox), args.cell, args.out, args.chunk_size, args.workers, args.year).run()
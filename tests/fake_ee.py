@@ -0,0 +1,57 @@
+"""
+Earth Engine falso para pruebas: reduceRegions evalúa una función de Python
+por punto y cuenta cuántas veces se llama a getInfo.
+"""
+import types
+
+
+class _Result:
+    def __init__(self, ee, value):
+        self.ee = ee
+        self.value = value
+
+    def getInfo(self):
+        self.ee.get_info_calls += 1
+        if self.ee.fail:
+            raise RuntimeError("Earth Engine no disponible")
+        return self.value
+
+
+class FakeStack:
+    """
+    Imagen de varias bandas: bands(lon, lat) → {banda: valor} (sin la banda = enmascarado).
+    """
+    def __init__(self, ee, bands):
+        self.ee = ee
+        self.bands = bands
+
+    def reduceRegions(self, collection, reducer=None, scale=None):
+        self.ee.points_sampled += len(collection)
+        features = []
+        for feature in collection:
+            lon, lat = feature["geometry"]
+            features.append({"properties": dict(feature["properties"], **self.bands(lon, lat))})
+        return _Result(self.ee, {"features": features})
+
+
+class FakeEE(types.SimpleNamespace):
+    def __init__(self, fail=False):
+        super().__init__()
+        self.fail = fail
+        self.get_info_calls = 0
+        self.points_sampled = 0
+        self.initialized = []
+        self.Geometry = types.SimpleNamespace(Point=lambda coords: tuple(coords))
+        self.Reducer = types.SimpleNamespace(first=lambda: "first")
+
+    def Initialize(self, project=None):
+        self.initialized.append(project)
+
+    def Feature(self, geometry, properties):
+        return {"geometry": geometry, "properties": properties}
+
+    def FeatureCollection(self, features):
+        return list(features)
+
+    def Number(self, value):
+        return _Result(self, value)
@@ -0,0 +1,119 @@
+import numpy as np
+import pytest
+
+from business_layer.accumulation import ExposureGrid
+from data_layer.spatial_index import haversine_np
+
+
+def brute_force(policies, lon, lat, radius_km):
+    inside = [p for p in policies if haversine_np(lon, lat, p[1], p[2]) <= radius_km]
+    return len(inside), sum(p[3] for p in inside), sum(p[3] * p[4] / 100.0 for p in inside)
+
+
+def random_policies(rng, n, lon_range, lat_range):
+    return [(f"P{i}", float(rng.uniform(*lon_range)), float(rng.uniform(*lat_range)),
+             float(rng.uniform(1e5, 5e6)), float(rng.uniform(0, 100))) for i in range(n)]
+
+
+def make_grid(policies, cell_deg=0.1):
+    grid = ExposureGrid(cell_deg)
+    for policy in policies:
+        grid.add(*policy)
+    return grid
+
+
+@pytest.mark.parametrize("radius_km", [0.5, 5, 30, 120])
+def test_exposure_within_matches_brute_force(radius_km):
+    rng = np.random.default_rng(int(radius_km * 10))
+    policies = random_policies(rng, 2000, (-100, -98), (19, 21))
+    grid = make_grid(policies)
+    for lon, lat in rng.uniform((-100, 19), (-98, 21), (25, 2)):
+        totals = grid.exposure_within(lon, lat, radius_km)
+        count, exposure, weighted = brute_force(policies, lon, lat, radius_km)
+        assert totals["policies"] == count
+        assert totals["exposure"] == pytest.approx(exposure)
+        assert totals["risk_weighted_exposure"] == pytest.approx(weighted)
+        assert sum(totals["exposure_by_band"].values()) == pytest.approx(exposure)
+
+
+def test_policies_on_cell_edges_are_counted_once():
+    # Sobre las aristas y la esquina de celdas de 0.1° (lon -99.0, lat 19.5)
+    policies = [("A", -99.0, 19.45, 100.0, 10.0), ("B", -99.05, 19.5, 200.0, 50.0),
+                ("C", -99.0, 19.5, 300.0, 90.0), ("D", -98.95, 19.55, 400.0, 30.0)]
+    grid = make_grid(policies)
+    totals = grid.exposure_within(-99.0, 19.5, 10)
+    assert totals["policies"] == 4
+    assert totals["exposure"] == 1000.0
+    # Radio que solo alcanza la póliza sobre la esquina
+    assert grid.exposure_within(-99.0, 19.5, 0.01)["exposure"] == 300.0
+
+
+def test_circle_crossing_the_antimeridian():
+    policies = [("E", 179.95, -17.0, 100.0, 20.0), ("W", -179.95, -17.0, 200.0, 80.0),
+                ("far", 178.0, -17.0, 400.0, 50.0)]
+    grid = make_grid(policies)
+    for lon in (179.99, -179.99, 180.0):
+        totals = grid.exposure_within(lon, -17.0, 15)
+        assert totals["policies"] == 2, lon
+        assert totals["exposure"] == 300.0
+    assert sorted(grid._candidate_cells(179.99, -17.0, 15)) == sorted(
+        [grid._policy_cell["E"], grid._policy_cell["W"]])
+
+
+def test_antimeridian_matches_brute_force():
+    rng = np.random.default_rng(7)
+    policies = (random_policies(rng, 500, (178.5, 180), (-18, -16))
+                + [(f"W{i}", *p[1:]) for i, p in enumerate(random_policies(rng, 500, (-180, -178.5), (-18, -16)))])
+    grid = make_grid(policies)
+    for lon, lat in ((179.9, -17.0), (-179.9, -17.2), (180.0, -16.5)):
+        count, exposure, _ = brute_force(policies, lon, lat, 60)
+        totals = grid.exposure_within(lon, lat, 60)
+        assert totals["policies"] == count
+        assert totals["exposure"] == pytest.approx(exposure)
+
+
+def test_huge_radius_near_pole_reaches_every_longitude():
+    policies = [("a", -170.0, 80.0, 1.0, 10.0), ("b", 10.0, 80.0, 2.0, 10.0), ("c", 170.0, 85.0, 4.0, 10.0)]
+    grid = make_grid(policies, cell_deg=1.0)
+    count, exposure, _ = brute_force(policies, 10.0, 85.0, 2500)
+    totals = grid.exposure_within(10.0, 85.0, 2500)
+    assert (totals["policies"], totals["exposure"]) == (count, exposure) == (3, 7.0)
+
+
+def test_candidate_cells_scan_and_range_paths_agree():
+    rng = np.random.default_rng(3)
+    grid = make_grid(random_policies(rng, 300, (-100, -99), (19, 20)))
+    # Radio pequeño → recorre el rango; radio grande → filtra las celdas existentes
+    small = grid._candidate_cells(-99.5, 19.5, 3)
+    assert all(key in grid.cells for key in small)
+    large = grid._candidate_cells(-99.5, 19.5, 500)
+    assert sorted(large) == sorted(grid.cells)
+
+
+def test_remove_and_replace_keep_aggregates_consistent():
+    grid = ExposureGrid(0.1)
+    grid.add("A", -99.13, 19.43, 1000.0, 80.0, {"flood": 50.0})
+    grid.add("B", -99.12, 19.44, 500.0, 10.0)
+    grid.add("A", -99.13, 19.43, 2000.0, 20.0)   # reemplaza
+    assert len(grid) == 2
+    (summary,) = grid.top_cells(1, by="exposure")
+    assert summary["exposure"] == 2500.0
+    assert summary["metric_weighted_exposure"]["flood"] == 0.0
+    assert grid.remove("A") and not grid.remove("A")
+    assert grid.remove("B")
+    assert grid.cells == {}
+    assert grid.exposure_within(-99.13, 19.43, 50)["policies"] == 0
+
+
+def test_add_batch_skips_nan_rows_and_top_cells_orders():
+    grid = ExposureGrid(1.0)
+    added = grid.add_batch(["a", "b", "c", "d"], [-99.5, -99.5, -98.5, np.nan],
+                           [19.5, 19.5, 19.5, 19.5], [100.0, 100.0, 1000.0, 5.0], [90.0, np.nan, 10.0, 50.0],
+                           {"seismic": [40.0, 0.0, np.nan, 0.0]})
+    assert added == 2
+    top = grid.top_cells(2)
+    assert [cell["cell"] for cell in top] == [[-99, 19], [-100, 19]]
+    assert grid.top_cells(1, by="mean_risk")[0]["cell"] == [-100, 19]
+    assert grid.top_cells(1, by="seismic")[0]["metric_weighted_exposure"]["seismic"] == 40.0
+    with pytest.raises(ValueError):
+        grid.top_cells(1, by="nope")
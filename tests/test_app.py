@@ -0,0 +1,140 @@
+import json
+import os
+
+import numpy as np
+import pytest
+
+# Sin calentamiento de Earth Engine al importar la app
+os.environ.setdefault("TERRAGUARD_WARM_UP", "0")
+pytest.importorskip("flask_cors")
+
+import app as app_module  # noqa: E402
+
+
+@pytest.fixture
+def client():
+    return app_module.app.test_client()
+
+
+@pytest.fixture
+def started(monkeypatch):
+    calls = []
+
+    def start(risk, location, metrics=None):
+        calls.append((risk, location, metrics))
+        return "job-1"
+
+    monkeypatch.setattr(app_module.explanations, "start", start)
+    monkeypatch.setattr(app_module.explanations, "stream", lambda job_id: iter([("done", "texto")]))
+    return calls
+
+
+def test_explanation_url_carries_metrics(client, started, monkeypatch):
+    result = {"risk_percent": 42, "metrics_percent": {"flood": 80.0, "seismic": 10.0}}
+    monkeypatch.setattr(app_module.risk_model, "calculate_risk_with_breakdown",
+                        lambda lon, lat, target_year=None: dict(result))
+    response = client.post("/api/analyze", json={"lat": 19.43, "lon": -99.13})
+    assert response.status_code == 200
+    url = response.get_json()["explanation_stream"]
+    assert started == [(42, (19.43, -99.13), result["metrics_percent"])]
+
+    # Otro worker (sin el trabajo) relanza la explicación con las mismas métricas
+    stream = client.get(url.replace("job-1", "unknown"))
+    assert stream.status_code == 200
+    assert b"event: done" in stream.data
+    assert started[1] == (42.0, (19.43, -99.13), result["metrics_percent"])
+
+
+def test_unknown_job_without_params_is_404(client, started):
+    assert client.get("/api/explain/unknown/stream").status_code == 404
+    assert client.get("/api/explain/unknown/stream?risk=1&lat=1&lon=1&metrics=[1]").status_code == 404
+
+
+def test_rescore_endpoint(client, monkeypatch):
+    calls = []
+
+    def rescore(lon, lat, force=False):
+        calls.append((lon, lat, force))
+        return {"risk_percent": 30, "refreshed_factors": ["weather"]}
+
+    monkeypatch.setattr(app_module.risk_model, "rescore", rescore)
+    response = client.post("/api/rescore", json={"lat": 19.43, "lon": -99.13, "force": True})
+    assert response.status_code == 200
+    assert response.get_json()["refreshed_factors"] == ["weather"]
+    assert calls == [(-99.13, 19.43, True)]
+
+    assert client.post("/api/rescore", json={"lat": 19.43}).status_code == 400
+    assert client.post("/api/rescore", json={"lat": 95, "lon": 200}).status_code == 400
+
+
+@pytest.fixture
+def batch_model(monkeypatch):
+    """
+    get_factors_batch / calculate_risk_batch falsos: el riesgo es la parte entera
+    de la latitud y "fire" es NaN en latitudes negativas. fail_lons hace fallar el bloque.
+    """
+    calls = []
+    fail_lons = set()
+
+    def get_factors_batch(lons, lats, target_year=None):
+        calls.append((list(lons), list(lats), target_year))
+        if fail_lons & set(lons):
+            raise RuntimeError("GEE no disponible")
+        return {"lat": np.asarray(lats, dtype=float)}
+
+    def calculate_risk_batch(factors):
+        lats = factors["lat"]
+        return {"risk_percent": np.abs(lats).astype(int),
+                "metrics_percent": {"fire": np.where(lats < 0, np.nan, 50.0)}}
+
+    monkeypatch.setattr(app_module.risk_model, "get_factors_batch", get_factors_batch)
+    monkeypatch.setattr(app_module.risk_model, "calculate_risk_batch", calculate_risk_batch)
+    return calls, fail_lons
+
+
+def ndjson(response):
+    assert response.mimetype == "application/x-ndjson"
+    return [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+
+def test_batch_streams_one_line_per_point_and_summary(client, batch_model):
+    calls, _ = batch_model
+    points = [{"id": "a", "lat": 19.4, "lon": -99.1}, {"id": "bad", "lat": "x", "lon": 0},
+              {"id": "b", "lat": -33.4, "lon": -70.6}, {"id": "a2", "lat": 19.4, "lon": -99.1},
+              {"lat": 1.0}]
+    lines = ndjson(client.post("/api/analyze/batch", json={"points": points, "year": 2030}))
+
+    errors = [l for l in lines if "error" in l]
+    assert [(l["index"], l["id"]) for l in errors] == [(1, "bad"), (4, None)]
+    ok = {l["index"]: l for l in lines if "risk_percent" in l}
+    assert sorted(ok) == [0, 2, 3]
+    assert ok[0]["risk_percent"] == ok[3]["risk_percent"] == 19 and ok[0]["id"] == "a"
+    assert ok[2]["metrics_percent"] == {"fire": None}          # NaN → null
+    assert lines[-1] == {"summary": {"total": 5, "ok": 3, "error": 2, "year": 2030}}
+    # Los puntos repetidos se puntúan una sola vez
+    assert len(calls) == 1 and len(calls[0][0]) == 2 and calls[0][2] == 2030
+
+
+def test_batch_failed_chunk_yields_errors_without_stopping(client, batch_model, monkeypatch):
+    calls, fail_lons = batch_model
+    monkeypatch.setattr(app_module, "BATCH_CHUNK_SIZE", 2)
+    fail_lons.add(-70.0)
+    points = [{"lat": 10, "lon": -99}, {"lat": 11, "lon": -98},
+              {"lat": 12, "lon": -70}, {"lat": 13, "lon": -71},
+              {"lat": 14, "lon": -60}]
+    lines = ndjson(client.post("/api/analyze/batch", json={"points": points}))
+    assert [l["index"] for l in lines if "error" in l] == [2, 3]
+    assert [l["risk_percent"] for l in lines if "risk_percent" in l] == [10, 11, 14]
+    assert lines[-1]["summary"] == {"total": 5, "ok": 3, "error": 2, "year": None}
+    assert len(calls) == 3
+
+
+def test_batch_rejects_bad_requests(client, batch_model, monkeypatch):
+    assert client.post("/api/analyze/batch", json={"lat": 1}).status_code == 400
+    assert client.post("/api/analyze/batch", data="no json").status_code == 400
+    assert client.post("/api/analyze/batch", json={"points": [], "year": "abc"}).status_code == 400
+    monkeypatch.setattr(app_module, "MAX_BATCH_POINTS", 3)
+    response = client.post("/api/analyze/batch", json={"points": [{"lat": 1, "lon": 1}] * 4})
+    assert response.status_code == 400
+    assert ndjson(client.post("/api/analyze/batch", json={"points": []})) == [
+        {"summary": {"total": 0, "ok": 0, "error": 0, "year": None}}]
@@ -0,0 +1,209 @@
+import asyncio
+import json
+import os
+import threading
+import time
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+
+os.environ.setdefault("TERRAGUARD_WARM_UP", "0")
+pytest.importorskip("flask_cors")
+
+import app as app_module  # noqa: E402
+from asgi import TerraGuardASGI  # noqa: E402
+from data_layer.async_layer import UpstreamBusyError  # noqa: E402
+
+
+def call(app, method="GET", path="/", body=b"", query=b"", disconnect_after=None):
+    """
+    Ejecuta una petición ASGI. Como un servidor real, receive() entrega el cuerpo
+    y luego espera; con disconnect_after=n devuelve http.disconnect tras n
+    fragmentos de cuerpo enviados.
+    """
+    sent = []
+
+    async def run():
+        requested = False
+        gone = asyncio.Event()
+
+        async def receive():
+            nonlocal requested
+            if not requested:
+                requested = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            await gone.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            sent.append(message)
+            chunks = [m for m in sent if m["type"] == "http.response.body"]
+            if disconnect_after is not None and len(chunks) >= disconnect_after:
+                gone.set()
+
+        scope = {"type": "http", "method": method, "path": path, "headers": [], "query_string": query}
+        await asyncio.wait_for(app(scope, receive, send), timeout=10)
+
+    asyncio.run(run())
+    return sent
+
+
+def response_body(sent):
+    return b"".join(m.get("body", b"") for m in sent if m["type"] == "http.response.body")
+
+
+def test_wsgi_failure_before_start_response_returns_500():
+    def failing_app(environ, start_response):
+        raise RuntimeError("explotó")
+
+    sent = call(TerraGuardASGI(failing_app, risk_model=None), path="/otra")
+    assert sent[0]["type"] == "http.response.start" and sent[0]["status"] == 500
+    assert "explotó" in json.loads(sent[1]["body"])["error"]
+
+
+def test_wsgi_response_is_streamed_through():
+    def wsgi_app(environ, start_response):
+        start_response("200 OK", [("Content-Type", "text/plain")])
+        return [b"uno", b"dos"]
+
+    sent = call(TerraGuardASGI(wsgi_app, risk_model=None), path="/otra")
+    assert sent[0]["status"] == 200
+    assert response_body(sent) == b"unodos"
+    assert sent[-1]["more_body"] is False
+
+
+def test_wsgi_failure_mid_stream_does_not_finish_the_response():
+    def wsgi_app(environ, start_response):
+        start_response("200 OK", [("Content-Type", "application/x-ndjson")])
+
+        def lines():
+            yield b'{"index": 0}\n'
+            raise RuntimeError("se cayó el bloque")
+        return lines()
+
+    sent = call(TerraGuardASGI(wsgi_app, risk_model=None), path="/otra")
+    assert sent[0]["status"] == 200
+    assert response_body(sent) == b'{"index": 0}\n'
+    # Sin el mensaje final: el servidor corta la conexión y el cliente ve la respuesta incompleta
+    assert all(m.get("more_body", True) for m in sent[1:])
+
+
+def test_client_disconnect_closes_the_wsgi_generator():
+    closed = threading.Event()
+    produced = []
+
+    def wsgi_app(environ, start_response):
+        start_response("200 OK", [("Content-Type", "text/event-stream")])
+
+        def events():
+            try:
+                while True:
+                    produced.append(1)
+                    yield b"data: x\n\n"
+                    time.sleep(0.01)
+            finally:
+                closed.set()
+        return events()
+
+    sent = call(TerraGuardASGI(wsgi_app, risk_model=None), path="/otra", disconnect_after=3)
+    assert closed.wait(5)
+    assert all(m.get("more_body", True) for m in sent[1:])
+    count = len(produced)
+    time.sleep(0.05)
+    assert len(produced) == count   # el hilo ya no itera
+
+
+def test_over_capacity_is_rejected_with_503():
+    app = TerraGuardASGI(lambda environ, start_response: [], risk_model=None, max_in_flight=0)
+    sent = call(app)
+    assert sent[0]["status"] == 503
+    assert (b"retry-after", b"2") in sent[0]["headers"]
+
+
+# -----------------------------
+# POST /api/analyze nativo
+# -----------------------------
+class FakeRiskModel:
+    def __init__(self, error=None):
+        self.error = error
+        self.calls = []
+
+    async def calculate_risk_async(self, lon, lat, async_layer, target_year=None):
+        self.calls.append((lon, lat, target_year, threading.get_ident()))
+        if self.error:
+            raise self.error
+        await asyncio.sleep(0)
+        return {"risk_percent": 64, "metrics_percent": {"flood": 90.0, "fire": None}}
+
+
+@pytest.fixture
+def started(monkeypatch):
+    calls = []
+
+    def start(risk, location, metrics=None):
+        calls.append((risk, location, metrics, threading.get_ident()))
+        return "job-9"
+
+    monkeypatch.setattr(app_module.explanations, "start", start)
+    monkeypatch.setattr(app_module.explanations, "stream", lambda job_id: iter([("done", "listo")]))
+    return calls
+
+
+def analyze(model, payload):
+    sent = call(TerraGuardASGI(app_module.app, model), method="POST", path="/api/analyze",
+                body=json.dumps(payload).encode())
+    return sent[0]["status"], dict(sent[0]["headers"]), json.loads(response_body(sent))
+
+
+def test_native_analyze_returns_result_and_explanation_url(started):
+    model = FakeRiskModel()
+    status, _, result = analyze(model, {"lat": 19.43, "lon": -99.13, "year": "2030"})
+    assert status == 200
+    assert result["risk_percent"] == 64
+    assert model.calls[0][:3] == (-99.13, 19.43, 2030)
+    assert started[0][:3] == (64, (19.43, -99.13), {"flood": 90.0, "fire": None})
+    # El análisis y el arranque de la explicación corren en el hilo del event loop
+    assert started[0][3] == model.calls[0][3]
+
+    url = urlsplit(result["explanation_stream"])
+    assert url.path == "/api/explain/job-9/stream"
+    params = parse_qs(url.query)
+    assert params["risk"] == ["64"] and json.loads(params["metrics"][0]) == {"flood": 90.0, "fire": None}
+
+    # La URL se sirve por el puente WSGI (el trabajo no existe aquí: se relanza con los parámetros)
+    sent = call(TerraGuardASGI(app_module.app, model), path=url.path, query=url.query.encode())
+    assert sent[0]["status"] == 200
+    assert b"event: done" in response_body(sent)
+    assert started[1][:3] == (64.0, (19.43, -99.13), {"flood": 90.0})
+
+
+def test_native_analyze_swaps_inverted_coordinates(started):
+    model = FakeRiskModel()
+    status, _, _ = analyze(model, {"lat": -99.13, "lon": 19.43})
+    assert status == 200
+    assert model.calls[0][:2] == (-99.13, 19.43)
+
+
+@pytest.mark.parametrize("payload, status", [
+    ({"lat": 19.4}, 400),
+    ({"lat": 200, "lon": 300}, 400),
+    ({"lat": 19.4, "lon": -99.1, "year": "abc"}, 400),
+])
+def test_native_analyze_rejects_bad_input(started, payload, status):
+    assert analyze(FakeRiskModel(), payload)[0] == status
+    assert started == []
+
+
+def test_native_analyze_maps_upstream_busy_to_503(started):
+    status, headers, body = analyze(FakeRiskModel(UpstreamBusyError("open_meteo saturada")),
+                                    {"lat": 19.4, "lon": -99.1})
+    assert status == 503
+    assert headers[b"retry-after"] == b"2"
+    assert "open_meteo" in body["error"]
+
+
+def test_native_analyze_internal_error_is_500(started):
+    status, _, body = analyze(FakeRiskModel(RuntimeError("boom")), {"lat": 19.4, "lon": -99.1})
+    assert status == 500
+    assert "boom" in body["error"]
+    assert started == []
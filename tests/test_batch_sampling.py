@@ -0,0 +1,112 @@
+import os
+
+import numpy as np
+import pytest
+
+from data_layer import data2
+from data_layer.cache import SourceCache
+from data_layer.data2 import DataLayer
+from data_layer.raster_store import RasterStore, tile_name
+from fake_ee import FakeEE, FakeStack
+from processing_layer import risk_model as risk_module
+from processing_layer.factor_store import FactorStore
+from processing_layer.risk_model import RiskModel
+
+
+def bands(lon, lat):
+    values = {"elevation": round(lat * 10, 3)}
+    if lon > -100:
+        values["flood"] = 3
+    if lat < 20:
+        values["NDVI"] = 5000
+    return values
+
+
+@pytest.fixture
+def fake_ee(monkeypatch):
+    fake = FakeEE()
+    monkeypatch.setattr(data2, "ee", fake)
+    return fake
+
+
+@pytest.fixture
+def layer(fake_ee):
+    layer = DataLayer(cache=False)
+    layer._batch_stacks["RP10_depth_category"] = FakeStack(fake_ee, bands)
+    return layer
+
+
+def test_one_get_info_per_chunk(layer, fake_ee):
+    points = [(-101 + i * 0.01, 19 + i * 0.01) for i in range(250)]
+    out = layer.sample_points_batch(points, chunk_size=100)
+    assert fake_ee.get_info_calls == 3
+    assert len(out["flood_rate"]) == len(out["vegetation"]) == len(out["elevation"]) == 250
+
+
+def test_results_are_aligned_with_input_and_masked_pixels_are_none(layer):
+    points = [(-101.0, 19.0), (-99.0, 21.0), (-99.5, 19.5)]
+    out = layer.sample_points_batch(points, chunk_size=2)
+    assert out["flood_rate"] == [None, 3, 3]
+    assert out["vegetation"] == [5000, None, 5000]
+    assert out["elevation"] == [190.0, 210.0, 195.0]
+
+
+def test_empty_input_does_not_call_earth_engine(layer, fake_ee):
+    out = layer.sample_points_batch([])
+    assert out == {"flood_rate": [], "vegetation": [], "elevation": []}
+    assert fake_ee.get_info_calls == 0
+
+
+@pytest.fixture
+def local_layer(fake_ee, tmp_path):
+    # Teselas de elevación e inundación solo para N19W100 (lon -100..-99, lat 19..20)
+    for layer, band, value in (("elevation", "elevation", 1500), ("flood", "RP10_depth_category", 2)):
+        band_dir = tmp_path / layer / band
+        os.makedirs(band_dir)
+        np.save(band_dir / (tile_name(-100, 19) + ".npy"), np.full((4, 4), value, dtype=np.int16))
+    layer = DataLayer(raster_store=RasterStore(root=str(tmp_path)), cache=SourceCache(":memory:"))
+    layer._batch_stacks["RP10_depth_category"] = FakeStack(fake_ee, bands)
+    return layer
+
+
+def test_static_batch_uses_tiles_and_cache_before_earth_engine(local_layer, fake_ee):
+    lons, lats = [-99.5, -99.4, -98.5], [19.5, 19.6, 19.5]
+    local_layer.cache.put("ndvi", local_layer.cache.make_key("ndvi", -99.5, 19.5), 7000)
+
+    out = local_layer.sample_static_batch(lons, lats)
+    # Solo se muestrean los puntos que no resolvieron las teselas + caché
+    assert fake_ee.points_sampled == 2
+    assert out["elevation"].tolist() == [1500, 1500, 195.0]
+    assert out["flood_rate"].tolist() == [2, 2, 3]
+    assert out["vegetation"].tolist() == [7000, 5000, 5000]
+
+    # Lo que vino de GEE quedó en caché: la segunda llamada no sale a la red
+    assert local_layer.sample_static_batch(lons, lats)["vegetation"].tolist() == [7000, 5000, 5000]
+    assert fake_ee.get_info_calls == 1
+    assert local_layer.get_flood_risk(-98.5, 19.5) == 3
+
+
+def test_static_batch_skips_earth_engine_when_everything_is_local(local_layer, fake_ee):
+    for lon, lat in ((-99.5, 19.5), (-99.2, 19.8)):
+        local_layer.cache.put("ndvi", local_layer.cache.make_key("ndvi", lon, lat), 6000)
+    out = local_layer.sample_static_batch([-99.5, -99.2], [19.5, 19.8])
+    assert fake_ee.get_info_calls == 0
+    assert out["vegetation"].tolist() == [6000, 6000]
+
+
+def test_factors_batch_reports_each_static_group_and_keeps_nan(local_layer, fake_ee, monkeypatch, capsys):
+    fake_ee.fail = True
+    for name in ("get_earthquake_frequency_batch", "get_hurricane_frequency_batch", "get_fire_frequency_batch"):
+        monkeypatch.setattr(local_layer, name, lambda lons, lats: [0] * len(lons))
+    monkeypatch.setattr(local_layer, "get_weather_batch", lambda lons, lats: [None] * len(lons))
+    monkeypatch.setattr(risk_module, "DataLayer", lambda: local_layer)
+    model = RiskModel(factor_store=FactorStore(":memory:"))
+
+    factors = model.get_factors_batch([-99.5, -98.5], [19.5, 19.5])
+    out = capsys.readouterr().out
+    for name in ("flood", "vegetation", "elevation"):
+        assert f"Grupo '{name}' falló" in out
+    # Lo que estaba en teselas se conserva; lo demás queda ausente (NaN), no en 0
+    assert factors["elevation"][0] == 1500 and np.isnan(factors["elevation"][1])
+    assert factors["flood_rate"][0] == 2 and np.isnan(factors["flood_rate"][1])
+    assert np.isnan(factors["vegetation"]).all()
@@ -0,0 +1,102 @@
+import time
+
+from data_layer.cache import SourceCache, cached
+
+
+class FakeSource:
+    def __init__(self, cache):
+        self.cache = cache
+        self.calls = 0
+
+    @cached("earthquake")
+    def quakes(self, lon, lat, past_days=365):
+        self.calls += 1
+        return past_days
+
+    @cached("hurricane")
+    def storms(self, lon, lat, years=5, radius_km=200):
+        self.calls += 1
+        return years * radius_km
+
+    @cached("fire")
+    def nothing(self, lon, lat):
+        self.calls += 1
+        return None
+
+
+def make_cache(**kwargs):
+    return SourceCache(":memory:", **kwargs)
+
+
+def test_key_snaps_to_source_grid():
+    cache = make_cache()
+    # earthquake usa celdas de 0.05°
+    assert cache.make_key("earthquake", -100.01, 25.61) == cache.make_key("earthquake", -100.04, 25.64)
+    assert cache.make_key("earthquake", -100.01, 25.61) != cache.make_key("earthquake", -100.06, 25.61)
+
+
+def test_defaults_and_explicit_args_share_entry():
+    source = FakeSource(make_cache())
+    assert source.quakes(-100.0, 25.6) == 365
+    assert source.quakes(-100.0, 25.6, 365) == 365
+    assert source.quakes(-100.0, 25.6, past_days=365) == 365
+    assert source.storms(-100.0, 25.6) == 1000
+    assert source.storms(-100.0, 25.6, 5, 200) == 1000
+    assert source.calls == 2
+
+    assert source.quakes(-100.0, 25.6, 30) == 30
+    assert source.calls == 3
+
+
+def test_none_results_are_not_stored():
+    source = FakeSource(make_cache())
+    source.nothing(-100.0, 25.6)
+    source.nothing(-100.0, 25.6)
+    assert source.calls == 2
+
+
+def test_ttl_expiry():
+    cache = make_cache(specs={"weather": {"grid_deg": 0.1, "ttl": 0.05}})
+    key = cache.make_key("weather", -100.0, 25.6)
+    cache.put("weather", key, {"temperature": 20})
+    assert cache.get("weather", key) == (True, {"temperature": 20})
+    time.sleep(0.1)
+    assert cache.get("weather", key) == (False, None)
+    assert cache.stats()["entries"] == 0
+
+
+def test_replacing_an_entry_does_not_grow_the_count():
+    cache = make_cache()
+    key = cache.make_key("fire", -100.0, 25.6)
+    for value in range(5):
+        cache.put("fire", key, value)
+    assert cache.stats()["entries"] == 1
+    assert cache.get("fire", key) == (True, 4)
+
+
+def test_lru_eviction_keeps_recently_read_entries():
+    cache = make_cache(max_entries=10)
+    keys = [cache.make_key("fire", -100.0 + i, 25.6) for i in range(10)]
+    for i, key in enumerate(keys):
+        cache.put("fire", key, i)
+        time.sleep(0.001)
+    # La primera se lee (acceso en memoria) justo antes de la expulsión
+    assert cache.get("fire", keys[0]) == (True, 0)
+
+    cache.put("fire", cache.make_key("fire", 50.0, 25.6), 99)
+    assert cache.stats()["entries"] == 9
+    assert cache.get("fire", keys[0])[0]
+    assert not cache.get("fire", keys[1])[0]
+    assert not cache.get("fire", keys[2])[0]
+
+
+def test_hits_do_not_write_until_flush():
+    cache = make_cache()
+    key = cache.make_key("fire", -100.0, 25.6)
+    cache.put("fire", key, 1)
+    before = cache._conn.total_changes
+    for _ in range(20):
+        cache.get("fire", key)
+    assert cache._conn.total_changes == before
+    cache.flush()
+    assert cache._conn.total_changes == before + 1
@@ -0,0 +1,112 @@
+import os
+import sys
+import threading
+
+import pytest
+
+from data_layer import ee_session
+from fake_ee import FakeEE
+
+
+class FakeDataLayer:
+    """
+    Solo registra qué imágenes se prepararon en el calentamiento.
+    """
+    def __init__(self):
+        self.prepared = []
+
+    def get_flood_mosaic(self):
+        self.prepared.append("flood")
+
+    def get_srtm(self):
+        self.prepared.append("srtm")
+
+    def _get_batch_stack(self, rp):
+        self.prepared.append(rp)
+
+
+@pytest.fixture
+def fake_ee(monkeypatch):
+    fake = FakeEE()
+    monkeypatch.setitem(sys.modules, "ee", fake)
+    monkeypatch.setattr(ee_session, "_module", None)
+    monkeypatch.setattr(ee_session, "_status", {
+        "initialized": False, "error": None, "init_seconds": None,
+        "warm_up_seconds": None, "warmed_up": False,
+    })
+    return fake
+
+
+def test_initialization_is_lazy_and_happens_once(fake_ee):
+    assert fake_ee.initialized == []
+    assert not ee_session.status()["initialized"]
+
+    threads = [threading.Thread(target=ee_session.get_ee) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    ee_session.ee.Number(1)
+    assert fake_ee.initialized == [ee_session.EE_PROJECT]
+    assert ee_session.status()["initialized"]
+    assert not ee_session.is_ready()   # inicializado, pero sin calentar
+
+
+def test_initialize_failure_is_reported_and_retried(fake_ee, monkeypatch):
+    def broken(project=None):
+        raise RuntimeError("sin credenciales")
+
+    monkeypatch.setattr(fake_ee, "Initialize", broken)
+    with pytest.raises(RuntimeError):
+        ee_session.get_ee()
+    assert ee_session.status()["error"] == "sin credenciales"
+    assert ee_session._module is None
+
+    monkeypatch.setattr(fake_ee, "Initialize", lambda project=None: None)
+    assert ee_session.get_ee() is fake_ee
+    assert ee_session.status()["error"] is None
+
+
+def test_warm_up_prepares_images_and_marks_ready(fake_ee):
+    layer = FakeDataLayer()
+    status = ee_session.warm_up(layer, rps=("RP10_depth_category", "RP100_depth_category"))
+    assert layer.prepared == ["flood", "srtm", "RP10_depth_category", "RP100_depth_category"]
+    assert fake_ee.get_info_calls == 1
+    assert status["warmed_up"] and status["warm_up_seconds"] is not None
+    assert ee_session.is_ready()
+
+
+def test_failed_warm_up_is_not_ready_until_retried(fake_ee):
+    fake_ee.fail = True
+    with pytest.raises(RuntimeError):
+        ee_session.warm_up()
+    assert not ee_session.is_ready()
+    assert ee_session.status()["error"] == "Earth Engine no disponible"
+
+    fake_ee.fail = False
+    ee_session.warm_up()
+    assert ee_session.is_ready()
+    assert ee_session.status()["error"] is None
+
+
+def test_ready_endpoint_starts_warm_up_and_turns_200(fake_ee, monkeypatch):
+    os.environ.setdefault("TERRAGUARD_WARM_UP", "0")
+    pytest.importorskip("flask_cors")
+    import app as app_module
+
+    layer = FakeDataLayer()
+    monkeypatch.setattr(app_module.risk_model, "data_layer", layer)
+    monkeypatch.setattr(app_module, "_warm_up_thread", None)
+    client = app_module.app.test_client()
+
+    response = client.get("/api/ready")
+    assert response.status_code == 503
+    assert response.get_json()["ready"] is False
+
+    # El 503 lanzó el calentamiento en segundo plano
+    app_module._warm_up_thread.join(5)
+    assert layer.prepared == ["flood", "srtm", "RP10_depth_category"]
+    response = client.get("/api/ready")
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body["ready"] and body["initialized"] and body["warmed_up"]
@@ -0,0 +1,50 @@
+import datetime
+
+import numpy as np
+
+from data_layer.fire_grid import FireGrid
+
+AS_OF = datetime.date(2025, 6, 30)
+
+
+def make_grid(tmp_path):
+    rows = ["latitude,longitude,acq_date,confidence"]
+    for days_ago, count in ((5, 3), (60, 2), (300, 4), (500, 7)):
+        date = AS_OF - datetime.timedelta(days=days_ago)
+        rows += [f"20.05,-100.05,{date},80"] * count
+    rows.append(f"20.05,-100.05,{AS_OF},l")  # baja confianza, se descarta
+    rows.append(f"21.05,-101.05,{AS_OF},90")
+    path = tmp_path / "firms.csv"
+    path.write_text("\n".join(rows) + "\n")
+
+    grid = FireGrid(window_days=365)
+    assert grid.ingest_csv(str(path)) == 17
+    assert grid.ingest_csv(str(path)) == 0
+    grid.build_window(as_of=AS_OF)
+    return grid
+
+
+def test_window_counts_last_year(tmp_path):
+    grid = make_grid(tmp_path)
+    assert grid.rate(-100.05, 20.05) == 9
+    assert grid.rate(-100.05, 20.05, 365) == 9
+    assert grid.rate(-101.05, 21.05) == 1
+    assert grid.rate(10.0, 10.0) == 0
+
+
+def test_past_days_filters_by_acquisition_date(tmp_path):
+    grid = make_grid(tmp_path)
+    assert grid.rate(-100.05, 20.05, 30) == 3
+    assert grid.rate(-100.05, 20.05, 90) == 5
+    assert grid.rate(-100.05, 20.05, 730) == 16
+    counts = grid.rate_batch([-100.05, -101.05, 10.0], [20.05, 21.05, 10.0], 30)
+    assert counts.tolist() == [3, 1, 0]
+
+
+def test_save_and_load_round_trip(tmp_path):
+    grid = make_grid(tmp_path)
+    path = str(tmp_path / "grid.npz")
+    grid.save(path)
+    loaded = FireGrid.load(path)
+    assert np.array_equal(loaded.window, grid.window)
+    assert loaded.rate(-100.05, 20.05, 90) == 5
@@ -0,0 +1,122 @@
+import pytest
+import requests
+
+from data_layer import http_client as http_module
+from data_layer.http_client import CircuitBreaker, CircuitOpenError, HttpClient
+
+
+class FakeResponse:
+    def __init__(self, status_code):
+        self.status_code = status_code
+
+
+class FakeSession:
+    """
+    Devuelve (o lanza) los elementos de outcomes en orden.
+    """
+    def __init__(self, outcomes):
+        self.outcomes = list(outcomes)
+        self.calls = 0
+
+    def get(self, url, params=None, timeout=None, **kwargs):
+        self.calls += 1
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return FakeResponse(outcome)
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(http_module.time, "monotonic", clock)
+    return clock
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    delays = []
+    monkeypatch.setattr(http_module.time, "sleep", delays.append)
+    monkeypatch.setattr(http_module.random, "uniform", lambda a, b: 1.0)
+    return delays
+
+
+def make_client(outcomes, retries=2, failure_threshold=2, reset_timeout=30):
+    client = HttpClient(policies={"test": {"timeout": (1, 1), "retries": retries,
+                                           "failure_threshold": failure_threshold,
+                                           "reset_timeout": reset_timeout}})
+    session = FakeSession(outcomes)
+    client._sessions["test"] = session
+    return client, session
+
+
+def test_retries_5xx_with_exponential_backoff(sleeps):
+    client, session = make_client([503, 502, 200])
+    assert client.get("test", "http://x").status_code == 200
+    assert session.calls == 3
+    assert sleeps == [0.5, 1.0]
+    assert client._counters["test"]["retries"] == 2
+
+
+def test_network_errors_are_retried_then_raised(sleeps):
+    client, session = make_client([requests.ConnectionError("a")] * 3)
+    with pytest.raises(requests.ConnectionError):
+        client.get("test", "http://x")
+    assert session.calls == 3
+    assert client.breaker("test").failures == 1
+
+
+def test_4xx_is_returned_without_retry_and_is_not_a_success(sleeps):
+    client, session = make_client([503, 503, 503, 404, 200])
+    client.get("test", "http://x")                      # agota reintentos: 1 fallo
+    assert client.get("test", "http://x").status_code == 404
+    assert session.calls == 4
+    breaker = client.breaker("test")
+    assert breaker.failures == 1 and breaker.state == "closed"
+    assert client._counters["test"]["client_errors"] == 1
+
+
+def test_breaker_opens_rejects_and_recovers_through_half_open(clock, sleeps):
+    client, session = make_client([500, 500], retries=0, failure_threshold=2, reset_timeout=30)
+    client.get("test", "http://x")
+    client.get("test", "http://x")
+    assert client.breaker("test").state == "open"
+    with pytest.raises(CircuitOpenError):
+        client.get("test", "http://x")
+    assert session.calls == 2
+
+    clock.now += 31
+    session.outcomes = [200]
+    assert client.get("test", "http://x").status_code == 200
+    assert client.breaker("test").snapshot()["state"] == "closed"
+
+
+def test_half_open_allows_a_single_probe_and_reopens_on_failure(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10)
+    breaker.record_failure()
+    assert not breaker.allow()
+    clock.now += 10
+    assert breaker.allow()              # la llamada de prueba
+    assert breaker.state == "half_open"
+    assert not breaker.allow()          # solo una a la vez
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert breaker.snapshot()["retry_in_s"] == 10
+
+
+def test_half_open_probe_with_4xx_keeps_probing(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10)
+    breaker.record_failure()
+    clock.now += 10
+    assert breaker.allow()
+    breaker.record_neutral()
+    assert breaker.state == "half_open"
+    assert breaker.allow()
@@ -0,0 +1,115 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from business_layer.payouts import PayoutEngine, precipitation_events, quake_events, tier_fraction
+from business_layer.rules import compute_payout
+from data_layer.spatial_index import KM_PER_DEG
+
+# Pólizas sobre el paralelo 19.4: a 0, 20, 40 y 80 km al este del evento
+LON, LAT = -99.13, 19.4
+
+
+def east_km(km):
+    return LON + km / (KM_PER_DEG * np.cos(np.radians(LAT)))
+
+
+@pytest.fixture
+def engine():
+    return PayoutEngine(
+        ids=["p0", "p20", "p40", "p80"],
+        lons=[east_km(0), east_km(20), east_km(40), east_km(80)],
+        lats=[LAT] * 4,
+        insured_values=[1000.0, 1000.0, 1000.0, 1000.0],
+        products=["standard", "standard", "standard", "earthquake_only"],
+    )
+
+
+def event(kind, value, event_id="e1", lon=LON, lat=LAT):
+    return {"event_id": [event_id], "kind": [kind], "lon": [lon], "lat": [lat], "value": [value]}
+
+
+def test_tier_fraction_takes_highest_tier_reached():
+    tiers = ((100, 0.25), (150, 0.5), (250, 1.0))
+    assert tier_fraction(tiers, 99.9) == 0.0
+    assert tier_fraction(tiers, 100) == 0.25
+    assert tier_fraction(tiers, 200) == 0.5
+    assert tier_fraction(tiers, 1000) == 1.0
+
+
+def test_rain_pays_only_inside_the_trigger_radius(engine):
+    out = engine.process(event("precipitation_24h", 160.0))
+    # standard: 25 km; earthquake_only no tiene disparador de lluvia
+    assert out["policy_id"].tolist() == ["p0", "p20"]
+    assert out["fraction"].tolist() == [0.5, 0.5]
+    assert engine.totals() == {"p0": 500.0, "p20": 500.0}
+
+
+def test_quake_radius_depends_on_the_product(engine):
+    out = engine.process(event("earthquake", 6.6))
+    paid = dict(zip(out["policy_id"], out["fraction"]))
+    # standard (50 km, 6.5 → 0.5); earthquake_only (100 km, 6.5 → 0.5)
+    assert paid == {"p0": 0.5, "p20": 0.5, "p40": 0.5, "p80": 0.5}
+    out = engine.process(event("earthquake", 5.8, event_id="e2"))
+    # Solo earthquake_only paga con 5.5 ≤ M < 6.0
+    assert out["policy_id"].tolist() == ["p80"]
+    assert out["amount"].tolist() == [100.0]
+
+
+def test_below_threshold_and_unknown_kind_pay_nothing(engine):
+    assert engine.process(event("precipitation_24h", 50.0)).empty
+    assert engine.process(event("hail", 1e6)).empty
+    assert engine.process(event("earthquake", 9.0, lon=0.0, lat=0.0)).empty
+    assert engine.totals() == {}
+
+
+def test_accumulated_payouts_are_capped_at_insured_value(engine):
+    engine.process(event("precipitation_24h", 300.0, event_id="storm-1"))
+    out = engine.process(event("precipitation_24h", 300.0, event_id="storm-2"))
+    assert out["amount"].tolist() == [0.0, 0.0]
+    engine.process(event("earthquake", 7.2, event_id="quake-1"))
+    assert engine.totals()["p0"] == 1000.0
+    assert engine.totals()["p40"] == 1000.0
+    assert (engine.paid <= engine.insured).all()
+
+
+def test_replayed_events_do_not_pay_twice(engine):
+    batch = pd.DataFrame({"event_id": ["r1", "q1"], "kind": ["precipitation_24h", "earthquake"],
+                          "lon": [LON, LON], "lat": [LAT, LAT], "value": [120.0, 6.1]})
+    first = engine.process(batch)
+    replay = engine.process(batch)
+    assert len(first) > 0 and replay.empty
+    assert engine.totals() == {"p0": 500.0, "p20": 500.0, "p40": 250.0, "p80": 100.0}
+
+
+def test_events_without_id_are_identified_by_content(engine):
+    batch = {"kind": ["precipitation_24h"], "lon": [LON], "lat": [LAT], "value": [120.0]}
+    engine.process(batch)
+    assert engine.process(batch).empty
+    # Otro valor es otro evento aunque llegue en la misma posición del lote
+    assert len(engine.process(dict(batch, value=[130.0]))) == 2
+
+
+def test_precipitation_events_uses_max_rolling_24h():
+    hourly = [0.0] * 10 + [10.0] * 12 + [np.nan] + [5.0] * 30
+    events = precipitation_events(hourly, LON, LAT)
+    assert events["value"].tolist() == [12 * 10.0 + 11 * 5.0]
+    assert precipitation_events([], LON, LAT)["value"].tolist() == [0.0]
+
+
+def test_quake_events_from_catalog_rows():
+    class Catalog:
+        def events_since(self, since, min_mag=None):
+            return [("us1", since + 1, LON, LAT, 6.7), ("us2", since + 2, LON, LAT, None)]
+
+    events = quake_events(Catalog(), 0)
+    assert events["event_id"].tolist() == ["us1", "us2"]
+    assert events["value"].tolist() == [6.7, 0.0]
+    assert (events["kind"] == "earthquake").all()
+
+
+def test_compute_payout_single_policy():
+    events = precipitation_events([20.0] * 24, LON, LAT)   # 480 mm en 24 h
+    assert compute_payout(events, 10000, LON, LAT) == 10000.0
+    with pytest.raises(ValueError):
+        compute_payout(events, 10000, LON, LAT, product="unknown")
@@ -0,0 +1,74 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from business_layer.portfolio import PortfolioPipeline, _ResultWriter
+
+
+class FakeRiskModel:
+    """
+    Riesgo = |lat| redondeado; cuenta cuántas ubicaciones se puntúan.
+    """
+    def __init__(self):
+        self.points = 0
+
+    def get_factors_batch(self, lons, lats, target_year=None):
+        self.points += len(lons)
+        return {"flood_rate": np.full(len(lons), 3.0), "vegetation": np.full(len(lons), 0.5)}
+
+    def calculate_risk_batch(self, factors):
+        size = len(factors["flood_rate"])
+        metrics = {m: np.full(size, 10.0) for m in ("seismic", "flood", "hurricane", "fire", "temperature",
+                                                     "humidity", "wind", "precipitation", "vegetation",
+                                                     "elevation")}
+        return {"risk_percent": np.full(size, 45), "metrics_percent": metrics}
+
+
+def policies(rows):
+    return pd.DataFrame(rows, columns=["id", "lat", "lon", "insured_value"])
+
+
+def test_process_chunk_deduplicates_and_flags_invalid_rows():
+    model = FakeRiskModel()
+    pipeline = PortfolioPipeline(risk_model=model)
+    out = pipeline.process_chunk(policies([
+        (1, 19.43, -99.13, 100.0),
+        (2, 19.43, -99.13, 200.0),
+        (3, -99.13, 19.43, 300.0),    # lat/lon invertidos
+        (4, 200.0, 500.0, 400.0),     # imposible
+    ]))
+    assert model.points == 1
+    assert out.attrs["locations"] == 1
+    assert out["error"].isna().tolist() == [True, True, True, False]
+    assert out["error"].iloc[3] == "Coordenadas inválidas"
+    assert out["risk_percent"].tolist()[:3] == [45, 45, 45]
+    assert np.isnan(out["risk_percent"].iloc[3])
+    assert out["policy_types"].iloc[0] == "Cobertura contra inundaciones"
+    assert pd.isna(out["insurability"].iloc[3])
+
+
+def test_csv_run_writes_every_chunk(tmp_path):
+    source = tmp_path / "policies.csv"
+    policies([(i, 19.0 + i * 0.01, -99.0, 1000.0) for i in range(10)]).to_csv(source, index=False)
+    output = tmp_path / "out.csv"
+    summary = PortfolioPipeline(risk_model=FakeRiskModel(), chunk_size=3).run(str(source), str(output))
+    assert summary["rows"] == 10 and summary["invalid"] == 0
+    result = pd.read_csv(output)
+    assert result["id"].tolist() == list(range(10))
+
+
+def test_parquet_valid_chunk_followed_by_invalid_chunk(tmp_path):
+    pytest.importorskip("pyarrow")
+    pipeline = PortfolioPipeline(risk_model=FakeRiskModel())
+    output = str(tmp_path / "out.parquet")
+    writer = _ResultWriter(output)
+    try:
+        writer.write(pipeline.process_chunk(policies([(1, 19.43, -99.13, 100.0)])))
+        writer.write(pipeline.process_chunk(policies([(2, 500.0, 500.0, 100.0), (3, 19.0, -99.0, 5.0)])))
+        # Un bloque sin ninguna fila válida (textos de reglas todos None)
+        writer.write(pipeline.process_chunk(policies([(4, 500.0, 500.0, 100.0)])))
+    finally:
+        writer.close()
+    result = pd.read_parquet(output)
+    assert result["id"].tolist() == [1, 2, 3, 4]
+    assert result["error"].isna().tolist() == [True, False, True, False]
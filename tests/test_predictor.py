@@ -0,0 +1,87 @@
+import threading
+
+import pytest
+
+from ai_layer import predictor
+from ai_layer.stub_model import StubModel
+from data_layer.cache import SourceCache
+
+
+class CountingModel(StubModel):
+    """
+    Stub que cuenta las llamadas a generate_content; falla si el prompt contiene fail_on.
+    """
+    def __init__(self, fail_on=None):
+        super().__init__(delay=0)
+        self.calls = 0
+        self.fail_on = fail_on
+        self._lock = threading.Lock()
+
+    def generate_content(self, prompt, stream=False):
+        with self._lock:
+            self.calls += 1
+        if self.fail_on and self.fail_on in prompt:
+            raise RuntimeError("cuota agotada")
+        return super().generate_content(prompt, stream)
+
+
+@pytest.fixture(autouse=True)
+def memory_cache(monkeypatch):
+    cache = SourceCache(":memory:", specs={"explanation": {"grid_deg": None, "ttl": predictor.EXPLANATION_TTL}})
+    monkeypatch.setattr(predictor, "_cache", cache)
+    return cache
+
+
+@pytest.fixture
+def model(monkeypatch):
+    fake = CountingModel()
+    monkeypatch.setattr(predictor, "_get_model", lambda model=None: fake)
+    return fake
+
+
+def test_explain_batch_generates_once_per_normalized_group(model):
+    # Riesgos de la misma banda, mismas métricas dominantes y misma celda de región
+    similar = [(41 + i % 9, (19.4 + i * 0.001, -99.1), {"flood": 80, "fire": 60, "wind": 10}) for i in range(40)]
+    other = [(85, "Monterrey, MX", {"seismic": 90})] * 10
+    texts = predictor.explain_batch(similar + other, max_workers=8)
+    assert model.calls == 2
+    assert len(texts) == 50
+    assert len(set(texts[:40])) == 1 and len(set(texts[40:])) == 1
+    assert texts[0] != texts[40]
+
+    # La segunda vez todo sale de la caché
+    predictor.explain_batch(similar + other)
+    assert model.calls == 2
+
+
+def test_explain_batch_returns_none_for_failed_groups(monkeypatch):
+    fake = CountingModel(fail_on="Monterrey")
+    monkeypatch.setattr(predictor, "_get_model", lambda model=None: fake)
+    texts = predictor.explain_batch([(85, "Monterrey, MX", None), (10, "Oaxaca, MX", None),
+                                     (82, "Monterrey,  MX", None)])
+    assert texts[0] is None and texts[2] is None
+    assert texts[1]
+    assert fake.calls == 2
+
+
+def test_missing_api_key_falls_back_to_stub(monkeypatch):
+    monkeypatch.setattr(predictor, "GEMINI_API_KEY", None)
+    monkeypatch.setattr(predictor, "AI_MODEL", "gemini-2.5-flash")
+
+    def no_genai():
+        raise AssertionError("no debe configurarse genai sin API key")
+
+    monkeypatch.setattr(predictor, "_get_genai", no_genai)
+    text = predictor.explain_risk(42, "Monterrey, MX")
+    assert "Monterrey, MX" in text
+    # La explicación del stub no queda en caché como si fuera de Gemini
+    inputs = predictor.normalize_inputs(42, "Monterrey, MX")
+    assert predictor._cache_key(inputs, None).startswith("explanation|stub|")
+
+
+def test_api_key_selects_configured_model(monkeypatch):
+    monkeypatch.setattr(predictor, "GEMINI_API_KEY", "test-key")
+    monkeypatch.setattr(predictor, "AI_MODEL", "gemini-2.5-flash")
+    inputs = predictor.normalize_inputs(42, "Monterrey, MX")
+    assert predictor._cache_key(inputs, None).startswith("explanation|gemini-2.5-flash|")
+    assert predictor._model_name("stub") == "stub"
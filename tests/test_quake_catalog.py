@@ -0,0 +1,82 @@
+import time
+
+from data_layer.quake_catalog import QuakeCatalog
+
+
+def feature(event_id, lon, lat, days_ago, now):
+    return {
+        "id": event_id,
+        "geometry": {"coordinates": [lon, lat, 10.0]},
+        "properties": {"time": (now - days_ago * 86400) * 1000, "mag": 4.5},
+    }
+
+
+def make_catalog(now):
+    catalog = QuakeCatalog(":memory:")
+    catalog.load_geojson({"features": [
+        feature("a", -100.0, 20.0, 10, now),
+        feature("b", -100.1, 20.1, 100, now),
+        feature("c", -100.0, 20.0, 800, now),
+        feature("d", -90.0, 15.0, 5, now),
+    ]})
+    catalog.set_bbox((-110.0, 14.0, -86.0, 30.0))
+    return catalog
+
+
+def test_repeated_events_are_ignored():
+    now = time.time()
+    catalog = make_catalog(now)
+    assert catalog.load_geojson({"features": [feature("a", -100.0, 20.0, 10, now)]}) == 0
+    assert len(catalog) == 4
+
+
+def test_count_within_filters_by_radius_and_date():
+    now = time.time()
+    catalog = make_catalog(now)
+    assert catalog.count_within(-100.0, 20.0, 50, 365, now=now) == 2
+    assert catalog.count_within(-100.0, 20.0, 50, 30, now=now) == 1
+    assert catalog.count_within(-100.0, 20.0, 50, 3650, now=now) == 3
+
+
+def test_covers_requires_the_whole_radius_inside_the_bbox():
+    catalog = make_catalog(time.time())
+    assert catalog.covers(-100.0, 20.0, 50)
+    assert catalog.covers(-109.9, 20.0)
+    # A 0.1° del borde oeste, un radio de 50 km se sale de la región
+    assert not catalog.covers(-109.9, 20.0, 50)
+    assert not catalog.covers(-100.0, 29.9, 50)
+    assert not catalog.covers(-120.0, 20.0)
+    assert not QuakeCatalog(":memory:").covers(-100.0, 20.0)
+
+
+def test_concurrent_loads_and_reads():
+    import threading
+
+    now = time.time()
+    catalog = QuakeCatalog(":memory:")
+    errors = []
+
+    def loader(offset):
+        try:
+            for i in range(50):
+                catalog.load_geojson({"features": [feature(f"{offset}-{i}", -100.0, 20.0, i, now)]})
+        except Exception as e:
+            errors.append(e)
+
+    def reader():
+        try:
+            for _ in range(200):
+                len(catalog)
+                catalog.last_event_time()
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=loader, args=(n,)) for n in range(4)]
+    threads += [threading.Thread(target=reader) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert errors == []
+    assert len(catalog) == 200
+    assert abs(catalog.last_event_time() - now) < 1
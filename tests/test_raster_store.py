@@ -0,0 +1,43 @@
+import os
+
+import numpy as np
+import pytest
+
+from data_layer.raster_store import RasterStore, TileMissError, tile_name
+
+
+@pytest.fixture
+def store(tmp_path):
+    # Tesela de 1°x1° con 4x4 píxeles de elevación; fila 0 = norte
+    tile = np.arange(16, dtype=np.int16).reshape(4, 4)
+    tile[3, 3] = -32768   # nodata
+    band_dir = tmp_path / "elevation" / "elevation"
+    os.makedirs(band_dir)
+    np.save(band_dir / (tile_name(-100, 19) + ".npy"), tile)
+    return RasterStore(root=str(tmp_path))
+
+
+def test_tile_names():
+    assert tile_name(-100, 19) == "N19W100"
+    assert tile_name(5, -3) == "S03E005"
+
+
+def test_lookup_reads_the_pixel_containing_the_point(store):
+    assert store.lookup("elevation", -99.99, 19.99) == 0      # esquina noroeste
+    assert store.lookup("elevation", -99.01, 19.99) == 3
+    assert store.lookup("elevation", -99.99, 19.01) == 12
+    assert store.lookup("elevation", -99.01, 19.01) is None   # nodata
+    with pytest.raises(TileMissError):
+        store.lookup("elevation", -98.5, 19.5)
+
+
+def test_lookup_batch_matches_lookup(store):
+    rng = np.random.default_rng(0)
+    lons = np.concatenate([rng.uniform(-100, -99, 200), [-98.5, -101.2]])
+    lats = np.concatenate([rng.uniform(19, 20, 200), [19.5, 19.5]])
+    values, hit = store.lookup_batch("elevation", lons, lats)
+    assert hit.tolist() == [True] * 200 + [False, False]
+    assert np.isnan(values[~hit]).all()
+    for lon, lat, value in zip(lons[:200], lats[:200], values[:200]):
+        expected = store.lookup("elevation", lon, lat)
+        assert (np.isnan(value) and expected is None) or value == expected
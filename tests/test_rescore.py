@@ -0,0 +1,126 @@
+import time
+
+import pytest
+
+from data_layer.cache import SourceCache, cached
+from data_layer.data2 import DataLayer
+from processing_layer import risk_model as risk_module
+from processing_layer.factor_store import FactorStore
+from processing_layer.risk_model import FACTOR_GROUPS, RiskModel
+
+DAY = 24 * 3600
+
+
+class Upstream:
+    """
+    Fuentes falsas: cada llamada devuelve un valor nuevo y se cuenta.
+    """
+    def __init__(self):
+        self.calls = {}
+
+    def value(self, name):
+        self.calls[name] = self.calls.get(name, 0) + 1
+        return float(self.calls[name])
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    fake = Upstream()
+    sources = {
+        "get_earthquake_frequency": "earthquake",
+        "get_flood_risk": "flood",
+        "get_hurricane_frequency": "hurricane",
+        "get_fire_frequency": "fire",
+        "get_ndvi": "ndvi",
+        "get_elevation": "elevation",
+    }
+    for method, source in sources.items():
+        def fetch(self, lon, lat, *args, _source=source, **kwargs):
+            return fake.value(_source)
+        monkeypatch.setattr(DataLayer, method, cached(source)(fetch))
+
+    @cached("weather")
+    def weather(self, lon, lat):
+        return {"temperature": 20, "humidity": 50, "wind_speed": 5, "precipitation": fake.value("weather")}
+
+    monkeypatch.setattr(DataLayer, "get_weather", weather)
+    monkeypatch.setattr(DataLayer, "get_volcano_proximity", lambda self, lon, lat: fake.value("volcano"))
+    return fake
+
+
+@pytest.fixture
+def model(monkeypatch, upstream):
+    monkeypatch.setattr(risk_module, "DataLayer", lambda: DataLayer(cache=SourceCache(":memory:")))
+    return RiskModel(factor_store=FactorStore(":memory:"))
+
+
+def test_first_rescore_fetches_everything(model, upstream):
+    result = model.rescore(-99.13, 19.43, now=time.time())
+    assert sorted(result["refreshed_factors"]) == sorted(FACTOR_GROUPS)
+    assert all(count == 1 for count in upstream.calls.values())
+
+
+def test_only_stale_groups_are_refetched(model, upstream):
+    start = time.time()
+    model.rescore(-99.13, 19.43, now=start)
+    result = model.rescore(-99.13, 19.43, now=start + 2 * 3600)
+    assert result["refreshed_factors"] == ["weather"]
+    assert upstream.calls["weather"] == 2
+    assert upstream.calls["hurricane"] == 1
+
+
+def test_refreshed_groups_bypass_the_source_cache(model, upstream):
+    start = time.time()
+    model.rescore(-99.13, 19.43, now=start)
+    # El huracán es estacional (24 h) aunque la caché de DataLayer lo guarde 7 días
+    result = model.rescore(-99.13, 19.43, now=start + 2 * DAY)
+    assert "hurricane" in result["refreshed_factors"]
+    assert upstream.calls["hurricane"] == 2
+    assert result["raw_factors"]["hurricane_rate"] == 2.0
+    assert upstream.calls["earthquake"] == 1
+
+
+def test_force_refetches_all_groups(model, upstream):
+    model.rescore(-99.13, 19.43)
+    model.rescore(-99.13, 19.43, force=True)
+    assert all(count == 2 for count in upstream.calls.values())
+
+
+def test_invalidate_removes_every_entry_in_the_cell():
+    cache = SourceCache(":memory:")
+    cache.put("hurricane", cache.make_key("hurricane", -99.1, 19.4), 1)
+    cache.put("hurricane", cache.make_key("hurricane", -99.1, 19.4, 10, 300), 2)
+    cache.put("hurricane", cache.make_key("hurricane", -90.0, 19.4), 3)
+    assert cache.invalidate("hurricane", -99.2, 19.3) == 2
+    assert cache.stats()["entries"] == 1
+    assert cache.get("hurricane", cache.make_key("hurricane", -90.0, 19.4)) == (True, 3)
+
+
+def test_cache_served_groups_keep_their_real_age(model, upstream):
+    lon, lat = -99.13, 19.43
+    cache = model.data_layer.cache
+    # El clima ya estaba en la caché de DataLayer desde hace 50 minutos
+    cache.put("weather", cache.make_key("weather", lon, lat),
+              {"temperature": 20, "humidity": 50, "wind_speed": 5, "precipitation": 9.0})
+    cache._conn.execute("UPDATE entries SET created = created - 3000 WHERE source = 'weather'")
+
+    model.calculate_risk_with_breakdown(lon, lat)
+    stored = model.factor_store.get(lon, lat)
+    assert time.time() - stored["weather"][1] >= 3000
+    assert time.time() - stored["hurricane"][1] < 60
+    assert "weather" not in upstream.calls
+
+    # 15 minutos después el clima ya supera su TTL de una hora y se vuelve a consultar
+    result = model.rescore(lon, lat, now=time.time() + 900)
+    assert result["refreshed_factors"] == ["weather"]
+    assert upstream.calls["weather"] == 1
+
+
+def test_created_returns_the_oldest_entry_in_the_cell():
+    cache = SourceCache(":memory:")
+    assert cache.created("flood", -99.1, 19.4) is None
+    cache.put("flood", cache.make_key("flood", -99.1, 19.4, "RP10_depth_category"), 1)
+    cache._conn.execute("UPDATE entries SET created = 100")
+    cache.put("flood", cache.make_key("flood", -99.1, 19.4, "RP50_depth_category"), 2)
+    assert cache.created("flood", -99.1, 19.4) == 100
+    assert "flood" not in cache.stats()["sources"]
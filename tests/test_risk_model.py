@@ -0,0 +1,84 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from data_layer.data2 import NDVI_TREND_PER_YEAR, DataLayer
+from processing_layer import risk_model as risk_module
+from processing_layer.factor_store import FactorStore
+from processing_layer.risk_model import RiskModel
+
+
+@pytest.fixture
+def model(monkeypatch):
+    # Sin caché en disco: las pruebas no tocan data_layer/.cache
+    monkeypatch.setattr(risk_module, "DataLayer", lambda: DataLayer(cache=False))
+    return RiskModel(factor_store=FactorStore(":memory:"))
+
+
+def random_factors(rng, n):
+    """
+    Filas de factores crudos con ceros y ausentes (None) donde la ruta escalar los admite.
+    """
+    rows = []
+    for _ in range(n):
+        rows.append({
+            "seismic_rate": float(rng.choice([0, rng.integers(1, 2000)])),
+            "flood_rate": rng.choice([None, 0, 1, 2, 3, 4, 5]),
+            "hurricane_rate": float(rng.choice([0, rng.integers(1, 80)])),
+            "fire_rate": float(rng.choice([0, rng.integers(1, 300)])),
+            "temperature": float(rng.uniform(-10, 45)),
+            "humidity": float(rng.choice([0, rng.uniform(5, 100)])),
+            "wind": float(rng.uniform(0, 60)),
+            "precipitation": float(rng.choice([0, rng.uniform(0, 250)])),
+            "vegetation": rng.choice([None, float(rng.uniform(-1, 1)), float(rng.integers(-2000, 10000))]),
+            "elevation": rng.choice([None, 0.0, float(rng.uniform(-50, 4000))]),
+        })
+    return rows
+
+
+def test_batch_matches_scalar_row_by_row(model):
+    rng = np.random.default_rng(0)
+    rows = random_factors(rng, 500)
+    columns = {key: [row[key] for row in rows] for key in rows[0]}
+    batch = model.calculate_risk_batch({k: np.array(v, dtype=object) for k, v in columns.items()})
+
+    for i, row in enumerate(rows):
+        scalar = model.score_factors(dict(row))
+        assert batch["risk_percent"][i] == scalar["risk_percent"], row
+        for metric, value in scalar["metrics_percent"].items():
+            assert batch["metrics_percent"][metric][i] == value, (metric, row)
+
+
+def test_batch_accepts_dataframe_with_nan_as_missing(model):
+    rng = np.random.default_rng(1)
+    rows = random_factors(rng, 100)
+    frame = pd.DataFrame(rows).astype(float)   # None → NaN
+    batch = model.calculate_risk_batch(frame)
+    for i, row in enumerate(rows):
+        assert batch["risk_percent"][i] == model.score_factors(dict(row))["risk_percent"]
+
+
+def test_empty_batch(model):
+    batch = model.calculate_risk_batch({})
+    assert len(batch["risk_percent"]) == 0
+
+
+def test_project_risk_series_is_stable_across_calls(model, monkeypatch):
+    raw = random_factors(np.random.default_rng(2), 1)[0]
+    raw["vegetation"] = 4000.0
+    monkeypatch.setattr(model, "_gather_factors", lambda lon, lat, **kw: (dict(raw), set()))
+
+    first = model.project_risk_series(-99.1, 19.4, 2025, 2050)
+    for _ in range(5):
+        assert model.project_risk_series(-99.1, 19.4, 2025, 2050)["series"] == first["series"]
+
+
+def test_ndvi_trend_is_fixed_per_cell_and_varies_between_cells():
+    layer = DataLayer(cache=False)
+    lons = np.linspace(-120, -60, 400)
+    lats = np.linspace(-30, 40, 400)
+    trend = layer.ndvi_trend(lons, lats)
+    assert set(np.unique(trend)) == {-NDVI_TREND_PER_YEAR, NDVI_TREND_PER_YEAR}
+    assert np.array_equal(trend, layer.ndvi_trend(lons, lats))
+    # Escalar y vectorizado coinciden
+    assert float(layer.ndvi_trend(lons[7], lats[7])) == trend[7]
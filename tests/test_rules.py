@@ -0,0 +1,57 @@
+import numpy as np
+
+from business_layer.rules import InsuranceRules
+
+KEYS = ("flood_rate", "seismic_rate", "hurricane_rate", "fire_rate",
+        "volcano_distance_km", "temperature", "vegetation")
+
+
+def random_rows(rng, n):
+    """
+    Factores alrededor de los umbrales; algunas claves faltan (como en get_factors).
+    """
+    rows = []
+    for _ in range(n):
+        row = {
+            "flood_rate": float(rng.choice([0, 2, 2.5, 5])),
+            "seismic_rate": float(rng.integers(0, 5)),
+            "hurricane_rate": float(rng.choice([0, 1, 3])),
+            "fire_rate": float(rng.choice([0, 1, 2])),
+            "volcano_distance_km": float(rng.choice([10, 50, 200])),
+            "temperature": float(rng.uniform(20, 45)),
+            "vegetation": float(rng.uniform(-0.2, 0.9)),
+        }
+        for key in KEYS:
+            if rng.random() < 0.1:
+                del row[key]
+        rows.append(row)
+    return rows
+
+
+def as_columns(rows):
+    return {key: np.array([row.get(key, np.nan) for row in rows], dtype=float) for key in KEYS}
+
+
+def test_insurability_batch_matches_scalar():
+    rules = InsuranceRules()
+    scores = np.array([0, 30, 30.5, 60, 61, 100])
+    expected = [rules.evaluate_insurability(s) for s in scores]
+    assert rules.evaluate_insurability_batch(scores).tolist() == expected
+
+
+def test_policy_types_batch_matches_scalar():
+    rules = InsuranceRules()
+    rows = random_rows(np.random.default_rng(0), 400)
+    batch = rules.suggest_policy_type_batch(as_columns(rows))
+    for row, text in zip(rows, batch):
+        assert text == "; ".join(rules.suggest_policy_type(row))
+
+
+def test_mitigation_batch_matches_scalar():
+    rules = InsuranceRules()
+    rng = np.random.default_rng(1)
+    rows = random_rows(rng, 400)
+    scores = rng.integers(0, 101, len(rows)).astype(float)
+    batch = rules.mitigation_actions_batch(scores, as_columns(rows))
+    for score, row, text in zip(scores, rows, batch):
+        assert text == "; ".join(rules.mitigation_actions(score, row))
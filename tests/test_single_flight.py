@@ -0,0 +1,101 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from data_layer.single_flight import AsyncSingleFlight, SingleFlight
+
+
+def test_concurrent_calls_share_one_execution():
+    flights = SingleFlight()
+    calls = []
+    start = threading.Barrier(10)
+
+    def slow(x):
+        calls.append(x)
+        time.sleep(0.2)
+        return {"value": x}
+
+    results = []
+
+    def worker():
+        start.wait()
+        results.append(flights.do("k", slow, 7))
+
+    threads = [threading.Thread(target=worker) for _ in range(10)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert calls == [7]
+    assert results == [{"value": 7}] * 10
+    assert flights.stats() == {"in_flight": 0, "leaders": 1, "followers": 9}
+
+
+def test_followers_receive_the_leader_exception():
+    flights = SingleFlight()
+    entered = threading.Event()
+
+    def failing():
+        entered.set()
+        time.sleep(0.1)
+        raise ValueError("falló")
+
+    errors = []
+
+    def follower():
+        entered.wait()
+        try:
+            flights.do("k", failing)
+        except ValueError as e:
+            errors.append(str(e))
+
+    t = threading.Thread(target=follower)
+    t.start()
+    with pytest.raises(ValueError):
+        flights.do("k", failing)
+    t.join()
+    assert errors == ["falló"]
+
+
+def test_key_is_released_after_completion():
+    flights = SingleFlight()
+    assert flights.do("k", lambda: 1) == 1
+    assert flights.do("k", lambda: 2) == 2
+    assert flights.stats()["leaders"] == 2
+
+
+def test_async_calls_share_one_task():
+    flights = AsyncSingleFlight()
+    calls = []
+
+    async def slow(x):
+        calls.append(x)
+        await asyncio.sleep(0.05)
+        return x * 2
+
+    async def main():
+        return await asyncio.gather(*(flights.do("k", slow, 21) for _ in range(20)))
+
+    assert asyncio.run(main()) == [42] * 20
+    assert calls == [21]
+    assert flights.stats() == {"in_flight": 0, "leaders": 1, "followers": 19}
+
+
+def test_async_cancelled_follower_does_not_cancel_the_leader():
+    flights = AsyncSingleFlight()
+
+    async def slow():
+        await asyncio.sleep(0.05)
+        return "ok"
+
+    async def main():
+        leader = asyncio.ensure_future(flights.do("k", slow))
+        follower = asyncio.ensure_future(flights.do("k", slow))
+        await asyncio.sleep(0)
+        follower.cancel()
+        return await leader
+
+    assert asyncio.run(main()) == "ok"
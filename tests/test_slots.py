@@ -0,0 +1,52 @@
+import threading
+
+import pytest
+
+from ai_layer import slots
+from ai_layer.slots import ModelSlots
+
+
+@pytest.fixture(params=["flock", "local"])
+def make_slots(request, monkeypatch, tmp_path):
+    if request.param == "local":
+        if slots.fcntl is None:
+            pytest.skip("sin fcntl ya se usa el semáforo local")
+        monkeypatch.setattr(slots, "fcntl", None)
+        monkeypatch.setattr(slots, "_local_semaphores", {})
+    elif slots.fcntl is None:
+        pytest.skip("flock requiere fcntl")
+    return lambda n: ModelSlots(n=n, lock_dir=str(tmp_path / "slots"), poll=0.01)
+
+
+def test_limit_is_enforced(make_slots):
+    model_slots = make_slots(1)
+    with model_slots.acquire(timeout=1):
+        with pytest.raises(TimeoutError):
+            with make_slots(1).acquire(timeout=0.05):
+                pass
+    # Liberado: se puede volver a tomar
+    with model_slots.acquire(timeout=0.05):
+        pass
+
+
+def test_slots_are_shared_between_instances(make_slots):
+    acquired = threading.Semaphore(0)
+    release = threading.Event()
+
+    def holder():
+        with make_slots(2).acquire(timeout=1):
+            acquired.release()
+            release.wait(2)
+
+    threads = [threading.Thread(target=holder) for _ in range(2)]
+    for t in threads:
+        t.start()
+    try:
+        assert acquired.acquire(timeout=1) and acquired.acquire(timeout=1)
+        with pytest.raises(TimeoutError):
+            with make_slots(2).acquire(timeout=0.1):
+                pass
+    finally:
+        release.set()
+        for t in threads:
+            t.join()
@@ -0,0 +1,65 @@
+import numpy as np
+
+from data_layer.spatial_index import GridIndex, haversine_np
+
+
+def random_points(rng, n, bbox=(-120.0, 10.0, -85.0, 35.0)):
+    min_lon, min_lat, max_lon, max_lat = bbox
+    return rng.uniform(min_lon, max_lon, n), rng.uniform(min_lat, max_lat, n)
+
+
+def test_haversine_known_distance():
+    # Un grado de latitud ≈ 111.19 km
+    assert abs(haversine_np(0.0, 0.0, 0.0, 1.0) - 111.19) < 0.01
+    assert haversine_np(-99.13, 19.43, -99.13, 19.43) == 0.0
+
+
+def test_query_radius_matches_brute_force():
+    rng = np.random.default_rng(0)
+    lons, lats = random_points(rng, 3000)
+    index = GridIndex(lons, lats, cell_deg=0.5)
+    q_lons, q_lats = random_points(rng, 50)
+    for lon, lat in zip(q_lons, q_lats):
+        for radius in (10, 50, 200):
+            idx, dist = index.query_radius(lon, lat, radius)
+            brute = np.flatnonzero(haversine_np(lon, lat, lons, lats) <= radius)
+            assert sorted(idx.tolist()) == brute.tolist()
+            assert np.all(dist <= radius)
+
+
+def test_count_radius_with_mask_matches_brute_force():
+    rng = np.random.default_rng(1)
+    lons, lats = random_points(rng, 2000)
+    mask = rng.random(2000) < 0.3
+    index = GridIndex(lons, lats, cell_deg=0.25)
+    q_lons, q_lats = random_points(rng, 40)
+    counts = index.count_radius(q_lons, q_lats, 75, mask=mask)
+    expected = [np.count_nonzero(mask & (haversine_np(lon, lat, lons, lats) <= 75))
+                for lon, lat in zip(q_lons, q_lats)]
+    assert counts.tolist() == expected
+
+
+def test_nearest_matches_brute_force():
+    rng = np.random.default_rng(2)
+    lons, lats = random_points(rng, 500)
+    index = GridIndex(lons, lats, cell_deg=0.5)
+    # Consultas dentro y lejos de la nube de puntos
+    q_lons = np.concatenate([random_points(rng, 100)[0], [10.0, -170.0]])
+    q_lats = np.concatenate([random_points(rng, 100)[1], [45.0, -60.0]])
+    dists, idx = index.nearest(q_lons, q_lats)
+    brute = haversine_np(q_lons[:, None], q_lats[:, None], lons[None, :], lats[None, :])
+    assert idx.tolist() == brute.argmin(axis=1).tolist()
+    assert np.allclose(dists, brute.min(axis=1))
+
+
+def test_radius_query_across_antimeridian():
+    index = GridIndex([179.9, -179.9, 170.0], [0.0, 0.0, 0.0], cell_deg=0.5)
+    idx, _ = index.query_radius(179.95, 0.0, 50)
+    assert sorted(idx.tolist()) == [0, 1]
+
+
+def test_empty_index():
+    index = GridIndex([], [], cell_deg=0.5)
+    assert index.count_radius([0.0], [0.0], 100).tolist() == [0]
+    dists, idx = index.nearest([0.0], [0.0])
+    assert np.isinf(dists[0]) and idx[0] == -1
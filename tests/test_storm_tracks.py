@@ -0,0 +1,96 @@
+import calendar
+
+import numpy as np
+
+from data_layer.spatial_index import KM_PER_DEG
+from data_layer.storm_tracks import YEAR_SECONDS, StormTrackStore, ingest, read_hurdat2
+
+NOW = calendar.timegm((2025, 6, 30, 0, 0, 0))
+
+HURDAT2 = """\
+AL012024, ALPHA, 3,
+20240601, 0000, , TS, 20.0N, 90.0W, 40, 1000,
+20240601, 0600, , TS, 20.0N, 88.0W, 45, 998,
+20240601, 1200, , HU, 21.0N, 86.0W, 65, 990,
+AL022015, BETA, 2,
+20150801, 0000, , TS, 20.0N, 90.0W, 40, 1000,
+20150801, 0600, , TS, 20.0N, 89.0W, 40, 1000,
+"""
+
+
+def test_read_hurdat2_parses_headers_and_hemispheres(tmp_path):
+    path = tmp_path / "hurdat2.txt"
+    path.write_text(HURDAT2)
+    tracks = read_hurdat2(str(path))
+    assert sorted(tracks) == ["AL012024", "AL022015"]
+    assert tracks["AL012024"][0] == (calendar.timegm((2024, 6, 1, 0, 0, 0)), -90.0, 20.0)
+    assert tracks["AL012024"][2][1:] == (-86.0, 21.0)
+    assert len(tracks["AL022015"]) == 2
+
+
+def test_years_window_drops_old_segments(tmp_path):
+    path = tmp_path / "hurdat2.txt"
+    path.write_text(HURDAT2)
+    store = StormTrackStore.from_tracks(read_hurdat2(str(path)))
+    assert len(store) == 3
+    # (-89.5, 20.0) está sobre ALPHA (2024) y BETA (2015)
+    assert store.count_within(-89.5, 20.0, radius_km=50, years=5, now=NOW) == 1
+    assert store.count_within(-89.5, 20.0, radius_km=50, years=20, now=NOW) == 2
+    assert store.count_within(-89.5, 20.0, radius_km=50, years=0.01, now=NOW) == 0
+
+
+def test_long_segment_counts_even_if_midpoint_is_far():
+    # Segmento de 10° de longitud; el punto está junto a un extremo, a ~550 km del punto medio
+    store = StormTrackStore(["S"], [NOW - 86400], [-100.0], [25.0], [-90.0], [25.0])
+    assert store.count_within(-99.5, 25.3, radius_km=50, now=NOW) == 1
+    assert store.count_within(-99.5, 26.0, radius_km=50, now=NOW) == 0
+
+
+def test_segment_crossing_antimeridian():
+    store = StormTrackStore(["S"], [NOW - 86400], [179.0], [-15.0], [-179.0], [-15.0])
+    assert store.count_within(180.0, -15.0, radius_km=20, now=NOW) == 1
+    assert store.count_within(-179.9, -15.1, radius_km=20, now=NOW) == 1
+    # Sin el envolvente sería la línea que cruza todo el Pacífico por lon 0
+    assert store.count_within(0.0, -15.0, radius_km=20, now=NOW) == 0
+
+
+def brute_force(store, lon, lat, radius_km, years):
+    cutoff = NOW - years * YEAR_SECONDS
+    idx = np.flatnonzero(store.times >= cutoff)
+    return int(np.count_nonzero(store._segment_distances(lon, lat, idx) <= radius_km))
+
+
+def test_batch_matches_brute_force():
+    rng = np.random.default_rng(3)
+    n = 400
+    lon0 = rng.uniform(-100, -60, n)
+    lat0 = rng.uniform(10, 40, n)
+    lon1 = lon0 + rng.uniform(-3, 3, n)
+    lat1 = lat0 + rng.uniform(-3, 3, n)
+    times = NOW - rng.uniform(0, 10 * YEAR_SECONDS, n)
+    store = StormTrackStore([f"S{i}" for i in range(n)], times, lon0, lat0, lon1, lat1)
+
+    lons = rng.uniform(-100, -60, 50)
+    lats = rng.uniform(10, 40, 50)
+    counts = store.count_within_batch(lons, lats, radius_km=150, years=5, now=NOW)
+    expected = [brute_force(store, lon, lat, 150, 5) for lon, lat in zip(lons, lats)]
+    assert counts.tolist() == expected
+    assert sum(expected) > 0
+
+
+def test_ingest_merges_and_replaces_repeated_storms(tmp_path):
+    store_path = str(tmp_path / "storms.npz")
+    first = tmp_path / "a.txt"
+    first.write_text(HURDAT2)
+    assert len(ingest(str(first), store_path=store_path)) == 3
+
+    # ALPHA se reingesta con una sola posición (segmento de longitud 0); BETA se conserva
+    second = tmp_path / "b.txt"
+    second.write_text("AL012024, ALPHA, 1,\n20240601, 0000, , TS, 20.0N, 90.0W, 40, 1000,\n")
+    store = ingest(str(second), store_path=store_path)
+    assert len(store) == 2
+    assert sorted(store.storm_ids.tolist()) == ["AL012024", "AL022015"]
+    assert np.all(np.diff(store.times) >= 0)
+
+    loaded = StormTrackStore.load(store_path)
+    assert loaded.count_within(-90.0, 20.0 + 10 / KM_PER_DEG, radius_km=20, years=20, now=NOW) == 2
@@ -0,0 +1,94 @@
+import os
+import time
+
+import numpy as np
+import pytest
+
+from ui_layer import tiles
+from ui_layer.tiles import SAMPLES, RiskTileCache, empty_png, render_png, sample_points, tile_bounds
+
+
+class FakeRiskModel:
+    """
+    Puntaje = 50 en todas partes; cuenta las llamadas para ver dónde se calcula.
+    """
+    def __init__(self):
+        self.calls = 0
+
+    def get_factors_batch(self, lons, lats, target_year=None):
+        self.calls += 1
+        return {"n": len(lons)}
+
+    def calculate_risk_batch(self, factors):
+        return {"risk_percent": np.full(factors["n"], 50)}
+
+
+@pytest.fixture
+def cache(tmp_path):
+    model = FakeRiskModel()
+    cache = RiskTileCache(model, root=str(tmp_path), workers=1, min_zoom=4)
+    yield cache
+    cache._pool.shutdown(wait=True)
+
+
+def wait_idle(cache):
+    deadline = time.time() + 5
+    while cache._in_flight and time.time() < deadline:
+        time.sleep(0.01)
+
+
+def test_sample_points_fall_inside_tile():
+    lons, lats = sample_points(10, 225, 454)
+    min_lon, min_lat, max_lon, max_lat = tile_bounds(10, 225, 454)
+    assert len(lons) == SAMPLES * SAMPLES
+    assert np.all((lons > min_lon) & (lons < max_lon) & (lats > min_lat) & (lats < max_lat))
+
+
+def test_render_png_is_a_png():
+    png = render_png(np.full((SAMPLES, SAMPLES), 10.0))
+    assert png.startswith(b"\x89PNG\r\n\x1a\n")
+
+
+def test_cold_miss_does_not_compute_in_the_request(cache):
+    png, exact = cache.get_tile(10, 225, 454)
+    assert not exact and png == empty_png()
+    wait_idle(cache)
+    assert cache.risk_model.calls == 1
+    png, exact = cache.get_tile(10, 225, 454)
+    assert exact and png == render_png(np.full((SAMPLES, SAMPLES), 50.0))
+
+
+def test_below_min_zoom_is_transparent_and_never_computed(cache):
+    assert cache.get_tile(3, 1, 1) == (empty_png(), True)
+    wait_idle(cache)
+    assert cache.risk_model.calls == 0
+
+
+def test_child_is_derived_from_parent_while_computing(cache):
+    cache._store(9, 112, 227, np.full((SAMPLES, SAMPLES), 80.0, dtype=np.float32))
+    png, exact = cache.get_tile(10, 225, 454)
+    assert not exact and png == render_png(np.full((SAMPLES, SAMPLES), 80.0))
+    wait_idle(cache)
+
+
+def test_expired_tile_is_served_stale_and_refreshed(cache):
+    cache._store(10, 225, 454, np.full((SAMPLES, SAMPLES), 80.0, dtype=np.float32))
+    path = cache._path(10, 225, 454)
+    old = time.time() - cache.ttl - 10
+    os.utime(path, (old, old))
+
+    png, exact = cache.get_tile(10, 225, 454)
+    assert not exact and png == render_png(np.full((SAMPLES, SAMPLES), 80.0))
+    wait_idle(cache)
+    assert cache.get_tile(10, 225, 454) == (render_png(np.full((SAMPLES, SAMPLES), 50.0)), True)
+
+
+def test_overwriting_a_tile_does_not_grow_the_count(cache):
+    grid = np.zeros((SAMPLES, SAMPLES), dtype=np.float32)
+    for _ in range(3):
+        cache._store(10, 1, 1, grid)
+    assert cache._count == 1
+
+
+def test_ttl_follows_the_most_volatile_factor():
+    assert tiles.TILE_TTL == min(tiles.VOLATILITY_TTL.values())
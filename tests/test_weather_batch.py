@@ -0,0 +1,58 @@
+from data_layer.cache import SourceCache
+from data_layer.data2 import DataLayer
+
+
+class FakeResponse:
+    def __init__(self, payload):
+        self.status_code = 200
+        self.payload = payload
+
+    def json(self):
+        return self.payload
+
+
+def hourly(temperature):
+    return {"hourly": {"time": ["2025-01-01T00:00"], "temperature_2m": [temperature],
+                       "relative_humidity_2m": [50], "precipitation": [1.0], "wind_speed_10m": [3.0]}}
+
+
+class FakeOpenMeteo:
+    """
+    temperatura = latitud; drop quita ubicaciones de la respuesta multi-ubicación.
+    """
+    def __init__(self, drop=0):
+        self.drop = drop
+        self.requests = []
+
+    def get(self, source, url, params=None, **kwargs):
+        if params is None:   # ruta de un solo punto (get_weather)
+            lat = float(url.split("latitude=")[1].split("&")[0])
+            self.requests.append(1)
+            return FakeResponse(hourly(lat))
+        lats = [float(x) for x in params["latitude"].split(",")]
+        self.requests.append(len(lats))
+        locations = [hourly(lat) for lat in lats]
+        locations = locations[:len(locations) - self.drop]
+        return FakeResponse(locations if len(locations) != 1 else locations[0])
+
+
+def test_points_in_the_same_cell_are_requested_once():
+    http = FakeOpenMeteo()
+    layer = DataLayer(cache=SourceCache(":memory:"), http=http)
+    lons = [-99.01, -99.02, -98.51, -97.05]
+    lats = [19.01, 19.02, 19.51, 20.05]
+    results = layer.get_weather_batch(lons, lats, chunk_size=2)
+    assert http.requests == [2, 1]
+    assert [r["temperature"] for r in results] == [19.01, 19.01, 19.51, 20.05]
+
+    # Segunda vez: todo sale de la caché
+    layer.get_weather_batch(lons, lats)
+    assert http.requests == [2, 1]
+
+
+def test_short_response_falls_back_to_single_requests():
+    http = FakeOpenMeteo(drop=1)
+    layer = DataLayer(cache=False, http=http)
+    results = layer.get_weather_batch([-99.0, -98.0, -97.0], [19.0, 20.0, 21.0])
+    assert http.requests == [3, 1, 1, 1]
+    assert [r["temperature"] for r in results] == [19.0, 20.0, 21.0]
@@ -1,15 +1,11 @@
-import ee
 import folium
 from processing_layer.risk_model import RiskModel
 from business_layer.rules import InsuranceRules
 from data_layer.data2 import DataLayer
+from ui_layer.tiles import score_color
 import math 
 from geopy.distance import geodesic, great_circle
 
-# Inicializar Earth Engine
-ee.Initialize(project='terraguard-477621')
-print("🌍 Earth Engine funcionando correctamente")
-
 class TerraGuardUI:
     """
     Interfaz para mostrar mapas de riesgo ambiental y puntuaciones.
@@ -73,12 +69,7 @@ class TerraGuardUI:
     # Determinar color del marcador según riesgo
     # -----------------------------
     def score_color(self, score):
-        if score <= 30:
-            return 'green'
-        elif score <= 60:
-            return 'orange'
-        else:
-            return 'red'
+        return score_color(score)
 
     # -----------------------------
     # Agregar marcador con popup
@@ -0,0 +1,273 @@
+# ui_layer/tiles.py
+"""
+Teselas XYZ (Web Mercator) coloreadas por riesgo para el mapa.
+
+Cada tesela se puntúa en una rejilla gruesa (SAMPLES x SAMPLES puntos) con
+get_factors_batch + calculate_risk_batch y se pinta con los mismos umbrales
+que TerraGuardUI.score_color. Las rejillas de riesgo se guardan en disco
+(caché acotada, LRU por fecha de acceso, caducan a los TILE_TTL segundos).
+Una petición nunca puntúa en su propio hilo: si falta la tesela se responde
+al instante con una aproximación (su padre o sus cuatro hijas), la versión
+caducada o una tesela transparente, y la exacta se calcula en segundo plano.
+Por debajo de MIN_COMPUTE_ZOOM no se calcula nada (cada tesela cubriría
+regiones enteras con una rejilla de 16x16 puntos).
+"""
+import math
+import os
+import struct
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from processing_layer.risk_model import FACTOR_GROUPS, FACTOR_VOLATILITY, VOLATILITY_TTL
+
+TILE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".tiles")
+TILE_SIZE = 256
+SAMPLES = 16          # puntos puntuados por lado de cada tesela
+MAX_ZOOM = 18
+MIN_COMPUTE_ZOOM = 6
+# Una tesela dura lo que el factor más volátil que entra en el puntaje
+TILE_TTL = min(VOLATILITY_TTL[FACTOR_VOLATILITY[name]] for name in FACTOR_GROUPS)
+
+# Mismos umbrales que InsuranceRules / TerraGuardUI.score_color
+RISK_THRESHOLDS = ((30, "green"), (60, "orange"))
+RISK_RGBA = {
+    "green": (0, 128, 0, 110),
+    "orange": (255, 165, 0, 130),
+    "red": (255, 0, 0, 150),
+}
+
+
+def score_color(score):
+    for limit, color in RISK_THRESHOLDS:
+        if score <= limit:
+            return color
+    return "red"
+
+
+# -----------------------------
+# Geometría de teselas
+# -----------------------------
+def tile_bounds(z, x, y):
+    """
+    (min_lon, min_lat, max_lon, max_lat) de la tesela z/x/y.
+    """
+    n = 2 ** z
+
+    def lat_of(row):
+        return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * row / n))))
+
+    return x / n * 360.0 - 180.0, lat_of(y + 1), (x + 1) / n * 360.0 - 180.0, lat_of(y)
+
+
+def sample_points(z, x, y, samples=SAMPLES):
+    """
+    Centros de la rejilla de muestreo (fila 0 = norte), equiespaciados en Mercator.
+    """
+    n = 2 ** z
+    offsets = (np.arange(samples) + 0.5) / samples
+    lons = (x + offsets) / n * 360.0 - 180.0
+    lats = np.degrees(np.arctan(np.sinh(np.pi * (1 - 2 * (y + offsets) / n))))
+    lon_grid, lat_grid = np.meshgrid(lons, lats)
+    return lon_grid.ravel(), lat_grid.ravel()
+
+
+# -----------------------------
+# Render
+# -----------------------------
+def render_png(risk_grid):
+    """
+    Rejilla de riesgo (samples x samples, NaN = sin dato) → PNG RGBA de 256x256.
+    """
+    scale = TILE_SIZE // risk_grid.shape[0]
+    pixels = np.repeat(np.repeat(risk_grid, scale, axis=0), scale, axis=1)
+    rgba = np.zeros(pixels.shape + (4,), dtype=np.uint8)
+    valid = ~np.isnan(pixels)
+    lower = -np.inf
+    for limit, color in RISK_THRESHOLDS + ((np.inf, "red"),):
+        rgba[valid & (pixels > lower) & (pixels <= limit)] = RISK_RGBA[color]
+        lower = limit
+    return encode_png(rgba)
+
+
+_EMPTY_PNG = None
+
+def empty_png():
+    """
+    Tesela transparente (sin datos todavía).
+    """
+    global _EMPTY_PNG
+    if _EMPTY_PNG is None:
+        _EMPTY_PNG = render_png(np.full((SAMPLES, SAMPLES), np.nan, dtype=np.float32))
+    return _EMPTY_PNG
+
+
+def encode_png(rgba):
+    """
+    Codificador PNG mínimo (RGBA 8 bits, sin filtros) para no depender de PIL.
+    """
+    height, width, _ = rgba.shape
+    raw = np.concatenate([np.zeros((height, 1), dtype=np.uint8), rgba.reshape(height, width * 4)], axis=1)
+
+    def chunk(tag, data):
+        return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data) & 0xFFFFFFFF)
+
+    header = struct.pack(">IIBBBBB", width, height, 8, 6, 0, 0, 0)
+    return (b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header)
+            + chunk(b"IDAT", zlib.compress(raw.tobytes(), 6)) + chunk(b"IEND", b""))
+
+
+# -----------------------------
+# Caché en disco + derivación entre niveles
+# -----------------------------
+class RiskTileCache:
+    """
+    Rejillas de riesgo por tesela en root/z/x/y.npy, con un máximo de max_tiles.
+    mtime del archivo = cuándo se calculó (TTL); atime = último acceso (LRU).
+    Como mucho max_pending teselas esperan cálculo; las demás se vuelven a
+    pedir cuando el mapa recargue.
+    """
+    def __init__(self, risk_model, root=TILE_DIR, max_tiles=20000, workers=4, target_year=None,
+                 ttl=TILE_TTL, min_zoom=MIN_COMPUTE_ZOOM, max_pending=64):
+        self.risk_model = risk_model
+        self.root = root
+        self.max_tiles = max_tiles
+        self.target_year = target_year
+        self.ttl = ttl
+        self.min_zoom = min_zoom
+        self.max_pending = max_pending
+        self._lock = threading.Lock()
+        self._in_flight = set()
+        self._pool = ThreadPoolExecutor(max_workers=workers)
+        os.makedirs(root, exist_ok=True)
+        self._count = sum(len(files) for _, _, files in os.walk(root))
+
+    def _path(self, z, x, y):
+        return os.path.join(self.root, str(z), str(x), f"{y}.npy")
+
+    def _load(self, z, x, y, now=None):
+        """
+        Devuelve (rejilla, vigente) o (None, False) si no está en disco.
+        """
+        path = self._path(z, x, y)
+        try:
+            grid = np.load(path)
+            created = os.stat(path).st_mtime
+        except (FileNotFoundError, ValueError):
+            return None, False
+        now = time.time() if now is None else now
+        os.utime(path, (now, created))  # acceso para el LRU, sin tocar la fecha de cálculo
+        return grid, now - created <= self.ttl
+
+    def _store(self, z, x, y, grid):
+        path = self._path(z, x, y)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + ".tmp.npy"
+        np.save(tmp_path, grid)
+        with self._lock:
+            if not os.path.exists(path):
+                self._count += 1
+            os.replace(tmp_path, path)
+            if self._count > self.max_tiles:
+                self._evict()
+
+    def _evict(self):
+        """
+        Borra las teselas con acceso más antiguo hasta quedar un 10% por debajo del límite.
+        """
+        files = []
+        for dirpath, _, names in os.walk(self.root):
+            for name in names:
+                path = os.path.join(dirpath, name)
+                try:
+                    files.append((os.path.getatime(path), path))
+                except FileNotFoundError:
+                    continue
+        files.sort()
+        excess = len(files) - int(self.max_tiles * 0.9)
+        for _, path in files[:max(0, excess)]:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+        self._count = len(files) - max(0, excess)
+
+    def compute(self, z, x, y):
+        """
+        Puntúa la tesela (consulta de datos por lotes) y la guarda.
+        """
+        lons, lats = sample_points(z, x, y)
+        factors = self.risk_model.get_factors_batch(lons, lats, target_year=self.target_year)
+        scored = self.risk_model.calculate_risk_batch(factors)
+        grid = scored["risk_percent"].reshape(SAMPLES, SAMPLES).astype(np.float32)
+        self._store(z, x, y, grid)
+        return grid
+
+    def _compute_in_background(self, z, x, y):
+        key = (z, x, y)
+        with self._lock:
+            if key in self._in_flight or len(self._in_flight) >= self.max_pending:
+                return
+            self._in_flight.add(key)
+
+        def task():
+            try:
+                self.compute(z, x, y)
+            except Exception as e:
+                print(f"⚠️ Tesela {z}/{x}/{y} falló: {e}")
+            finally:
+                with self._lock:
+                    self._in_flight.discard(key)
+
+        self._pool.submit(task)
+
+    def _from_parent(self, z, x, y):
+        if z == 0:
+            return None
+        parent, _ = self._load(z - 1, x // 2, y // 2)
+        if parent is None:
+            return None
+        half = SAMPLES // 2
+        quadrant = parent[(y % 2) * half:(y % 2 + 1) * half, (x % 2) * half:(x % 2 + 1) * half]
+        return np.repeat(np.repeat(quadrant, 2, axis=0), 2, axis=1)
+
+    def _from_children(self, z, x, y):
+        if z >= MAX_ZOOM:
+            return None
+        half = SAMPLES // 2
+        grid = np.empty((SAMPLES, SAMPLES), dtype=np.float32)
+        for dy in (0, 1):
+            for dx in (0, 1):
+                child, _ = self._load(z + 1, 2 * x + dx, 2 * y + dy)
+                if child is None:
+                    return None
+                with np.errstate(invalid="ignore"):
+                    pooled = np.nanmean(child.reshape(half, 2, half, 2), axis=(1, 3))
+                grid[dy * half:(dy + 1) * half, dx * half:(dx + 1) * half] = pooled
+        return grid
+
+    def get_tile(self, z, x, y):
+        """
+        Devuelve (png_bytes, exacta) sin puntuar nada en el hilo de la petición.
+        exacta=False: aproximación, versión caducada o tesela transparente;
+        la tesela real queda encargada en segundo plano.
+        """
+        if z < self.min_zoom:
+            return empty_png(), True
+
+        grid, fresh = self._load(z, x, y)
+        if grid is not None and fresh:
+            return render_png(grid), True
+
+        self._compute_in_background(z, x, y)
+        if grid is not None:
+            return render_png(grid), False
+        derived = self._from_parent(z, x, y)
+        if derived is None:
+            derived = self._from_children(z, x, y)
+        if derived is not None:
+            return render_png(derived), False
+        return empty_png(), False